@@ -1,5 +1,9 @@
-def main():
-    print("Hello from minecraft-world-generator!")
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from pipeline import main
 
 
 if __name__ == "__main__":
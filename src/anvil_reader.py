@@ -0,0 +1,522 @@
+from pathlib import Path
+from typing import Generator, Iterable, Optional, Set
+import gzip
+import struct
+import zlib
+import lz4.block
+import numpy as np
+
+SECTOR_SIZE = 4096
+CHUNKS_PER_REGION = 32 * 32
+
+COMPRESSION_GZIP = 1
+COMPRESSION_ZLIB = 2
+COMPRESSION_NONE = 3
+COMPRESSION_LZ4 = 4
+
+# First DataVersion with the 1.18 chunk layout (-64..320 world height, no "Level" wrapper)
+DATA_VERSION_1_18 = 2825
+# First DataVersion where packed longs no longer span entries across long boundaries
+DATA_VERSION_1_16 = 2529
+
+TAG_END, TAG_BYTE, TAG_SHORT, TAG_INT, TAG_LONG, TAG_FLOAT, TAG_DOUBLE = range(7)
+TAG_BYTE_ARRAY, TAG_STRING, TAG_LIST, TAG_COMPOUND, TAG_INT_ARRAY, TAG_LONG_ARRAY = range(7, 13)
+
+# Errors a single damaged chunk payload can raise while being decompressed or parsed
+CHUNK_DECODE_ERRORS = (ValueError, zlib.error, EOFError, OSError, struct.error, IndexError, RuntimeError)
+
+INHABITED_TIME_TAG = bytes([TAG_LONG]) + struct.pack(">H", len("InhabitedTime")) + b"InhabitedTime"
+DATA_VERSION_TAG = bytes([TAG_INT]) + struct.pack(">H", len("DataVersion")) + b"DataVersion"
+
+# Palette entry every reader maps to global ID 0
+AIR_BLOCK = "minecraft:air"
+# Heightmap holding the highest non-air block of each column
+SURFACE_HEIGHTMAP = "WORLD_SURFACE"
+FULL_STATUSES = ("full", "minecraft:full")
+
+_LZ4_BLOCK_MAGIC = b"LZ4Block"
+_LZ4_BLOCK_HEADER = struct.Struct("<iii")
+
+
+class NBTReader:
+    """
+    Minimal big-endian NBT parser.
+
+    Compounds become dicts, lists become lists and the array tags become NumPy
+    views over the payload, so long-packed block data is never copied per value.
+    """
+
+    _scalars = {
+        TAG_BYTE: struct.Struct(">b"),
+        TAG_SHORT: struct.Struct(">h"),
+        TAG_INT: struct.Struct(">i"),
+        TAG_LONG: struct.Struct(">q"),
+        TAG_FLOAT: struct.Struct(">f"),
+        TAG_DOUBLE: struct.Struct(">d"),
+    }
+    _arrays = {TAG_BYTE_ARRAY: ">i1", TAG_INT_ARRAY: ">i4", TAG_LONG_ARRAY: ">i8"}
+    _length = struct.Struct(">i")
+    _string_length = struct.Struct(">H")
+
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+        self._pos = 0
+
+    def read_root(self) -> dict:
+        tag_type = self._data[0]
+        if tag_type != TAG_COMPOUND:
+            raise ValueError(f"Expected root compound tag, got tag type {tag_type}.")
+        self._pos = 1
+        self._read_string()
+        return self._read_payload(TAG_COMPOUND)
+
+    def _read_string(self) -> str:
+        (length,) = self._string_length.unpack_from(self._data, self._pos)
+        start = self._pos + 2
+        self._pos = start + length
+        return self._data[start:self._pos].decode("utf-8", errors="replace")
+
+    def _read_payload(self, tag_type: int):
+        scalar = self._scalars.get(tag_type)
+        if scalar is not None:
+            (value,) = scalar.unpack_from(self._data, self._pos)
+            self._pos += scalar.size
+            return value
+
+        if tag_type == TAG_STRING:
+            return self._read_string()
+
+        if tag_type == TAG_COMPOUND:
+            return self._read_compound()
+
+        if tag_type == TAG_LIST:
+            return self._read_list()
+
+        dtype = self._arrays.get(tag_type)
+        if dtype is not None:
+            (length,) = self._length.unpack_from(self._data, self._pos)
+            self._pos += 4
+            array = np.frombuffer(self._data, dtype=dtype, count=length, offset=self._pos)
+            self._pos += length * array.itemsize
+            return array
+
+        raise ValueError(f"Unknown NBT tag type {tag_type} at offset {self._pos}.")
+
+    def _read_compound(self) -> dict:
+        # Names, strings and scalars are read inline: chunk trees are mostly small
+        # palette compounds, where the per-tag method calls would dominate
+        result = {}
+        data = self._data
+        scalars = self._scalars
+        pos = self._pos
+        while True:
+            child_type = data[pos]
+            if child_type == TAG_END:
+                self._pos = pos + 1
+                return result
+            length = (data[pos + 1] << 8) | data[pos + 2]
+            pos += 3
+            name = data[pos:pos + length].decode("utf-8", errors="replace")
+            pos += length
+
+            if child_type == TAG_STRING:
+                length = (data[pos] << 8) | data[pos + 1]
+                pos += 2
+                result[name] = data[pos:pos + length].decode("utf-8", errors="replace")
+                pos += length
+                continue
+            scalar = scalars.get(child_type)
+            if scalar is not None:
+                (result[name],) = scalar.unpack_from(data, pos)
+                pos += scalar.size
+                continue
+            self._pos = pos
+            result[name] = self._read_payload(child_type)
+            pos = self._pos
+
+    def _read_list(self) -> list:
+        data = self._data
+        child_type = data[self._pos]
+        (length,) = self._length.unpack_from(data, self._pos + 1)
+        self._pos += 5
+        if length <= 0:
+            return []
+
+        if child_type == TAG_STRING:
+            values = []
+            pos = self._pos
+            for _ in range(length):
+                size = (data[pos] << 8) | data[pos + 1]
+                pos += 2
+                values.append(data[pos:pos + size].decode("utf-8", errors="replace"))
+                pos += size
+            self._pos = pos
+            return values
+        scalar = self._scalars.get(child_type)
+        if scalar is not None:
+            values = [value for (value,) in scalar.iter_unpack(data[self._pos:self._pos + length * scalar.size])]
+            self._pos += length * scalar.size
+            return values
+        if child_type == TAG_COMPOUND:
+            return [self._read_compound() for _ in range(length)]
+        return [self._read_payload(child_type) for _ in range(length)]
+
+
+def parse_nbt(data: bytes) -> dict:
+    return NBTReader(data).read_root()
+
+
+def decompress_lz4_block_stream(data: bytes) -> bytes:
+    """
+    Decode the LZ4 framing written by lz4-java's ``LZ4BlockOutputStream``,
+    which is what Minecraft 1.20.5+ uses for compression type 4.
+    """
+    out = []
+    pos = 0
+    magic_len = len(_LZ4_BLOCK_MAGIC)
+    while pos + magic_len + 1 + _LZ4_BLOCK_HEADER.size <= len(data):
+        if data[pos:pos + magic_len] != _LZ4_BLOCK_MAGIC:
+            raise ValueError(f"Invalid LZ4 block magic at offset {pos}.")
+        token = data[pos + magic_len]
+        compressed_len, decompressed_len, _ = _LZ4_BLOCK_HEADER.unpack_from(data, pos + magic_len + 1)
+        pos += magic_len + 1 + _LZ4_BLOCK_HEADER.size
+        if decompressed_len == 0:
+            break
+        payload = data[pos:pos + compressed_len]
+        pos += compressed_len
+        if token & 0xF0 == 0x10:
+            out.append(payload)
+        else:
+            out.append(lz4.block.decompress(payload, uncompressed_size=decompressed_len))
+    return b"".join(out)
+
+
+def decompress_chunk(compression: int, payload: bytes) -> bytes:
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(payload)
+    if compression == COMPRESSION_GZIP:
+        return gzip.decompress(payload)
+    if compression == COMPRESSION_NONE:
+        return payload
+    if compression == COMPRESSION_LZ4:
+        return decompress_lz4_block_stream(payload)
+    raise ValueError(f"Unsupported chunk compression type {compression}.")
+
+
+class AnvilRegion:
+    """
+    Direct reader for a single ``r.<x>.<z>.mca`` file.
+
+    Chunk indices follow the region file layout, ``index = cx + cz * 32`` with
+    ``cx``/``cz`` being offsets inside the region.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._data = f.read()
+
+        if len(self._data) < 2 * SECTOR_SIZE:
+            self.locations = np.zeros(CHUNKS_PER_REGION, dtype=np.uint32)
+            self.timestamps = np.zeros(CHUNKS_PER_REGION, dtype=np.uint32)
+        else:
+            self.locations = np.frombuffer(self._data, dtype=">u4", count=CHUNKS_PER_REGION).astype(np.uint32)
+            self.timestamps = np.frombuffer(self._data, dtype=">u4", count=CHUNKS_PER_REGION, offset=SECTOR_SIZE).astype(np.uint32)
+
+        self.offsets = (self.locations >> 8) * SECTOR_SIZE
+        self.sector_counts = self.locations & 0xFF
+
+    @property
+    def present(self) -> np.array:
+        """(32, 32) boolean mask indexed as [cx, cz] of chunks stored in this region."""
+        return (self.locations != 0).reshape(32, 32).T
+
+    def raw_chunk(self, cx: int, cz: int) -> Optional[bytes]:
+        index = cx + cz * 32
+        if self.locations[index] == 0:
+            return None
+
+        offset = int(self.offsets[index])
+        if offset + 5 > len(self._data):
+            return None
+        (length,) = struct.unpack_from(">i", self._data, offset)
+        compression = self._data[offset + 4]
+
+        if compression & 0x80:
+            external = self.path.with_name(f"c.{self._region_coords[0] * 32 + cx}.{self._region_coords[1] * 32 + cz}.mcc")
+            if not external.is_file():
+                return None
+            return decompress_chunk(compression & 0x7F, external.read_bytes())
+
+        payload = self._data[offset + 5:offset + 4 + length]
+        return decompress_chunk(compression, payload)
+
+    def chunk_nbt(self, cx: int, cz: int) -> Optional[dict]:
+        raw = self.raw_chunk(cx, cz)
+        if raw is None:
+            return None
+        return parse_nbt(raw)
+
+    def iter_chunks(self) -> Generator[tuple, None, None]:
+        """Yield ``(cx, cz, nbt)`` for every chunk stored in the region."""
+        for index in np.flatnonzero(self.locations):
+            cx, cz = int(index % 32), int(index // 32)
+            try:
+                nbt = self.chunk_nbt(cx, cz)
+            except CHUNK_DECODE_ERRORS:
+                continue
+            if nbt is not None:
+                yield cx, cz, nbt
+
+    def data_version(self) -> int:
+        """DataVersion of the first readable chunk, 0 if there is none."""
+        for index in np.flatnonzero(self.locations):
+            try:
+                raw = self.raw_chunk(int(index % 32), int(index // 32))
+            except CHUNK_DECODE_ERRORS:
+                continue
+            if raw is not None:
+                return find_int_tag(raw, DATA_VERSION_TAG) or 0
+        return 0
+
+    def data_versions(self) -> Set[int]:
+        """DataVersions of all readable chunks."""
+        versions = set()
+        for index in np.flatnonzero(self.locations):
+            try:
+                raw = self.raw_chunk(int(index % 32), int(index // 32))
+            except CHUNK_DECODE_ERRORS:
+                continue
+            if raw is not None:
+                versions.add(find_int_tag(raw, DATA_VERSION_TAG) or 0)
+        return versions
+
+    @property
+    def _region_coords(self) -> tuple:
+        x, z = self.path.stem.split(".")[-2:]
+        return int(x), int(z)
+
+
+def read_region_locations(path: Path) -> np.array:
+    """Read only the location table of a region file, (1024,) uint32, 0 for absent chunks."""
+    with open(path, "rb") as f:
+        header = f.read(SECTOR_SIZE)
+    if len(header) < SECTOR_SIZE:
+        return np.zeros(CHUNKS_PER_REGION, dtype=np.uint32)
+    return np.frombuffer(header, dtype=">u4").astype(np.uint32)
+
+
+def unpack_longs(longs: np.array, bits: int, count: int, spanning: bool = False) -> np.array:
+    """
+    Unpack ``count`` ``bits``-wide unsigned values from a long-packed array.
+
+    Since 1.16 values never cross long boundaries, so every long holds
+    ``64 // bits`` values. Older versions pack them as one continuous bit stream.
+    """
+    words = np.asarray(longs).astype(">i8", copy=False).view(">u8").astype(np.uint64)
+
+    if not spanning and 8 % bits == 0:
+        # Widths dividing a byte (most block palettes, all small biome palettes)
+        # are split out of the little-endian bytes, on uint8 instead of uint64
+        octets = words.astype("<u8", copy=False).view(np.uint8)
+        shifts = np.arange(8 // bits, dtype=np.uint8) * np.uint8(bits)
+        values = (octets[:, None] >> shifts[None, :]) & np.uint8((1 << bits) - 1)
+        return values.reshape(-1)[:count]
+
+    if not spanning:
+        per_long = 64 // bits
+        shifts = np.arange(per_long, dtype=np.uint64) * np.uint64(bits)
+        mask = np.uint64((1 << bits) - 1)
+        values = (words[:, None] >> shifts[None, :]) & mask
+        return values.reshape(-1)[:count]
+
+    bit_stream = np.unpackbits(words.astype("<u8").view(np.uint8), bitorder="little")
+    bit_stream = bit_stream[:count * bits].reshape(count, bits).astype(np.uint64)
+    weights = np.uint64(1) << np.arange(bits, dtype=np.uint64)
+    return bit_stream @ weights
+
+
+def palette_bits(palette_size: int, minimum: int = 4) -> int:
+    return max(minimum, int(palette_size - 1).bit_length())
+
+
+def section_range(data_version: int) -> tuple:
+    """``(min_section, section_count)`` of the overworld for a chunk DataVersion."""
+    if data_version >= DATA_VERSION_1_18:
+        return -4, 24
+    return 0, 16
+
+
+def section_span(data_versions: Iterable[int]) -> tuple:
+    """
+    ``(min_section, section_count)`` covering chunks of all the given DataVersions,
+    a region that was only partly upgraded to 1.18+ holds both layouts.
+    """
+    ranges = {section_range(version) for version in data_versions} or {section_range(0)}
+    low = min(start for start, _ in ranges)
+    return low, max(start + count for start, count in ranges) - low
+
+
+class ChunkSections:
+    """Native view of the block sections of a decoded chunk NBT tree."""
+
+    def __init__(self, nbt: dict) -> None:
+        self.data_version = nbt.get("DataVersion", 0)
+        if "Level" in nbt:
+            self._root = nbt["Level"]
+            self._sections = self._root.get("Sections", [])
+        else:
+            self._root = nbt
+            self._sections = nbt.get("sections", [])
+
+    @property
+    def min_section(self) -> int:
+        return section_range(self.data_version)[0]
+
+    @property
+    def section_count(self) -> int:
+        return section_range(self.data_version)[1]
+
+    @property
+    def is_post_1_18(self) -> bool:
+        return self.data_version >= DATA_VERSION_1_18
+
+    def _block_data(self, section: dict) -> tuple:
+        if "block_states" in section:
+            states = section["block_states"]
+            return states.get("palette"), states.get("data")
+        return section.get("Palette"), section.get("BlockStates")
+
+    def iter_block_sections(self, y_range: tuple = None, decode_uniform: bool = True) -> Generator[tuple, None, None]:
+        """
+        Yield ``(section_y, palette, indices)`` for every section with block data.
+
+        ``indices`` is a (16, 16, 16) array in amulet's (x, y, z) sub-chunk order.
+        Sections outside the half-open ``y_range`` of section Y values are skipped
+        before decoding. Without ``decode_uniform`` sections with a single palette
+        entry yield None instead of an all-zero index array.
+        """
+        spanning = self.data_version < DATA_VERSION_1_16
+        for section in self._sections:
+            y = section.get("Y", 0)
+            if y_range is not None and not y_range[0] <= y < y_range[1]:
+                continue
+            palette, data = self._block_data(section)
+            if not palette:
+                continue
+
+            if len(palette) == 1 or data is None or len(data) == 0:
+                indices = np.zeros((16, 16, 16), dtype=np.uint16) if decode_uniform else None
+            else:
+                flat = unpack_longs(data, palette_bits(len(palette)), 4096, spanning)
+                indices = flat.astype(np.uint16).reshape(16, 16, 16).transpose(2, 0, 1)
+            yield y, palette, indices
+
+    def occupied_sections(self) -> Optional[tuple]:
+        """
+        Half-open range of section Y values holding anything but air, judged from
+        the palettes alone, or None for an empty chunk.
+        """
+        occupied = [
+            section.get("Y", 0)
+            for section in self._sections
+            if any(entry.get("Name", AIR_BLOCK) != AIR_BLOCK or entry.get("Properties") for entry in self._block_data(section)[0] or ())
+        ]
+        if not occupied:
+            return None
+        return min(occupied), max(occupied) + 1
+
+    def surface_height(self) -> Optional[int]:
+        """
+        Highest non-air block + 1 over all columns, counted from the bottom of the
+        world, read from the ``WORLD_SURFACE`` heightmap. None for chunks that are
+        not fully generated or have no heightmap.
+        """
+        if self._root.get("Status") not in FULL_STATUSES:
+            return None
+        data = self._root.get("Heightmaps", {}).get(SURFACE_HEIGHTMAP)
+        if data is None or len(data) == 0:
+            return None
+        bits = (self.section_count * 16).bit_length()
+        return int(unpack_longs(data, bits, 256, self.data_version < DATA_VERSION_1_16).max())
+
+    def biome_section(self, section: dict, decode_uniform: bool = True) -> Optional[tuple]:
+        biomes = section.get("biomes")
+        if not biomes or not biomes.get("palette"):
+            return None
+        palette = biomes["palette"]
+        data = biomes.get("data")
+        if len(palette) == 1 or data is None or len(data) == 0:
+            return palette, np.zeros((4, 4, 4), dtype=np.uint16) if decode_uniform else None
+        flat = unpack_longs(data, palette_bits(len(palette), minimum=1), 64)
+        return palette, flat.astype(np.uint16).reshape(4, 4, 4).transpose(2, 0, 1)
+
+    def iter_biome_sections(self, decode_uniform: bool = True) -> Generator[tuple, None, None]:
+        """
+        Yield ``(section_y, palette, indices)`` with (4, 4, 4) (x, y, z) biome cells
+        (1.18+ only). Without ``decode_uniform`` single-biome sections yield None.
+        """
+        for section in self._sections:
+            result = self.biome_section(section, decode_uniform)
+            if result is not None:
+                yield (section.get("Y", 0), *result)
+
+
+    def legacy_biomes(self) -> Optional[np.array]:
+        """
+        Numeric biome IDs of a pre-1.18 chunk in amulet's layout: (4, 4, N) (x, z, y)
+        cells from a 1.15+ array, the (16, 16) map of older ones. None if it has none.
+        """
+        biomes = self._root.get("Biomes")
+        if self.is_post_1_18 or biomes is None:
+            return None
+        biomes = np.asarray(biomes)
+        if biomes.size == 256:
+            return biomes.reshape(16, 16)
+        if biomes.size == 0 or biomes.size % 64:
+            return None
+        return biomes.reshape(-1, 4, 4).transpose(2, 1, 0)
+
+
+def find_long_tag(raw: bytes, tag: bytes) -> Optional[int]:
+    """
+    Read a named TAG_Long straight from an uncompressed NBT payload without parsing it.
+
+    ``tag`` is the tag header (type byte, name length and name), the first match wins.
+    """
+    pos = raw.find(tag)
+    if pos < 0 or pos + len(tag) + 8 > len(raw):
+        return None
+    (value,) = struct.unpack_from(">q", raw, pos + len(tag))
+    return value
+
+
+def find_int_tag(raw: bytes, tag: bytes) -> Optional[int]:
+    pos = raw.find(tag)
+    if pos < 0 or pos + len(tag) + 4 > len(raw):
+        return None
+    (value,) = struct.unpack_from(">i", raw, pos + len(tag))
+    return value
+
+
+def region_inhabited_times(path: Path) -> np.array:
+    """
+    InhabitedTime of every chunk of a region as a (32, 32) int64 array indexed [cx, cz].
+
+    Chunks that are not stored or cannot be decoded are -1.
+    """
+    region = AnvilRegion(path)
+    data = np.full((32, 32), -1, dtype=np.int64)
+
+    for index in np.flatnonzero(region.locations):
+        cx, cz = int(index % 32), int(index // 32)
+        try:
+            raw = region.raw_chunk(cx, cz)
+        except CHUNK_DECODE_ERRORS:
+            continue
+        if raw is None:
+            continue
+        value = find_long_tag(raw, INHABITED_TIME_TAG)
+        data[cx, cz] = value if value is not None else 0
+
+    return data
@@ -0,0 +1,253 @@
+from pathlib import Path
+from typing import Callable, Dict, List
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+import psutil
+from pympler import asizeof
+import registry
+from synthetic_world import FORMATS, generate_world
+
+BASELINE_FILE = Path(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "benchmarks", "baseline.json")))
+
+STAGES = ("native_region", "amulet_region", "to_global_ids", "native_to_global_ids", "mca_inhabited_times", "trim_y_axis")
+# Differences below these are noise, whatever the relative change
+MIN_TIME_DELTA = 0.005
+MIN_RSS_DELTA_MB = 16
+
+
+class RssSampler:
+    """Polls the resident set size from a background thread and keeps the peak."""
+
+    def __init__(self, interval: float = 0.002) -> None:
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self) -> "RssSampler":
+        self.start = self.peak = self.process.memory_info().rss
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+    @property
+    def growth_mb(self) -> float:
+        return (self.peak - self.start) / 2 ** 20
+
+
+def retained_mb(obj) -> float:
+    """Size of a stage result; arrays count their whole base buffer, everything else goes through pympler."""
+    if isinstance(obj, (list, tuple)):
+        return sum(retained_mb(item) for item in obj)
+    if isinstance(obj, np.ndarray):
+        while isinstance(obj.base, np.ndarray):
+            obj = obj.base
+        return obj.nbytes / 2 ** 20
+    return asizeof.asizeof(obj) / 2 ** 20
+
+
+def measure(fn: Callable, repeats: int = 3, setup: Callable = None) -> dict:
+    """
+    Time ``fn(setup())`` ``repeats`` times after one warm-up call.
+
+    Peak RSS growth over the process RSS before each call is sampled, and the
+    retained size of the result is measured with pympler.
+    """
+    args = setup() if setup else None
+    result = fn(args) if setup else fn()
+
+    times, growth = [], []
+    for _ in range(repeats):
+        args = setup() if setup else None
+        with RssSampler() as rss:
+            start = time.perf_counter()
+            result = fn(args) if setup else fn()
+            times.append(time.perf_counter() - start)
+        growth.append(rss.growth_mb)
+
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "peak_rss_mb": max(growth),
+        "result_mb": retained_mb(result),
+    }
+
+
+def _sub_chunks(world, region: tuple) -> tuple:
+    """Every amulet sub-chunk array of a region plus the level block palette, loaded outside the timed code."""
+    from region_extractor import WorldWrapper
+
+    arrays = []
+    level = world._world
+    for rx in range(32):
+        for rz in range(32):
+            coords = WorldWrapper.to_chunk_coords(region[0], region[1], rx, rz)
+            try:
+                chunk = level.get_chunk(coords["x"], coords["z"], "minecraft:overworld")
+            except Exception:
+                continue
+            arrays.extend(np.asarray(chunk.blocks.get_sub_chunk(y)) for y in sorted(chunk.blocks.sections))
+    return arrays, level.block_palette
+
+
+def _native_sections(world, region: tuple) -> list:
+    from anvil_reader import AnvilRegion, ChunkSections
+
+    sections = []
+    for _, _, nbt in AnvilRegion(world._mca_coord_to_path[region]).iter_chunks():
+        chunk = ChunkSections(nbt)
+        sections.extend((palette, indices, chunk.data_version) for _, palette, indices in chunk.iter_block_sections())
+    return sections
+
+
+def run_format(fmt: str, workdir: Path, args: argparse.Namespace) -> Dict[str, dict]:
+    from region_extractor import BlockStates, WorldWrapper
+
+    world_path = generate_world(
+        workdir / f"world_{fmt}",
+        fmt,
+        regions=[(x, 0) for x in range(args.regions)],
+        density=args.density,
+        palette_size=args.palette_size,
+        filled_sections=tuple(args.sections),
+        fill=args.fill,
+        seed=args.seed,
+    )
+    world = WorldWrapper(world_path)
+    region = (0, 0)
+    regions = sorted(world.mca_coords)
+    stages = [s for s in args.stages if s in STAGES]
+    results = {}
+
+    def fresh_blockstates():
+        return BlockStates(registry=registry.Registry("blockstates"))
+
+    def reopened_world():
+        # amulet keeps every chunk it loaded in an in-memory cache until the level is
+        # closed, a fresh handle makes both paths read the .mca files again
+        world.close()
+        return world._world
+
+    try:
+        for stage in stages:
+            if stage == "native_region":
+                result = measure(lambda _: [world.get_region_volume_native(*r) for r in regions], args.repeats, setup=reopened_world)
+            elif stage == "amulet_region":
+                result = measure(lambda _: [world.get_region_volume(*r) for r in regions], args.repeats, setup=reopened_world)
+            elif stage == "to_global_ids":
+                arrays, palette = _sub_chunks(world, region)
+                result = measure(lambda bs: [bs.to_global_ids(a, palette) for a in arrays], args.repeats, setup=fresh_blockstates)
+            elif stage == "native_to_global_ids":
+                sections = _native_sections(world, region)
+                result = measure(lambda bs: [bs.native_to_global_ids(i, p, v) for p, i, v in sections], args.repeats, setup=fresh_blockstates)
+            elif stage == "mca_inhabited_times":
+                result = measure(lambda: [world.mca_inhabited_times(*r) for r in regions], args.repeats)
+            else:
+                volume, _ = world.get_region_volume_native(*region)
+                padded = np.zeros((512, 512, 384), dtype=np.uint16)
+                padded[:, :, 64:64 + volume.shape[2]] = volume
+                result = measure(lambda: world._trim_y_axis(padded), args.repeats)
+
+            results[f"{fmt}/{stage}"] = result
+            print(f"{fmt:>5} {stage:<22} {result['median_s'] * 1000:10.1f} ms  (min {result['min_s'] * 1000:.1f})  peak +{result['peak_rss_mb']:.0f} MB")
+    finally:
+        world.close()
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Stages whose median time or peak RSS grew by more than ``threshold`` over the baseline."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        slower = result["median_s"] - base["median_s"]
+        if slower > MIN_TIME_DELTA and result["median_s"] > base["median_s"] * (1 + threshold):
+            regressions.append(f"{key}: {base['median_s'] * 1000:.1f} ms -> {result['median_s'] * 1000:.1f} ms")
+        grown = result["peak_rss_mb"] - base["peak_rss_mb"]
+        if grown > MIN_RSS_DELTA_MB and result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold):
+            regressions.append(f"{key}: peak RSS {base['peak_rss_mb']:.0f} MB -> {result['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the extraction hot paths on synthetic worlds.")
+    parser.add_argument("--formats", nargs="+", default=["1.20", "1.16"], choices=list(FORMATS))
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--regions", type=int, default=1, help="Regions per synthetic world.")
+    parser.add_argument("--density", type=float, default=0.25, help="Fraction of the 1024 chunks per region that exist.")
+    parser.add_argument("--palette-size", type=int, default=16, help="Block palette size per section, air included.")
+    parser.add_argument("--sections", type=int, nargs=2, default=[0, 4], metavar=("LOW", "HIGH"), help="Section Y range holding blocks.")
+    parser.add_argument("--fill", type=float, default=0.7, help="Fraction of non-air blocks in filled sections.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument("--check", action="store_true", help="Fail when there is no baseline to compare against, e.g. in CI.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown before failing.")
+    parser.add_argument("--output", type=Path, default=None, help="Also write the results as JSON.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="mc_bench_") as tmp:
+        workdir = Path(tmp)
+        # Synthetic block states must not end up in the real registry
+        registry.ASSETS_DIR = workdir / "registry"
+
+        results = {}
+        for fmt in args.formats:
+            results.update(run_format(fmt, workdir, args))
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k in ("formats", "regions", "density", "palette_size", "sections", "fill", "seed", "repeats")},
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --save-baseline first.")
+        return 1 if args.check else 0
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("config") != report["config"]:
+        print("Warning: baseline was recorded with a different configuration.")
+    regressions = compare(results, baseline["results"], args.threshold)
+    for line in regressions:
+        print(f"[REGRESSION] {line}")
+    if not regressions:
+        print(f"No regressions above {args.threshold:.0%} against {args.baseline}.")
+    unchecked = [key for key in results if key not in baseline["results"]] if args.check else []
+    for key in unchecked:
+        print(f"[NO BASELINE] {key}")
+    return 1 if regressions or unchecked else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
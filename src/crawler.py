@@ -1,33 +1,64 @@
 import os
 import json
 import time
-import csv
-import random
 import signal
 import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from http_fetch import HttpFetcher
+from instrumentation import metrics
+from pmc_html import is_challenge_page, parse_listing
+from rate_limiter import AdaptiveRateLimiter, Throttled
+from result_sink import open_sink
 
 ASSETS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "assets"))
 STATE_FILE = os.path.join(ASSETS_DIR, "crawl_state.json")
+REFRESH_STATE_FILE = os.path.join(ASSETS_DIR, "crawl_refresh_state.json")
 RESULTS_FILE = os.path.join(ASSETS_DIR, "pmc_data.csv")
+HISTORY_FILE = os.path.join(ASSETS_DIR, "pmc_counter_history.csv")
+REFRESH_QUEUE_FILE = os.path.join(ASSETS_DIR, "pmc_refresh_queue.csv")
 CHROME_PROFILE_PATH = os.path.join(os.getcwd(), "..", "tmp","pmc_profile")
+COOKIES_FILE = os.path.join(ASSETS_DIR, "pmc_cookies.json")
+
+BASE_URL = "https://www.planetminecraft.com"
+LISTING_PATH = "/projects/?mode=advanced&share%5B%5D=world_link&platform=1&monetization%5B%5D=0&monetization%5B%5D=1&time_machine=y-{year}&order=order_downloads&p={page}"
 
 
 YEARS_TO_SCRAPE = [2017, 2018, 2019, 2020, 2021, 2022, 2023, 2024, 2025, 2026]
+COUNTER_FIELDS = ("views", "downloads", "comments", "diamonds", "favorites")
 
 class Crawler:
-    def __init__(self):
+    # backend="http" fetches listing pages over a pooled HTTP session and only falls back
+    # to Chrome on challenge pages, "selenium" always uses Chrome.
+    # base_url can point at a local fixture server, limiter can be shared with other crawlers.
+    # results_file can be a .csv, .parquet or .sqlite file.
+    # mode="incremental" revisits the listings of known projects: changed counters are updated
+    # and snapshotted, projects whose update date moved are queued for DetailCrawler(refresh=True).
+    # A year is left early after stale_pages pages in a row without any change.
+    def __init__(self, backend="http", base_url=BASE_URL, limiter=None, results_file=RESULTS_FILE, mode="full", stale_pages=3):
+        if mode not in ("full", "incremental"):
+            raise ValueError(f"Unknown crawl mode '{mode}'.")
         self.running = True
-        self.processed_urls = set()
+        self.mode = mode
+        self.stale_pages = stale_pages
+        self.state_file = REFRESH_STATE_FILE if mode == "incremental" else STATE_FILE
+        self.backend = backend
+        self.base_url = base_url.rstrip("/")
+        self.driver = None
+        self.limiter = limiter or AdaptiveRateLimiter()
         
         if not os.path.exists(ASSETS_DIR):
             os.makedirs(ASSETS_DIR)
             print(f"Created directory: {ASSETS_DIR}")
             
         self.state = self.load_initial_state()
-        self.load_processed_from_csv()
+        self.results = open_sink(results_file, "url")
+        self.history = open_sink(HISTORY_FILE, "snapshot")
+        self.refresh_queue = open_sink(REFRESH_QUEUE_FILE, "id")
+        print(f"Deduped {len(self.results)} records.")
+        # Stored listing rows to diff against, only needed when refreshing
+        self.stored = {row["url"]: row for row in self.results.rows()} if mode == "incremental" else {}
+        self.fetcher = HttpFetcher(COOKIES_FILE)
         
         signal.signal(signal.SIGINT, self.handle_exit)
 
@@ -36,117 +67,211 @@ class Crawler:
         self.running = False
 
     def load_initial_state(self):
-        if os.path.exists(STATE_FILE):
+        if os.path.exists(self.state_file):
             try:
-                with open(STATE_FILE, 'r') as f:
+                with open(self.state_file, 'r') as f:
                     return json.load(f)
             except: pass
         return {"year_idx": 0, "page": 1}
 
-    def load_processed_from_csv(self):
-        if os.path.exists(RESULTS_FILE):
-            print(f"Loading previous results from {RESULTS_FILE}...")
-            with open(RESULTS_FILE, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    self.processed_urls.add(row['url'])
-            print(f"Deduped {len(self.processed_urls)} records.")
-
     def save_progress(self, y_idx, p_num):
-        with open(STATE_FILE, 'w') as f:
+        # Rows of the finished page must be on disk before the cursor moves past it
+        self.results.flush()
+        self.history.flush()
+        self.refresh_queue.flush()
+        with open(self.state_file, 'w') as f:
             json.dump({"year_idx": y_idx, "page": p_num}, f)
 
-    def get_safe_text(self, parent, selector, attr=None):
+    def listing_url(self, year, page):
+        return self.base_url + LISTING_PATH.format(year=year, page=page)
+
+    def get_driver(self):
+        if self.driver is None:
+            options = uc.ChromeOptions()
+            options.add_argument(f"--user-data-dir={CHROME_PROFILE_PATH}")
+            self.driver = uc.Chrome(options=options)
+        return self.driver
+
+    def fetch_with_browser(self, url):
+        driver = self.get_driver()
+        with metrics.timer("page_load"):
+            driver.get(url)
+        # Challenge pages solve themselves in a real browser after a few seconds
+        with metrics.timer("wait"):
+            WebDriverWait(driver, 30).until(lambda d: not is_challenge_page(d.page_source))
+        html = driver.page_source
+        # Share the clearance cookies with the HTTP session so the next pages skip the browser
+        self.fetcher.export_driver_cookies(driver)
+        return html
+
+    def fetch_listing(self, url):
+        if self.backend == "http":
+            with metrics.timer("sleep"):
+                self.limiter.acquire(url)
+            start = time.monotonic()
+            with metrics.timer("page_load"):
+                try:
+                    status, html = self.fetcher.fetch(url)
+                except Throttled as e:
+                    self.limiter.throttled(url, e.retry_after)
+                    raise
+            challenge = is_challenge_page(html, status)
+            if status < 400 and not challenge:
+                self.limiter.success(url, time.monotonic() - start)
+                return html
+            self.limiter.failure(url, challenge=challenge)
+            if not challenge:
+                raise RuntimeError(f"HTTP {status}")
+            print(f"Challenge page detected (HTTP {status}), falling back to the browser...")
+            metrics.count("browser_fallbacks")
+
+        with metrics.timer("sleep"):
+            self.limiter.acquire(url)
+        start = time.monotonic()
         try:
-            el = parent.find_element(By.CSS_SELECTOR, selector)
-            return el.get_attribute(attr) if attr else el.text.strip()
-        except:
-            return "0" if "num" in selector or "span" in selector else ""
+            html = self.fetch_with_browser(url)
+        except TimeoutException:
+            self.limiter.failure(url, challenge=True)
+            raise
+        self.limiter.success(url, time.monotonic() - start)
+        return html
+
+    def record_snapshot(self, data):
+        snapshot = {"snapshot": f"{data['id']}@{data['scraped_timestamp']}", "id": data["id"], "url": data["url"]}
+        snapshot.update({field: data[field] for field in COUNTER_FIELDS})
+        snapshot["scraped_timestamp"] = data["scraped_timestamp"]
+        self.history.add(snapshot)
+
+    # Returns whether anything about an already known project changed
+    def refresh_item(self, data):
+        old = self.stored.get(data["url"], {})
+        counters_changed = any(str(old.get(field, "")) != str(data[field]) for field in COUNTER_FIELDS)
+        # Rows from before updated_date was collected only know the publish date
+        old_updated = old.get("updated_date") or old.get("published_date", "")
+        updated = bool(data["updated_date"]) and data["updated_date"] != old_updated
+
+        if not counters_changed and not updated:
+            return False
+
+        self.results.add(data)
+        self.stored[data["url"]] = data
+        self.record_snapshot(data)
+        if updated:
+            self.refresh_queue.add({
+                "id": data["id"],
+                "url": data["url"],
+                "title": data["title"],
+                "updated_date": data["updated_date"],
+                "queued_at": data["scraped_timestamp"],
+            })
+        return True
 
     def run(self):
         y_idx = self.state["year_idx"]
         p_num = self.state["page"]
+        attempt = 0
+        quiet_pages = 0
+        refreshed = 0
 
-        options = uc.ChromeOptions()
-        options.add_argument(f"--user-data-dir={CHROME_PROFILE_PATH}")
-        driver = uc.Chrome(options=options)
-        
         try:
             while y_idx < len(YEARS_TO_SCRAPE) and self.running:
                 year = YEARS_TO_SCRAPE[y_idx]
-                url = f"https://www.planetminecraft.com/projects/?mode=advanced&share%5B%5D=world_link&platform=1&monetization%5B%5D=0&monetization%5B%5D=1&time_machine=y-{year}&order=order_downloads&p={p_num}"
+                page = p_num
+                url = self.listing_url(year, page)
                 
-                print(f"--- [Year: {year}] [Page: {p_num}] [Unique: {len(self.processed_urls)}] ---")
-                driver.get(url)
+                print(f"--- [Year: {year}] [Page: {p_num}] [Unique: {len(self.results)}] [Refreshed: {refreshed}] ---")
                 
                 try:
-                    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-                    time.sleep(random.uniform(2.5, 4.0)) 
-                    
-                    items = driver.find_elements(By.CSS_SELECTOR, "li.resource[data-type='resource']")
+                    html = self.fetch_listing(url)
+                    with metrics.timer("dom_extract"):
+                        items, has_next = parse_listing(html, url)
+                    attempt = 0
                     
                     if not items:
                         print(f"Year {year} appears exhausted.")
                         y_idx += 1
                         p_num = 1
-                        self.save_progress(y_idx, p_num)
+                        quiet_pages = 0
+                        with metrics.timer("write"):
+                            self.save_progress(y_idx, p_num)
+                        metrics.emit("page", crawler="listing", url=url, year=year, page=page, items=0)
                         continue
 
+                    changed = 0
                     for item in items:
                         if not self.running: break
-                        
-                        try:
-                            title_el = item.find_element(By.CSS_SELECTOR, "a.r-title")
-                            href = title_el.get_attribute("href")
-                            
-                            if href in self.processed_urls: continue
-
-                            data = {
-                                "id": item.get_attribute("data-id"),
-                                "year_filter": year,
-                                "title": title_el.text.strip(),
-                                "url": href,
-                                "category": self.get_safe_text(item, ".r-subject"),
-                                "creator": self.get_safe_text(item, ".activity_name"),
-                                "creator_id": self.get_safe_text(item, ".activity_name", "data-mid"),
-                                "views": self.get_safe_text(item, "i.visibility + span"),
-                                "downloads": self.get_safe_text(item, "i.get_app + span"),
-                                "comments": self.get_safe_text(item, "i.chat_bubble + span"),
-                                "diamonds": self.get_safe_text(item, ".c-num-votes"),
-                                "favorites": self.get_safe_text(item, ".c-num-favs"),
-                                "published_date": self.get_safe_text(item, ".contributed abbr.timeago", "title"),
-                                "scraped_timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-                            }
-
-                            file_exists = os.path.isfile(RESULTS_FILE)
-                            with open(RESULTS_FILE, 'a', newline='', encoding='utf-8') as f:
-                                writer = csv.DictWriter(f, fieldnames=data.keys())
-                                if not file_exists: writer.writeheader()
-                                writer.writerow(data)
-                            
-                            self.processed_urls.add(href)
-                        except: continue
-
-                    try:
-                        driver.find_element(By.CSS_SELECTOR, "a.pagination_next")
+
+                        data = {
+                            "id": item["id"],
+                            "year_filter": year,
+                            "title": item["title"],
+                            "url": item["url"],
+                            "category": item["category"],
+                            "creator": item["creator"],
+                            "creator_id": item["creator_id"],
+                            "views": item["views"],
+                            "downloads": item["downloads"],
+                            "comments": item["comments"],
+                            "diamonds": item["diamonds"],
+                            "favorites": item["favorites"],
+                            "published_date": item["published_date"],
+                            "scraped_timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                            "updated_date": item["updated_date"],
+                        }
+
+                        with metrics.timer("write"):
+                            if data["url"] not in self.results:
+                                self.results.add(data)
+                                self.record_snapshot(data)
+                                changed += 1
+                            elif self.mode == "incremental" and self.refresh_item(data):
+                                changed += 1
+                                refreshed += 1
+
+                    if not self.running: break
+                    quiet_pages = 0 if changed else quiet_pages + 1
+                    stale = self.mode == "incremental" and quiet_pages >= self.stale_pages
+
+                    if has_next and not stale:
                         p_num += 1
-                        self.save_progress(y_idx, p_num)
-                        time.sleep(random.uniform(4.0, 7.0))
-                    except:
-                        print(f"End of Year {year}. Advancing...")
+                    else:
+                        if stale:
+                            print(f"No changes on the last {quiet_pages} pages of {year}. Advancing...")
+                        else:
+                            print(f"End of Year {year}. Advancing...")
                         y_idx += 1
                         p_num = 1
+                        quiet_pages = 0
+                    with metrics.timer("write"):
                         self.save_progress(y_idx, p_num)
+                    metrics.emit("page", crawler="listing", url=url, year=year, page=page, items=len(items), changed=changed)
 
                 except Exception as e:
                     if not self.running: break
-                    print(f"Network or Page Error: {e}. Sleeping 10s...")
-                    time.sleep(10)
+                    attempt += 1
+                    print(f"Network or Page Error: {e}. Backing off (attempt {attempt})...")
+                    with metrics.timer("sleep"):
+                        self.limiter.backoff(attempt, getattr(e, "retry_after", None))
+                    metrics.emit("page", crawler="listing", url=url, year=year, page=page, error=str(e))
+
+            # A finished refresh starts from the first year again next time
+            if self.mode == "incremental" and y_idx >= len(YEARS_TO_SCRAPE) and os.path.exists(self.state_file):
+                os.remove(self.state_file)
 
         finally:
-            if driver: driver.quit()
+            if self.driver: self.driver.quit()
+            self.fetcher.close()
+            self.results.close()
+            self.history.close()
+            self.refresh_queue.close()
+            print(self.limiter.summary())
+            if metrics.enabled:
+                print(metrics.summary())
             print(f"\n[Done] Assets updated in: {ASSETS_DIR}")
 
 if __name__ == "__main__":
-    crawler = Crawler()
-    crawler.run()
+    import sys
+    # Stage timings are written when MC_METRICS names a .jsonl file, MC_PROFILE a directory for cProfile dumps
+    crawler = Crawler(mode="incremental" if "--incremental" in sys.argv else "full")
+    with metrics.profiled("crawler"):
+        crawler.run()
@@ -1,31 +1,100 @@
 import os
 import json
 import time
-import csv
-import random
 import signal
 import re
+import threading
+from queue import Queue, Empty
 import undetected_chromedriver as uc
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from instrumentation import metrics
+from pmc_html import is_challenge_page, parse_details
+from rate_limiter import AdaptiveRateLimiter
+from result_sink import open_sink
 
 ASSETS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "assets"))
 INPUT_FILE = os.path.join(ASSETS_DIR, "pmc_data.csv")
 RESULTS_FILE = os.path.join(ASSETS_DIR, "pmc_details_deep.csv")
 STATE_FILE = os.path.join(ASSETS_DIR, "detail_crawl_state.json")
+REFRESH_QUEUE_FILE = os.path.join(ASSETS_DIR, "pmc_refresh_queue.csv")
+LIST_FIELDS = ("gallery_urls", "download_mirrors")
 CHROME_PROFILE_PATH = os.path.join(os.getcwd(), "..", "tmp","pmc_profile")
 
+# Collects every detail field in one round-trip to chromedriver.
+# Must stay in sync with pmc_html.parse_details, which reads the same fields from page_source.
+DETAIL_SCRIPT = """
+const oneLine = (t) => (t || "").replace(/\\s+/g, " ").trim();
+const text = (sel, dflt) => { const el = document.querySelector(sel); return el ? oneLine(el.innerText) : dflt; };
+
+const crumbs = document.querySelectorAll(".post_context a");
+let progress = "Unknown";
+for (const row of document.querySelectorAll("table.resource-info tr")) {
+    if (row.innerText.includes("Progress")) {
+        const cell = row.querySelector("td");
+        progress = cell ? oneLine(cell.innerText) : "Unknown";
+        break;
+    }
+}
+const images = Array.from(document.querySelectorAll("#light-gallery a.rsImg"))
+    .filter(a => a.getAttribute("href")).map(a => a.href);
+const dates = Array.from(document.querySelectorAll(".post_date abbr")).map(a => a.getAttribute("title") || "");
+const mirrors = Array.from(document.querySelectorAll("ul.content-actions li a"))
+    .filter(a => a.getAttribute("href") && (a.href.includes("download") || a.href.includes("mirror")))
+    .map(a => ({name: oneLine(a.innerText), url: a.href}));
+
+return {
+    author_id: text("#author_id", "Unknown"),
+    category: crumbs.length > 1 ? oneLine(crumbs[1].innerText) : "Unknown",
+    platform: text(".platform", "Unknown"),
+    progress: progress,
+    description: text("#r-text-block", ""),
+    gallery_urls: images,
+    download_mirrors: mirrors,
+    date_published: dates.length >= 2 ? dates[1] : "",
+    date_updated: dates.length >= 1 ? dates[0] : "",
+};
+"""
+
+EXTRACTION_MODES = ("script", "source", "webdriver")
+MAX_ATTEMPTS = 3
+# A browser that does not start is a local problem, it is not held against the project
+DRIVER_START_ATTEMPTS = 3
+
 class DetailCrawler:
-    def __init__(self):
+    # extraction: "script" pulls all fields with one execute_script call,
+    # "source" parses driver.page_source locally, "webdriver" is the old per-element lookup.
+    # workers: number of browsers pulling projects from a shared queue,
+    # limiter paces requests per host over all workers and can be shared with the Crawler.
+    # driver_factory(worker_id) can replace Chrome, e.g. to test against a stub server.
+    # Input and results can be .csv, .parquet or .sqlite files.
+    # refresh=True re-scrapes the projects an incremental Crawler run queued because their update date moved.
+    def __init__(self, extraction="script", workers=4, limiter=None, driver_factory=None,
+                 input_file=INPUT_FILE, results_file=RESULTS_FILE, state_file=STATE_FILE, refresh=False):
+        if extraction not in EXTRACTION_MODES:
+            raise ValueError(f"Unknown extraction mode '{extraction}'.")
         self.running = True
-        self.processed_ids = set()
+        self.extraction = extraction
+        self.refresh = refresh
+        self.completed = 0
+        self.workers = workers
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.driver_factory = driver_factory or self.create_driver
+        self.input_file = input_file
+        self.results_file = results_file
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.driver_lock = threading.Lock()
         
         if not os.path.exists(ASSETS_DIR):
             os.makedirs(ASSETS_DIR)
 
         self.state = self.load_state()
-        self.load_processed_ids()
+        self.results = open_sink(results_file, "id", list_fields=LIST_FIELDS)
+        if len(self.results):
+            print(f"Resuming: {len(self.results)} records already detailed.")
         
         signal.signal(signal.SIGINT, self.handle_exit)
 
@@ -33,25 +102,28 @@ class DetailCrawler:
         print("\n[!] Exit signal received. Saving state...")
         self.running = False
 
+    # Completion is tracked per ID through the results file, the state only keeps failed attempts
     def load_state(self):
-        if os.path.exists(STATE_FILE):
+        if os.path.exists(self.state_file):
             try:
-                with open(STATE_FILE, 'r') as f:
-                    return json.load(f)
+                with open(self.state_file, 'r') as f:
+                    state = json.load(f)
+                return {"attempts": state.get("attempts", {})}
             except: pass
-        return {"last_processed_index": 0}
+        return {"attempts": {}}
 
-    def save_state(self, index):
-        with open(STATE_FILE, 'w') as f:
-            json.dump({"last_processed_index": index}, f)
+    def save_state(self):
+        tmp_file = self.state_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_file, self.state_file)
 
-    def load_processed_ids(self):
-        if os.path.exists(RESULTS_FILE):
-            with open(RESULTS_FILE, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    self.processed_ids.add(row['id'])
-            print(f"Resuming: {len(self.processed_ids)} records already detailed.")
+    def record_failure(self, p_id):
+        with self.lock:
+            attempts = self.state["attempts"].get(p_id, 0) + 1
+            self.state["attempts"][p_id] = attempts
+            self.save_state()
+        return attempts
 
     def clean_one_line(self, text):
         if not text: return ""
@@ -66,6 +138,20 @@ class DetailCrawler:
             return default
 
     def extract_deep_data(self, driver, project_id):
+        if self.extraction == "script":
+            fields = driver.execute_script(DETAIL_SCRIPT)
+        elif self.extraction == "source":
+            fields = parse_details(driver.page_source, driver.current_url)
+        else:
+            return self.extract_with_webdriver(driver, project_id)
+
+        return {
+            "id": project_id,
+            **fields,
+            "scraped_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+    def extract_with_webdriver(self, driver, project_id):
         # 1. Map Category (Breadcrumbs)
         # Targeted: The second link in the post_context div
         try:
@@ -120,7 +206,7 @@ class DetailCrawler:
             m_url = m.get_attribute("href")
             m_name = self.clean_one_line(m.text)
             if m_url and ("download" in m_url or "mirror" in m_url):
-                mirrors.append(f"{m_name} ({m_url})")
+                mirrors.append({"name": m_name, "url": m_url})
 
         return {
             "id": project_id,
@@ -129,68 +215,164 @@ class DetailCrawler:
             "platform": platform,
             "progress": project_progress,
             "description": description,
-            "gallery_urls": " | ".join(images),
-            "download_mirrors": " | ".join(mirrors),
+            "gallery_urls": images,
+            "download_mirrors": mirrors,
             "date_published": published_date,
             "date_updated": updated_date,
             "scraped_at": time.strftime("%Y-%m-%d %H:%M:%S")
         }
 
-    def run(self):
-        if not os.path.exists(INPUT_FILE):
-            print(f"Error: {INPUT_FILE} not found. Please run the main crawler first.")
-            return
+    def create_driver(self, worker_id):
+        # Every worker gets its own profile, Chrome refuses to share one between instances
+        profile = CHROME_PROFILE_PATH if worker_id == 0 else f"{CHROME_PROFILE_PATH}_{worker_id}"
+        options = uc.ChromeOptions()
+        options.add_argument(f"--user-data-dir={profile}")
+        # uc patches the chromedriver binary on startup, which races between threads
+        with self.driver_lock:
+            return uc.Chrome(options=options)
 
-        # Load original CSV items
-        with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-            items = list(csv.DictReader(f))
+    def start_driver(self, worker_id):
+        """The worker's browser, or None when it does not start after DRIVER_START_ATTEMPTS tries."""
+        for attempt in range(1, DRIVER_START_ATTEMPTS + 1):
+            try:
+                with metrics.timer("driver_start"):
+                    return self.driver_factory(worker_id)
+            except Exception as e:
+                print(f"[W{worker_id}] Could not start the browser (attempt {attempt}/{DRIVER_START_ATTEMPTS}): {e}")
+                metrics.emit("driver_start", crawler="details", worker=worker_id, error=str(e), attempts=attempt)
+                if attempt == DRIVER_START_ATTEMPTS or not self.running:
+                    return None
+                with metrics.timer("sleep"):
+                    self.limiter.backoff(attempt)
 
-        options = uc.ChromeOptions()
-        options.add_argument(f"--user-data-dir={CHROME_PROFILE_PATH}")
-        driver = uc.Chrome(options=options)
-        
-        start_idx = self.state["last_processed_index"]
+    def scrape(self, driver, project):
+        url = project['url']
+        with metrics.timer("sleep"):
+            self.limiter.acquire(url)
+        start = time.monotonic()
+        try:
+            with metrics.timer("page_load"):
+                driver.get(url)
+            with metrics.timer("wait"):
+                WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.ID, "resource_object")))
+        except Exception:
+            try: challenge = is_challenge_page(driver.page_source)
+            except: challenge = False
+            self.limiter.failure(url, challenge=challenge)
+            raise
+        self.limiter.success(url, time.monotonic() - start)
+        with metrics.timer("dom_extract"):
+            return self.extract_deep_data(driver, project['id'])
 
+    def worker_loop(self, worker_id, queue, total):
+        driver = None
         try:
-            for i in range(start_idx, len(items)):
-                if not self.running: break
-                
-                project = items[i]
+            while self.running:
+                try:
+                    project = queue.get_nowait()
+                except Empty:
+                    break
+
                 p_id = project['id']
                 url = project['url']
+                if driver is None:
+                    driver = self.start_driver(worker_id)
+                    if driver is None:
+                        # The project was never tried, it stays queued for the other workers
+                        queue.put(project)
+                        print(f"[W{worker_id}] Stopping, the browser does not start.")
+                        break
 
-                if p_id in self.processed_ids:
-                    continue
-
-                print(f"[{i+1}/{len(items)}] Scraping Details: {project['title']}...")
-                
                 try:
-                    driver.get(url)
-                    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.ID, "resource_object")))
-                    time.sleep(random.uniform(3.5, 6.0)) # Polite delay
-
-                    deep_data = self.extract_deep_data(driver, p_id)
-                    
-                    # Merge with some original data for reference if needed, 
-                    # but here we just write the detail row
-                    file_exists = os.path.isfile(RESULTS_FILE)
-                    with open(RESULTS_FILE, 'a', newline='', encoding='utf-8') as f:
-                        writer = csv.DictWriter(f, fieldnames=deep_data.keys())
-                        if not file_exists: writer.writeheader()
-                        writer.writerow(deep_data)
-
-                    self.processed_ids.add(p_id)
-                    self.save_state(i)
+                    details = self.scrape(driver, project)
+                    with metrics.timer("write"):
+                        self.results.add(details)
+                    with self.lock:
+                        self.completed += 1
+                    print(f"[W{worker_id}] [{self.completed}/{total}] Scraped Details: {project['title']}")
+                    metrics.emit("page", crawler="details", id=p_id, url=url, worker=worker_id)
 
                 except Exception as e:
-                    print(f"Error on {url}: {e}")
-                    time.sleep(5)
-                    continue
+                    print(f"[W{worker_id}] Error on {url}: {e}")
+                    attempts = self.record_failure(p_id)
+                    # The item goes back to the queue, so a crashed worker does not lose it
+                    if attempts < MAX_ATTEMPTS:
+                        queue.put(project)
+                    else:
+                        print(f"[W{worker_id}] Giving up on {p_id} after {attempts} attempts.")
+
+                    # Anything but a slow page means the browser is in a bad state, restart it
+                    if driver is not None and not isinstance(e, TimeoutException):
+                        try: driver.quit()
+                        except: pass
+                        driver = None
+                    with metrics.timer("sleep"):
+                        self.limiter.backoff(attempts)
+                    metrics.emit("page", crawler="details", id=p_id, url=url, worker=worker_id, error=str(e), attempts=attempts)
+        finally:
+            if driver is not None:
+                driver.quit()
+
+    def pending_projects(self):
+        if not self.refresh:
+            # Load the listing results of the main crawler
+            with open_sink(self.input_file, "url") as listing:
+                return [
+                    p for p in listing.rows()
+                    if p['id'] not in self.results and self.state["attempts"].get(p['id'], 0) < MAX_ATTEMPTS
+                ]
+
+        # A queued refresh is done once the stored details were scraped after it was queued
+        scraped_at = {row['id']: row.get('scraped_at') or "" for row in self.results.rows()}
+        with open_sink(REFRESH_QUEUE_FILE, "id") as refresh_queue:
+            pending = [p for p in refresh_queue.rows() if scraped_at.get(p['id'], "") < p['queued_at']]
+        # Earlier failures should not block a project that changed since
+        for project in pending:
+            self.state["attempts"].pop(project['id'], None)
+        return pending
 
+    def run(self):
+        source = REFRESH_QUEUE_FILE if self.refresh else self.input_file
+        if not os.path.exists(source):
+            print(f"Error: {source} not found. Please run the main crawler first.")
+            return
+
+        queue = Queue()
+        queued = set()
+        for project in self.pending_projects():
+            if project['id'] in queued:
+                continue
+            queued.add(project['id'])
+            queue.put(project)
+
+        total = len(queued)
+        print(f"Queued {len(queued)} projects for {self.workers} workers.")
+
+        threads = [
+            threading.Thread(target=self.worker_loop, args=(worker_id, queue, total), daemon=True)
+            for worker_id in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            # Join with a timeout so the main thread keeps receiving SIGINT
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
         finally:
-            driver.quit()
-            print(f"\n[Done] Deep details saved to: {RESULTS_FILE}")
+            self.results.close()
+
+        if not queue.empty():
+            print(f"{queue.qsize()} projects were not scraped, they are picked up by the next run.")
+        print(self.limiter.summary())
+        if metrics.enabled:
+            print(metrics.summary())
+        print(f"\n[Done] Deep details saved to: {self.results_file}")
 
 if __name__ == "__main__":
-    crawler = DetailCrawler()
-    crawler.run()
\ No newline at end of file
+    import sys
+    # Stage timings are written when MC_METRICS names a .jsonl file, MC_PROFILE a directory for cProfile dumps
+    crawler = DetailCrawler(refresh="--refresh" in sys.argv)
+    with metrics.profiled("detail_crawler", threads=True):
+        crawler.run()
\ No newline at end of file
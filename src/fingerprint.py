@@ -0,0 +1,251 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+
+NUM_PERMUTATIONS = 128
+# Similarity from which a region is reported as a near-duplicate
+NEAR_DUPLICATE_THRESHOLD = 0.8
+CHUNK_SIZE = 16
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+_SEEDS = np.random.default_rng(0x6D696E68).integers(0, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def _mix64(values: np.array) -> np.array:
+    """splitmix64 finalizer, a fast bijective scrambler of uint64 values."""
+    with np.errstate(over="ignore"):
+        z = values + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return (z ^ (z >> np.uint64(31))) & _MASK64
+
+
+def block_histogram(volume: np.array) -> np.array:
+    """Block count per global ID of a uint16 volume, air included at index 0."""
+    return np.bincount(volume.reshape(-1), minlength=1)
+
+
+def chunk_digests(volume: np.array) -> np.array:
+    """
+    (32, 32) uint64 content hashes of the 16x16 chunk columns of an (X, Z, Y)
+    region volume, 0 for all-air columns.
+    """
+    nx, nz = volume.shape[0] // CHUNK_SIZE, volume.shape[1] // CHUNK_SIZE
+    digests = np.zeros((nx, nz), dtype=np.uint64)
+    for cx in range(nx):
+        for cz in range(nz):
+            column = volume[cx * CHUNK_SIZE:(cx + 1) * CHUNK_SIZE, cz * CHUNK_SIZE:(cz + 1) * CHUNK_SIZE]
+            if not column.any():
+                continue
+            # SHA-256 runs on the CPU's SHA extensions where available, well ahead of BLAKE2 here
+            digest = hashlib.sha256(np.ascontiguousarray(column)).digest()
+            digests[cx, cz] = int.from_bytes(digest[:8], "little") or 1
+    return digests
+
+
+def histogram_tokens(histogram: np.array) -> np.array:
+    """
+    Weighted-set tokens of a block histogram: block ``i`` seen ``n`` times yields
+    the tokens ``(i, 0) .. (i, log2(n))``, so the Jaccard similarity of two token
+    sets follows the overlap of the histograms on a log scale.
+    """
+    ids = np.flatnonzero(histogram[1:]) + 1
+    if not ids.size:
+        return np.zeros(0, dtype=np.uint64)
+    levels = np.floor(np.log2(histogram[ids])).astype(np.int64) + 1
+    block_ids = np.repeat(ids, levels).astype(np.uint64)
+    offsets = np.arange(levels.sum()) - np.repeat(np.cumsum(levels) - levels, levels)
+    # Tagged so they never collide with chunk digests
+    return _mix64((block_ids << np.uint64(16)) | offsets.astype(np.uint64) | np.uint64(1 << 62))
+
+
+def minhash(tokens: np.array) -> Optional[np.array]:
+    """``NUM_PERMUTATIONS`` uint32 MinHash values of a uint64 token set, None for an empty set."""
+    tokens = np.unique(tokens)
+    if not tokens.size:
+        return None
+    hashed = _mix64(tokens[None, :] ^ _SEEDS[:, None])
+    return (hashed.min(axis=1) >> np.uint64(32)).astype(np.uint32)
+
+
+class Fingerprint:
+    """
+    Content fingerprint of a region volume.
+
+    ``digest`` identifies the exact block content (the chunk hashes plus the
+    trimmed shape, so the y-offset does not matter). ``signature`` is a MinHash
+    over the hashes of the non-empty chunks and the log-scale block histogram, so
+    regions sharing copy-pasted chunks or a similar block mix come out similar.
+    Global IDs are only comparable between volumes of the same backend: native and
+    amulet extraction register different block strings.
+    """
+
+    __slots__ = ("digest", "signature", "chunks")
+
+    def __init__(self, digest: str, signature: Optional[np.array], chunks: int) -> None:
+        self.digest = digest
+        self.signature = signature
+        self.chunks = chunks
+
+    @classmethod
+    def of(cls, volume: np.array, histogram: np.array = None) -> "Fingerprint":
+        digests = chunk_digests(volume)
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(np.array(volume.shape, dtype=np.int64).tobytes())
+        hasher.update(digests.tobytes())
+
+        if histogram is None:
+            histogram = block_histogram(volume)
+        chunk_tokens = digests[digests != 0]
+        signature = minhash(np.concatenate((chunk_tokens, histogram_tokens(histogram))))
+        return cls(hasher.hexdigest(), signature, int(chunk_tokens.size))
+
+    def similarity(self, other: "Fingerprint") -> float:
+        """Estimated Jaccard similarity of the two token sets."""
+        if self.digest == other.digest:
+            return 1.0
+        if self.signature is None or other.signature is None:
+            return 0.0
+        return float(np.mean(self.signature == other.signature))
+
+    def to_record(self) -> dict:
+        signature = self.signature.tobytes().hex() if self.signature is not None else None
+        return {"digest": self.digest, "signature": signature, "chunks": self.chunks}
+
+    @classmethod
+    def from_record(cls, record: dict) -> "Fingerprint":
+        signature = record.get("signature")
+        if signature is not None:
+            signature = np.frombuffer(bytes.fromhex(signature), dtype=np.uint32).copy()
+        return cls(record["digest"], signature, record.get("chunks", 0))
+
+
+class FingerprintIndex:
+    """
+    Append-only JSON-lines index of region fingerprints, kept in memory for queries.
+
+    Exact duplicates are a dictionary lookup by digest. Near-duplicates compare a
+    signature against the (N, NUM_PERMUTATIONS) matrix of all stored signatures
+    at once, which stays in the milliseconds for a few hundred thousand regions.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.keys: List[tuple] = []
+        self.fingerprints: Dict[tuple, Fingerprint] = {}
+        self._by_digest: Dict[str, List[tuple]] = {}
+        # Signature rows by region, grown by doubling so adding stays cheap
+        self._signatures = np.zeros((64, NUM_PERMUTATIONS), dtype=np.uint32)
+        self._valid = np.zeros(64, dtype=bool)
+        self._rows: Dict[tuple, int] = {}
+
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        key = (record["world"], tuple(record["region"]))
+                        self._insert(key, Fingerprint.from_record(record))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    def __contains__(self, key: tuple) -> bool:
+        world, region = key
+        return (world, tuple(region)) in self.fingerprints
+
+    def _insert(self, key: tuple, fingerprint: Fingerprint) -> None:
+        previous = self.fingerprints.get(key)
+        if previous is not None:
+            self._by_digest[previous.digest].remove(key)
+        self.fingerprints[key] = fingerprint
+        self._by_digest.setdefault(fingerprint.digest, []).append(key)
+
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = len(self.keys)
+            self.keys.append(key)
+            if row == len(self._valid):
+                self._signatures = np.concatenate((self._signatures, np.zeros_like(self._signatures)))
+                self._valid = np.concatenate((self._valid, np.zeros_like(self._valid)))
+        self._valid[row] = fingerprint.signature is not None
+        if fingerprint.signature is not None:
+            self._signatures[row] = fingerprint.signature
+
+    def add(self, world: str, region: tuple, fingerprint: Fingerprint, **info) -> None:
+        key = (world, (int(region[0]), int(region[1])))
+        record = {"world": world, "region": list(key[1]), **fingerprint.to_record(), **info}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._insert(key, fingerprint)
+
+    def get(self, world: str, region: tuple) -> Optional[Fingerprint]:
+        return self.fingerprints.get((world, tuple(region)))
+
+    def duplicates(self, fingerprint: Fingerprint) -> List[tuple]:
+        """(world, region) keys of the indexed regions with exactly the same content."""
+        return list(self._by_digest.get(fingerprint.digest, ()))
+
+    def similar(self, fingerprint: Fingerprint, threshold: float = NEAR_DUPLICATE_THRESHOLD, limit: int = None) -> List[tuple]:
+        """
+        ``(world, region, similarity)`` of the indexed regions at least ``threshold``
+        similar to ``fingerprint``, most similar first. Exact duplicates are included
+        with similarity 1.0.
+        """
+        matches = {key: 1.0 for key in self.duplicates(fingerprint)}
+        count = len(self.keys)
+        if fingerprint.signature is not None and count:
+            scores = (self._signatures[:count] == fingerprint.signature).mean(axis=1)
+            for row in np.flatnonzero((scores >= threshold) & self._valid[:count]):
+                key = self.keys[row]
+                matches[key] = max(matches.get(key, 0.0), float(scores[row]))
+
+        ranked = sorted(matches.items(), key=lambda item: -item[1])[:limit]
+        return [(world, region, score) for (world, region), score in ranked]
+
+    def similar_to(self, world: str, region: tuple, threshold: float = NEAR_DUPLICATE_THRESHOLD, limit: int = None) -> List[tuple]:
+        """:meth:`similar` for an indexed region, without the region itself."""
+        fingerprint = self.get(world, region)
+        if fingerprint is None:
+            raise KeyError(f"Region {tuple(region)} of '{world}' is not indexed.")
+        key = (world, tuple(region))
+        return [m for m in self.similar(fingerprint, threshold, limit and limit + 1) if (m[0], m[1]) != key][:limit]
+
+    def duplicate_groups(self) -> List[List[tuple]]:
+        """Groups of two or more indexed regions with identical content, largest first."""
+        groups = [keys for keys in self._by_digest.values() if len(keys) > 1]
+        return sorted(groups, key=len, reverse=True)
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Query the region fingerprint index of a volume store.")
+    parser.add_argument("index", help="Fingerprint index, usually <store>/fingerprints.jsonl.")
+    parser.add_argument("--similar", nargs=3, metavar=("WORLD", "X", "Z"), help="List the regions similar to this one.")
+    parser.add_argument("--threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    index = FingerprintIndex(args.index)
+    if args.similar:
+        world, x, z = args.similar
+        for other, region, score in index.similar_to(world, (int(x), int(z)), args.threshold, args.limit):
+            print(f"{score:6.1%}  {other} r.{region[0]}.{region[1]}")
+        return
+
+    groups = index.duplicate_groups()
+    print(f"{len(index)} regions indexed, {len(groups)} groups of exact duplicates.")
+    for keys in groups[:args.limit]:
+        print("  " + ", ".join(f"{world} r.{x}.{z}" for world, (x, z) in keys))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import json
+import os
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limiter import Throttled, retry_after_seconds
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+
+class HttpFetcher:
+    """
+    Pooled HTTP session for pages that do not need a browser.
+
+    Cookies (and the user agent they were issued to) can be exported from a
+    Selenium session with :meth:`export_driver_cookies`, so challenge clearance
+    obtained in Chrome is reused here. ``file://`` URLs are read from disk, which
+    together with a local fixture server keeps crawling testable offline.
+    """
+
+    def __init__(self, cookies_file: str = None, pool_size: int = 4, timeout: float = 20) -> None:
+        self.cookies_file = cookies_file
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": DEFAULT_USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.9",
+        })
+        self.load_cookies()
+
+    def load_cookies(self) -> None:
+        if not self.cookies_file or not os.path.exists(self.cookies_file):
+            return
+        try:
+            with open(self.cookies_file, 'r') as f:
+                exported = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if exported.get("user_agent"):
+            self.session.headers["User-Agent"] = exported["user_agent"]
+        for cookie in exported.get("cookies", []):
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+
+    def export_driver_cookies(self, driver) -> None:
+        """Save the cookies and user agent of a Selenium session and start using them."""
+        exported = {
+            "user_agent": driver.execute_script("return navigator.userAgent"),
+            "cookies": driver.get_cookies(),
+        }
+        if self.cookies_file:
+            with open(self.cookies_file, 'w') as f:
+                json.dump(exported, f)
+
+        self.session.headers["User-Agent"] = exported["user_agent"]
+        for cookie in exported["cookies"]:
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+
+    def fetch(self, url: str) -> tuple:
+        """Return ``(status_code, html)``, raises :class:`Throttled` on a 429."""
+        parsed = urlparse(url)
+        if parsed.scheme == "file":
+            with open(url2pathname(parsed.path), 'r', encoding='utf-8') as f:
+                return 200, f.read()
+
+        response = self.session.get(url, timeout=self.timeout)
+        if response.status_code == 429:
+            raise Throttled(url, retry_after_seconds(response.headers.get("Retry-After")))
+        return response.status_code, response.text
+
+    def close(self) -> None:
+        self.session.close()
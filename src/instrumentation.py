@@ -0,0 +1,252 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+# Set to a .jsonl path to enable metrics in this process and in spawned worker processes
+METRICS_ENV = "MC_METRICS"
+# Set to a directory to dump cProfile stats of the profiled units there
+PROFILE_ENV = "MC_PROFILE"
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str) -> None:
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.metrics.add_time(self.stage, time.perf_counter() - self.start)
+
+
+class Metrics:
+    """
+    Stage timers and counters with JSON-lines summaries.
+
+    Time spent in a stage is recorded with ``with metrics.timer("stage"):`` and
+    events are counted with :meth:`count`. Each thread accumulates the stages of
+    its current unit of work, such as a region or a page. :meth:`emit` writes
+    that unit as one JSON line and adds it to the process totals. When the
+    instance is disabled, ``timer`` returns a shared no-op context manager and
+    ``count``/``emit`` return right away, so the calls can stay in hot loops.
+    """
+
+    def __init__(self, path: Path = None, enabled: bool = None, profile_dir: Path = None) -> None:
+        self.path = Path(path) if path else None
+        self.enabled = bool(path) if enabled is None else enabled
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.totals = {}
+        self.counters = {}
+        self.units = 0
+
+    def _unit(self) -> dict:
+        unit = getattr(self._local, "unit", None)
+        if unit is None:
+            unit = self._local.unit = {"stages": {}, "counters": {}}
+        return unit
+
+    def timer(self, stage: str):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def timed_iter(self, stage: str, iterable: Iterable) -> Iterator:
+        """Iterate ``iterable`` charging the time spent producing each item to ``stage``."""
+        if not self.enabled:
+            return iter(iterable)
+        return self._timed_iter(stage, iter(iterable))
+
+    def _timed_iter(self, stage: str, iterator: Iterator) -> Iterator:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(stage, time.perf_counter() - start)
+                return
+            self.add_time(stage, time.perf_counter() - start)
+            yield item
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        stages = self._unit()["stages"]
+        entry = stages.get(stage)
+        if entry is None:
+            stages[stage] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def count(self, name: str, value: int = 1) -> None:
+        if not self.enabled:
+            return
+        counters = self._unit()["counters"]
+        counters[name] = counters.get(name, 0) + value
+
+    def emit(self, kind: str, **fields) -> dict:
+        """
+        Close the current unit of this thread: write its stages, counters and
+        ``fields`` as one JSON line and add them to the totals.
+        """
+        if not self.enabled:
+            return {}
+        unit = self._unit()
+        self._local.unit = None
+
+        record = {
+            "kind": kind,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "pid": os.getpid(),
+            **fields,
+            "stages": {stage: round(seconds, 6) for stage, (seconds, _) in unit["stages"].items()},
+            "calls": {stage: calls for stage, (_, calls) in unit["stages"].items()},
+            "counters": unit["counters"],
+        }
+        with self._lock:
+            self.units += 1
+            for stage, (seconds, calls) in unit["stages"].items():
+                total = self.totals.setdefault(stage, [0.0, 0])
+                total[0] += seconds
+                total[1] += calls
+            for name, value in unit["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            if self.path:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # One append per line, so worker processes can share the file
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+        return record
+
+    def profiled(self, name: str, threads: bool = False):
+        """:func:`profile` the block into ``<profile_dir>/<name>.prof``, a no-op without a profile directory."""
+        if self.profile_dir is None:
+            return _NULL_TIMER
+        return profile(self.profile_dir / f"{name}.prof", threads=threads)
+
+    def summary(self) -> str:
+        """Process totals per stage, slowest first."""
+        with self._lock:
+            return format_totals(dict(self.totals), dict(self.counters), self.units)
+
+
+def format_totals(totals: dict, counters: dict, units: int) -> str:
+    if not totals and not counters:
+        return "Metrics: nothing recorded."
+    overall = sum(seconds for seconds, _ in totals.values()) or 1e-9
+    lines = [f"Metrics over {units} units:"]
+    for stage, (seconds, calls) in sorted(totals.items(), key=lambda item: -item[1][0]):
+        lines.append(f"  {stage:<20} {seconds:10.2f}s {seconds / overall:6.1%}  {calls} calls")
+    if counters:
+        lines.append("  " + ", ".join(f"{name}: {value}" for name, value in sorted(counters.items())))
+    return "\n".join(lines)
+
+
+def summarize_file(path: Path, kind: str = None) -> str:
+    """Totals of a metrics file, which also covers the records of worker processes."""
+    totals, counters, units = {}, {}, 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if kind and record.get("kind") != kind:
+                continue
+            units += 1
+            for stage, seconds in record.get("stages", {}).items():
+                total = totals.setdefault(stage, [0.0, 0])
+                total[0] += seconds
+                total[1] += record.get("calls", {}).get(stage, 1)
+            for name, value in record.get("counters", {}).items():
+                counters[name] = counters.get(name, 0) + value
+    return format_totals(totals, counters, units)
+
+
+metrics = Metrics(os.environ.get(METRICS_ENV) or None, profile_dir=os.environ.get(PROFILE_ENV) or None)
+
+
+def configure(path: Path = None, enabled: bool = True, profile_dir: Path = None) -> Metrics:
+    """
+    Turn the process-wide :data:`metrics` on or off.
+
+    The path and profile directory are also exported in the environment, so
+    worker processes started with ``spawn`` afterwards record into the same place.
+    """
+    metrics.enabled = enabled
+    metrics.path = Path(path) if path and enabled else None
+    metrics.profile_dir = Path(profile_dir) if profile_dir else None
+    for name, value in ((METRICS_ENV, metrics.path), (PROFILE_ENV, metrics.profile_dir)):
+        if value:
+            os.environ[name] = str(value)
+        else:
+            os.environ.pop(name, None)
+    return metrics
+
+
+@contextmanager
+def profile(path: Path = None, threads: bool = False):
+    """
+    cProfile the block and dump the stats to ``path``, open them with ``snakeviz <path>``;
+    no-op without a path.
+
+    ``threads`` also covers the threads started inside the block. From Python 3.12
+    on a profiler sees every thread anyway, before that each new thread gets its
+    own profiler and their stats are merged into the dump.
+    """
+    if not path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    thread_profilers = []
+    per_thread = threads and sys.version_info < (3, 12)
+    if per_thread:
+        def start_thread_profiler(*args):
+            # Runs on the first event of a new thread, enabling replaces this hook
+            thread_profiler = cProfile.Profile()
+            thread_profilers.append(thread_profiler)
+            thread_profiler.enable()
+
+        threading.setprofile(start_thread_profiler)
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if per_thread:
+            threading.setprofile(None)
+        stats = pstats.Stats(profiler)
+        for thread_profiler in thread_profilers:
+            stats.add(thread_profiler)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(str(path))
+
+
+if __name__ == "__main__":
+    for metrics_file in sys.argv[1:]:
+        print(f"{metrics_file}:\n{summarize_file(metrics_file)}")
@@ -0,0 +1,361 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import urlparse
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import signal
+import threading
+import time
+import zipfile
+from http_fetch import HttpFetcher
+from pmc_html import CHALLENGE_STATUSES
+from rate_limiter import AdaptiveRateLimiter, Throttled, retry_after_seconds
+from result_sink import open_sink
+
+ASSETS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "assets"))
+DETAILS_FILE = os.path.join(ASSETS_DIR, "pmc_details_deep.csv")
+COOKIES_FILE = os.path.join(ASSETS_DIR, "pmc_cookies.json")
+
+CHUNK_SIZE = 1 << 20
+MAX_ATTEMPTS = 3
+WORLD_MARKER = "level.dat"
+SKIPPED_PREFIXES = ("__MACOSX/",)
+
+
+class DownloadError(Exception):
+    pass
+
+
+class UnusableMirror(DownloadError):
+    """The mirror serves something other than an archive, retrying it will not help."""
+
+
+def mirror_urls(mirrors) -> List[str]:
+    """Download URLs of a details row, site-hosted downloads first; accepts old ``"name (url) | ..."`` strings."""
+    if isinstance(mirrors, str):
+        mirrors = mirrors.split(" | ")
+    urls = []
+    for mirror in mirrors or []:
+        if isinstance(mirror, dict):
+            urls.append(mirror.get("url"))
+        else:
+            match = re.search(r"\((\S+)\)\s*$", str(mirror))
+            urls.append(match.group(1) if match else str(mirror).strip())
+    return sorted(dict.fromkeys(u for u in urls if u), key=lambda u: "/download" not in u)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_worlds(archive: Path, worlds_dir: Path) -> List[str]:
+    """
+    Unpack every world (a folder holding ``level.dat``) of a zip archive into
+    ``worlds_dir/<archive stem>/<world folder path>``, leaving out resource
+    packs, readmes and other payloads. Worlds keep their folder path inside the
+    archive, so same-named worlds of one archive (or of different archives) do not
+    collide. The archive is unpacked next to its target and renamed into place,
+    replacing what an earlier extraction left there.
+
+    Returns:
+        The unpacked world directories.
+    """
+    destination = worlds_dir / archive.stem
+    tmp_destination = worlds_dir / f".{archive.stem}.tmp"
+    shutil.rmtree(tmp_destination, ignore_errors=True)
+
+    with zipfile.ZipFile(archive) as zf:
+        names = [n for n in zf.namelist() if not n.startswith(SKIPPED_PREFIXES)]
+        roots = sorted({os.path.dirname(n) for n in names if os.path.basename(n) == WORLD_MARKER}, key=len)
+        # Backups stored inside a world folder belong to that world
+        roots = [r for i, r in enumerate(roots) if not any(r.startswith(p + "/") for p in roots[:i] if p)]
+
+        worlds = []
+        for root in roots:
+            prefix = root + "/" if root else ""
+            if root == "" and len(roots) > 1:
+                continue
+            world = Path(root or archive.stem)
+            if world.is_absolute() or ".." in world.parts:
+                continue
+
+            for member in names:
+                if not member.startswith(prefix) or member.endswith("/"):
+                    continue
+                relative = Path(member[len(prefix):])
+                if relative.is_absolute() or ".." in relative.parts:
+                    continue
+                out_path = tmp_destination / world / relative
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                with zf.open(member) as src, open(out_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            worlds.append(str(destination / world))
+
+    shutil.rmtree(destination, ignore_errors=True)
+    if worlds:
+        os.replace(tmp_destination, destination)
+    return worlds
+
+
+class MapDownloader:
+    """
+    Downloads the world archives listed in the details results and unpacks them.
+
+    Archives are fetched by a thread pool with at most ``per_host`` connections
+    per host, paced by the shared :class:`AdaptiveRateLimiter`. Partial downloads
+    live in one ``<id>.<url hash>.part`` file per mirror and resume with HTTP
+    range requests. A finished download is checked against the size the server
+    announced and the CRCs of its members before it becomes the archive, and its
+    SHA-256 is recorded in the downloads table. When an archive is already on disk, its
+    hash is checked again before the download is skipped. Unpacking runs on its own
+    executor, so the next archives keep downloading while one is extracted.
+    """
+
+    def __init__(
+        self,
+        details_file: str = DETAILS_FILE,
+        downloads_dir: str = "downloads",
+        worlds_dir: str = "data",
+        workers: int = 4,
+        per_host: int = 2,
+        extract_workers: int = 1,
+        limiter: AdaptiveRateLimiter = None,
+        cookies_file: str = COOKIES_FILE,
+    ) -> None:
+        self.running = True
+        self.details_file = details_file
+        self.downloads_dir = Path(downloads_dir)
+        self.worlds_dir = Path(worlds_dir)
+        self.downloads_dir.mkdir(parents=True, exist_ok=True)
+        self.worlds_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.per_host = per_host
+        self.extract_workers = extract_workers
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.fetcher = HttpFetcher(cookies_file, pool_size=workers)
+        self.table = open_sink(self.downloads_dir / "downloads.csv", "id", list_fields=("worlds",), flush_rows=1)
+
+        self.records = {row["id"]: row for row in self.table.rows()}
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+
+        signal.signal(signal.SIGINT, self.handle_exit)
+
+    def handle_exit(self, signum, frame):
+        print("\n[!] Exit signal received. Finishing in-flight archives...")
+        self.running = False
+
+    def host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def pending(self) -> List[dict]:
+        finished = {p_id for p_id, row in self.records.items() if row.get("status") in ("extracted", "no_world")}
+        with open_sink(self.details_file, "id", list_fields=("download_mirrors",)) as details:
+            rows = list(details.rows())
+        return [row for row in rows if row["id"] not in finished and mirror_urls(row.get("download_mirrors"))]
+
+    def fetch(self, url: str, part_path: Path) -> Optional[int]:
+        """Download ``url`` into ``part_path``, resuming what is already there; returns the announced total size."""
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        self.limiter.acquire(url)
+        with self.host_slot(url):
+            start = time.monotonic()
+            response = self.fetcher.session.get(url, headers=headers, stream=True, timeout=self.fetcher.timeout)
+            try:
+                if response.status_code == 416:
+                    # Nothing left to fetch, the part file already holds the whole archive
+                    return offset
+                if response.status_code == 429:
+                    retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                    self.limiter.throttled(url, retry_after)
+                    raise Throttled(url, retry_after)
+                if response.status_code >= 400:
+                    self.limiter.failure(url, challenge=response.status_code in CHALLENGE_STATUSES)
+                    raise DownloadError(f"HTTP {response.status_code}")
+                if "text/html" in response.headers.get("Content-Type", ""):
+                    raise UnusableMirror("Mirror returned a web page instead of an archive")
+
+                total = None
+                if response.status_code == 206:
+                    match = re.search(r"/(\d+)$", response.headers.get("Content-Range", ""))
+                    total = int(match.group(1)) if match else None
+                    mode = 'ab'
+                else:
+                    offset = 0
+                    mode = 'wb'
+                if total is None and response.headers.get("Content-Length"):
+                    total = offset + int(response.headers["Content-Length"])
+
+                with open(part_path, mode) as f:
+                    for block in response.iter_content(CHUNK_SIZE):
+                        if not self.running:
+                            raise DownloadError("Interrupted")
+                        f.write(block)
+            finally:
+                response.close()
+            self.limiter.success(url, time.monotonic() - start)
+        return total
+
+    def archive_name(self, project_id: str) -> Path:
+        return self.downloads_dir / f"{project_id}.zip"
+
+    def part_name(self, project_id: str, url: str) -> Path:
+        """Partial download of one mirror; mirrors may serve different files, so they never share one."""
+        return self.downloads_dir / f"{project_id}.{hashlib.sha1(url.encode()).hexdigest()[:12]}.part"
+
+    def download(self, project: dict) -> dict:
+        p_id = project["id"]
+        archive = self.archive_name(p_id)
+        record = self.records.get(p_id, {})
+
+        if archive.exists() and record.get("sha256") and file_sha256(archive) == record["sha256"]:
+            return record
+
+        errors = []
+        for url in mirror_urls(project.get("download_mirrors")):
+            part_path = self.part_name(p_id, url)
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                if not self.running:
+                    raise DownloadError("Interrupted")
+                try:
+                    total = self.fetch(url, part_path)
+                    size = part_path.stat().st_size
+                    if total is not None and size != total:
+                        if size > total:
+                            part_path.unlink(missing_ok=True)
+                        raise DownloadError(f"Size mismatch, got {size} of {total} bytes")
+                    self.verify_archive(part_path)
+                    sha256 = file_sha256(part_path)
+
+                    os.replace(part_path, archive)
+                    for stale in self.downloads_dir.glob(f"{p_id}.*.part"):
+                        stale.unlink(missing_ok=True)
+                    return self.save_record({
+                        "id": p_id,
+                        "url": url,
+                        "archive": str(archive),
+                        "size": size,
+                        "sha256": sha256,
+                        "status": "downloaded",
+                        "worlds": [],
+                    })
+                except Exception as e:
+                    errors.append(f"{url}: {e}")
+                    if isinstance(e, UnusableMirror):
+                        break
+                    if attempt < MAX_ATTEMPTS and self.running:
+                        self.limiter.backoff(attempt, getattr(e, "retry_after", None))
+        raise DownloadError("; ".join(errors) or "No usable mirror")
+
+    @staticmethod
+    def verify_archive(part_path: Path) -> None:
+        """
+        Check a finished download before it replaces the archive: it must be a zip
+        whose members all match their CRCs. A corrupt file is deleted, so the
+        retry starts over instead of resuming it.
+        """
+        if not zipfile.is_zipfile(part_path):
+            part_path.unlink(missing_ok=True)
+            raise UnusableMirror("Not a zip archive")
+        try:
+            with zipfile.ZipFile(part_path) as zf:
+                bad_member = zf.testzip()
+        except (zipfile.BadZipFile, OSError, EOFError) as e:
+            bad_member = str(e)
+        if bad_member is not None:
+            part_path.unlink(missing_ok=True)
+            raise DownloadError(f"Corrupt archive ({bad_member})")
+
+    def save_record(self, record: dict) -> dict:
+        self.records[record["id"]] = record
+        self.table.add(record)
+        return record
+
+    def extract(self, record: dict) -> dict:
+        worlds = extract_worlds(Path(record["archive"]), self.worlds_dir)
+        return self.save_record({**record, "worlds": worlds, "status": "extracted" if worlds else "no_world"})
+
+    def run(self):
+        projects = self.pending()
+        print(f"Queued {len(projects)} projects for download, {len(self.table)} already handled.")
+        start_time = time.time()
+        downloaded = extracted = failed = 0
+        downloaded_bytes = 0
+
+        download_pool = ThreadPoolExecutor(self.workers)
+        extract_pool = ThreadPoolExecutor(self.extract_workers)
+        downloads = {download_pool.submit(self.download, p): p for p in projects}
+        extractions = {}
+
+        try:
+            while downloads or extractions:
+                done, _ = wait(list(downloads) + list(extractions), timeout=0.5, return_when=FIRST_COMPLETED)
+                if not self.running:
+                    for future in downloads:
+                        future.cancel()
+
+                for future in done:
+                    if future in downloads:
+                        project = downloads.pop(future)
+                        if future.cancelled():
+                            continue
+                        try:
+                            record = future.result()
+                        except Exception as e:
+                            failed += 1
+                            print(f"[{project['id']}] Download failed: {e}")
+                            continue
+                        downloaded += 1
+                        downloaded_bytes += int(record["size"])
+                        extractions[extract_pool.submit(self.extract, record)] = project
+                    else:
+                        project = extractions.pop(future)
+                        try:
+                            record = future.result()
+                        except Exception as e:
+                            failed += 1
+                            print(f"[{project['id']}] Extraction failed: {e}")
+                            continue
+                        extracted += 1
+                        elapsed = max(time.time() - start_time, 1e-9)
+                        print(
+                            f"[{project['id']}] {len(record['worlds'])} world(s) | {extracted}/{len(projects)} done | "
+                            f"{downloaded_bytes / elapsed / 1e6:.1f} MB/s"
+                        )
+        finally:
+            download_pool.shutdown(wait=True, cancel_futures=True)
+            extract_pool.shutdown(wait=True)
+            self.table.close()
+            self.fetcher.close()
+            print(self.limiter.summary())
+            print(f"\n[Done] {downloaded} downloaded, {extracted} extracted, {failed} failed. Worlds in: {self.worlds_dir}")
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Download and unpack the world archives found by the detail crawler.")
+    parser.add_argument("--details", default=DETAILS_FILE, help="Details results (.csv, .parquet or .sqlite).")
+    parser.add_argument("--downloads", default="downloads", help="Directory for archives and the downloads table.")
+    parser.add_argument("--worlds", default="data", help="Directory the worlds are unpacked into, one folder per project.")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent downloads.")
+    parser.add_argument("--per-host", type=int, default=2, help="Concurrent connections per host.")
+    args = parser.parse_args(argv)
+
+    MapDownloader(args.details, args.downloads, args.worlds, workers=args.workers, per_host=args.per_host).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Tuple
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import signal
+import time
+import numpy as np
+from PIL import Image
+import registry
+from registry import Registry
+
+TEXTURE_DIR = Path(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "assets", "block")))
+COLOR_CACHE_NAME = "block_colors.npz"
+COLOR_CACHE_VERSION = 1
+
+TILE_SIZE = 512
+SLAB_HEIGHT = 16
+
+# Blocks that never show up on a map
+INVISIBLE_BLOCKS = {"air", "cave_air", "void_air", "structure_void", "barrier", "light"}
+# Boolean properties that are part of the texture name, e.g. stripped_oak_log
+FLAG_PREFIXES = ("dead", "stripped", "polished", "mossy", "cracked", "chiseled", "smooth", "cut", "waxed")
+# Properties naming the material or colour a generic (universal) block is made of
+MATERIAL_PROPERTIES = ("color", "material", "coral_type", "wood_type", "plant_type", "variant")
+# Shapes drawn with the texture of their material, e.g. oak_stairs -> oak_planks
+SHAPE_SUFFIXES = (
+    "_stairs", "_slab", "_wall", "_fence_gate", "_fence", "_button", "_pressure_plate", "_pane",
+    "_wall_sign", "_sign", "_wall_hanging_sign", "_hanging_sign", "_carpet", "_bed", "_banner", "_wall_banner",
+)
+TEXTURE_SUFFIXES = ("_top", "", "_side", "_still", "_front", "_0", "_stage0")
+# Blocks and materials whose texture has an unrelated name
+TEXTURE_ALIASES = {
+    "grass": "short_grass",
+    "grass_path": "dirt_path",
+    "brick_block": "bricks",
+    "brick": "bricks",
+    "quartz": "quartz_block",
+    "smooth_quartz": "quartz_block_bottom",
+    "smooth_sandstone": "sandstone_top",
+    "smooth_red_sandstone": "red_sandstone_top",
+    "wood": "oak_planks",
+    "redstone_wire": "redstone_dust_dot",
+}
+
+# Grey textures the game colours by biome, tinted with the plains colours
+GRASS_TINT = (0x91, 0xBD, 0x59)
+FOLIAGE_TINT = (0x77, 0xAB, 0x2F)
+TINTS = {
+    "grass_block_top": GRASS_TINT,
+    "short_grass": GRASS_TINT,
+    "grass": GRASS_TINT,
+    "tall_grass_top": GRASS_TINT,
+    "fern": GRASS_TINT,
+    "large_fern_top": GRASS_TINT,
+    "sugar_cane": GRASS_TINT,
+    "oak_leaves": FOLIAGE_TINT,
+    "jungle_leaves": FOLIAGE_TINT,
+    "acacia_leaves": FOLIAGE_TINT,
+    "dark_oak_leaves": FOLIAGE_TINT,
+    "mangrove_leaves": FOLIAGE_TINT,
+    "vine": FOLIAGE_TINT,
+    "birch_leaves": (0x80, 0xA7, 0x55),
+    "spruce_leaves": (0x61, 0x99, 0x61),
+    "lily_pad": (0x20, 0x80, 0x30),
+    "water_still": (0x3F, 0x76, 0xE4),
+    "water_flow": (0x3F, 0x76, 0xE4),
+}
+UNKNOWN_COLOR = (128, 128, 128, 255)
+
+
+def split_blockstate(blockstate: str) -> Tuple[str, Dict[str, str]]:
+    """``namespace:name[key="value",...]`` -> (name, properties), quotes and any ``{extra block}`` stripped."""
+    blockstate = blockstate.split("{", 1)[0]
+    match = re.match(r"^(?:[\w.\-]+:)?([^\[]+)(?:\[(.*)\])?$", blockstate)
+    if not match:
+        return blockstate, {}
+    name, body = match.groups()
+    properties = dict(re.findall(r'(\w+)="?([^",\]]*)"?', body or ""))
+    return name, properties
+
+
+def texture_candidates(blockstate: str) -> List[str]:
+    """Texture file stems that may show a block from above, best match first."""
+    name, properties = split_blockstate(blockstate)
+    prefixes = [properties[k] for k in MATERIAL_PROPERTIES if properties.get(k) not in (None, "", "default")]
+    flags = [k for k in FLAG_PREFIXES if properties.get(k) == "true"]
+
+    stems = [f"{prefix}_{name}" for prefix in prefixes] + [name]
+    if flags:
+        stems = ["_".join(flags + [stem]) for stem in stems] + stems
+
+    for stem in list(stems):
+        for suffix in SHAPE_SUFFIXES:
+            if stem.endswith(suffix):
+                base = stem[:-len(suffix)]
+                stems += [base, f"{base}s", f"{base}_planks", f"{base}_block"]
+                break
+    for prefix in prefixes:
+        stems += [prefix, f"{prefix}s", f"{prefix}_planks", f"{prefix}_block"]
+    # Waxing does not change the look
+    stems += [stem[len("waxed_"):] for stem in stems if stem.startswith("waxed_")]
+    stems = [TEXTURE_ALIASES.get(stem, stem) for stem in stems]
+    # Beds, banners and carpets have no block texture of their own, use the wool of their colour
+    stems += [f"{properties['color']}_wool"] if "color" in properties else []
+
+    return list(dict.fromkeys(f"{stem}{suffix}" for stem in stems for suffix in TEXTURE_SUFFIXES))
+
+
+def texture_color(path: Path, tint: tuple = None) -> tuple:
+    """
+    Average RGBA of a block texture. Animated textures are vertical strips, only
+    the first frame counts. RGB is averaged over the visible pixels, alpha is the
+    share of visible pixels.
+    """
+    with Image.open(path) as image:
+        pixels = np.asarray(image.convert("RGBA"), dtype=np.float64)
+    pixels = pixels[:pixels.shape[1]]
+    alpha = pixels[:, :, 3] / 255
+    coverage = alpha.mean()
+    if coverage == 0:
+        return (0, 0, 0, 0)
+    rgb = (pixels[:, :, :3] * alpha[:, :, None]).sum(axis=(0, 1)) / alpha.sum()
+    if tint is not None:
+        rgb = rgb * np.array(tint) / 255
+    return (*np.clip(np.round(rgb), 0, 255).astype(int).tolist(), max(1, int(round(coverage * 255))))
+
+
+class BlockColors:
+    """
+    Average texture colour of every global blockstate ID.
+
+    Colours are computed from the PNGs in ``texture_dir`` once and cached in
+    ``<assets>/block_colors.npz`` by global ID. The blockstate registry is
+    append-only, so a cache that is shorter than the registry is only extended
+    with the new IDs. The cache is rebuilt when the textures change. Invisible
+    blocks have alpha 0. Blocks without a matching texture get a neutral grey.
+    """
+
+    def __init__(self, registry: Registry = None, texture_dir: Path = TEXTURE_DIR, cache_path: Path = None) -> None:
+        self._registry = registry or Registry("blockstates")
+        self.texture_dir = Path(texture_dir)
+        self.cache_path = Path(cache_path) if cache_path else self._default_cache_path()
+        self._textures = {p.stem: p for p in self.texture_dir.glob("*.png")} if self.texture_dir.is_dir() else {}
+        self._signature = self._texture_signature()
+        self._colors = self._load_cache()
+        self.misses = 0
+
+    @staticmethod
+    def _default_cache_path() -> Path:
+        # Read at call time, so redirecting registry.ASSETS_DIR also moves the cache
+        return Path(registry.ASSETS_DIR) / COLOR_CACHE_NAME
+
+    def _texture_signature(self) -> List[float]:
+        mtimes = [p.stat().st_mtime for p in self._textures.values()]
+        return [float(len(mtimes)), max(mtimes, default=0.0)]
+
+    def _load_cache(self) -> np.array:
+        empty = np.zeros((0, 4), dtype=np.uint8)
+        if not self.cache_path.is_file():
+            return empty
+        try:
+            with np.load(self.cache_path) as cached:
+                if int(cached["version"]) != COLOR_CACHE_VERSION or cached["signature"].tolist() != self._signature:
+                    return empty
+                return cached["colors"]
+        except (OSError, KeyError, ValueError):
+            return empty
+
+    def save(self) -> None:
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.tmp.npz")
+        try:
+            np.savez(tmp_path, version=COLOR_CACHE_VERSION, signature=np.array(self._signature), colors=self._colors)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+
+    def color_of(self, blockstate: str) -> tuple:
+        name, _ = split_blockstate(blockstate)
+        if name in INVISIBLE_BLOCKS:
+            return (0, 0, 0, 0)
+        for stem in texture_candidates(blockstate):
+            path = self._textures.get(stem)
+            if path is not None:
+                return texture_color(path, TINTS.get(stem))
+        self.misses += 1
+        return UNKNOWN_COLOR
+
+    def table(self, size: int = 0) -> np.array:
+        """(N, 4) uint8 RGBA table indexed by global ID, covering at least ``size`` IDs."""
+        if len(self._colors) < max(size, 1) or len(self._colors) < len(self._registry):
+            self._registry.refresh()
+            target = max(size, len(self._registry))
+            if len(self._colors) < target:
+                start = len(self._colors)
+                new = [self.color_of(self._registry.get(i)) if i < len(self._registry) else UNKNOWN_COLOR for i in range(start, target)]
+                self._colors = np.concatenate((self._colors, np.array(new, dtype=np.uint8).reshape(-1, 4)))
+                self.save()
+        return self._colors
+
+
+def top_blocks(volume: np.array, visible: np.array) -> Tuple[np.array, np.array]:
+    """
+    Highest visible block of every column of an (X, Z, Y) volume.
+
+    The volume is scanned top-down in slabs of ``SLAB_HEIGHT`` layers and the
+    scan stops once every column has been resolved, so mostly flat worlds never
+    touch their lower layers.
+
+    Returns:
+        (ids, heights): global IDs and y-indices of the top blocks, -1 height
+        for columns without any visible block.
+    """
+    nx, nz, ny = volume.shape
+    ids = np.zeros((nx, nz), dtype=volume.dtype)
+    heights = np.full((nx, nz), -1, dtype=np.int32)
+    pending = np.ones((nx, nz), dtype=bool)
+
+    for top in range(ny, 0, -SLAB_HEIGHT):
+        bottom = max(0, top - SLAB_HEIGHT)
+        slab = volume[:, :, bottom:top]
+        hits = visible[slab] & pending[:, :, None]
+        found = hits.any(axis=2)
+        if found.any():
+            index = slab.shape[2] - 1 - np.argmax(hits[:, :, ::-1], axis=2)
+            heights[found] = bottom + index[found]
+            ids[found] = np.take_along_axis(slab, index[:, :, None], axis=2)[:, :, 0][found]
+            pending &= ~found
+            if not pending.any():
+                break
+    return ids, heights
+
+
+def shade(rgba: np.array, heights: np.array, strength: float = 0.06) -> np.array:
+    """Relief shading: columns higher than their northern neighbour are lightened, lower ones darkened."""
+    north = np.concatenate((heights[:, :1], heights[:, :-1]), axis=1)
+    delta = np.where((heights >= 0) & (north >= 0), heights - north, 0)
+    factor = 1 + np.clip(delta, -4, 4) * strength
+    shaded = rgba.astype(np.float32)
+    shaded[:, :, :3] *= factor[:, :, None]
+    return np.clip(shaded, 0, 255).astype(np.uint8)
+
+
+def render_volume(volume: np.array, colors: BlockColors) -> np.array:
+    """(X, Z, 4) RGBA top-down image of a region volume."""
+    table = colors.table(int(volume.max()) + 1 if volume.size else 0)
+    ids, heights = top_blocks(volume, table[:, 3] > 0)
+    rgba = table[ids]
+    rgba[heights < 0] = 0
+    rgba[heights >= 0, 3] = 255
+    return shade(rgba, heights)
+
+
+def save_tile(path: Path, rgba: np.array) -> None:
+    """Write an (X, Z, 4) array as a PNG with north up, i.e. z down the rows and x along the columns."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    Image.fromarray(np.ascontiguousarray(rgba.transpose(1, 0, 2)), "RGBA").save(tmp_path, format="PNG", optimize=False)
+    os.replace(tmp_path, path)
+
+
+def tile_path(out_dir: Path, zoom: int, x: int, z: int) -> Path:
+    return Path(out_dir) / str(zoom) / f"{x}.{z}.png"
+
+
+def build_zoom_level(out_dir: Path, zoom: int, origin: tuple) -> List[tuple]:
+    """
+    Tiles of ``zoom`` from the tiles of ``zoom - 1``: each covers 2x2 child tiles at half resolution.
+
+    Zoom 0 tiles are named after their region, higher levels count from the
+    world's ``origin`` region, so the levels shrink to a single tile even when
+    the world straddles region 0.
+
+    Returns:
+        The (x, z) tile coordinates written.
+    """
+    children = [tuple(int(v) for v in p.stem.split(".")) for p in (Path(out_dir) / str(zoom - 1)).glob("*.png")]
+    shift = origin if zoom == 1 else (0, 0)
+    parents = sorted({((x - shift[0]) // 2, (z - shift[1]) // 2) for x, z in children})
+    half = TILE_SIZE // 2
+
+    for px, pz in parents:
+        canvas = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+        for i in range(2):
+            for j in range(2):
+                child = tile_path(out_dir, zoom - 1, px * 2 + i + shift[0], pz * 2 + j + shift[1])
+                if not child.is_file():
+                    continue
+                with Image.open(child) as image:
+                    small = np.asarray(image.convert("RGBA").resize((half, half), Image.BOX))
+                canvas[j * half:(j + 1) * half, i * half:(i + 1) * half] = small
+        save_tile(tile_path(out_dir, zoom, px, pz), canvas.transpose(1, 0, 2))
+    return parents
+
+
+def build_pyramid(out_dir: Path) -> int:
+    """
+    Halve the region tiles until one tile covers the world and write the
+    layout to ``<out_dir>/tiles.json``; returns the top zoom level.
+    """
+    tiles = [tuple(int(v) for v in p.stem.split(".")) for p in (Path(out_dir) / "0").glob("*.png")]
+    if not tiles:
+        return 0
+    origin = (min(x for x, _ in tiles), min(z for _, z in tiles))
+    zoom = 0
+    while len(tiles) > 1:
+        zoom += 1
+        (Path(out_dir) / str(zoom)).mkdir(parents=True, exist_ok=True)
+        tiles = build_zoom_level(out_dir, zoom, origin)
+
+    layout = {"tile_size": TILE_SIZE, "max_zoom": zoom, "origin_region": list(origin)}
+    with open(Path(out_dir) / "tiles.json", "w", encoding="utf-8") as f:
+        json.dump(layout, f, indent=2)
+    return zoom
+
+
+_worker_colors = None
+_worker_worlds = OrderedDict()
+MAX_WORKER_WORLDS = 4
+
+
+def _init_render_worker(texture_dir: Path) -> None:
+    global _worker_colors
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_colors = BlockColors(texture_dir=texture_dir)
+
+
+def _worker_world(world_path: str):
+    from region_extractor import WorldWrapper
+
+    world = _worker_worlds.pop(world_path, None)
+    if world is None:
+        world = WorldWrapper(Path(world_path))
+    _worker_worlds[world_path] = world
+    while len(_worker_worlds) > MAX_WORKER_WORLDS:
+        _, stale = _worker_worlds.popitem(last=False)
+        stale.close()
+    return world
+
+
+def _render_region_worker(source: tuple, coords: tuple, out_dir: str) -> tuple:
+    """Render one region tile; ``source`` is ("world", path, native) or ("store", root, world)."""
+    if source[0] == "store":
+        from volume_store import VolumeStore
+        volume = VolumeStore(source[1]).read(source[2], coords)
+    else:
+        world = _worker_world(source[1])
+        extract = world.get_region_volume_native if source[2] else world.get_region_volume
+        volume, _ = extract(*coords)
+    rgba = render_volume(volume, _worker_colors)
+    save_tile(tile_path(out_dir, 0, *coords), rgba)
+    return coords, float((rgba[:, :, 3] > 0).mean())
+
+
+class MapRenderer:
+    """
+    Renders top-down previews of worlds as tiled, multi-zoom PNG pyramids.
+
+    Every region becomes a 512x512 tile at zoom 0 (one pixel per block), each
+    further zoom level halves the resolution until a single tile covers the
+    world. Layout::
+
+        <out_dir>/<world>/<zoom>/<x>.<z>.png
+        <out_dir>/<world>/tiles.json
+
+    Regions are rendered on a process pool across all worlds. Each worker keeps
+    a few worlds open and its own copy of the :class:`BlockColors` table.
+    """
+
+    def __init__(self, out_dir: str = "maps", workers: int = None, native: bool = True, texture_dir: Path = TEXTURE_DIR) -> None:
+        self.running = True
+        self.out_dir = Path(out_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.native = native
+        self.texture_dir = texture_dir
+
+        signal.signal(signal.SIGINT, self.handle_exit)
+
+    def handle_exit(self, signum, frame):
+        print("\n[!] Exit signal received. Finishing the regions in progress...")
+        self.running = False
+
+    @staticmethod
+    def world_key(name: str) -> str:
+        from volume_store import world_key
+
+        return world_key(name)
+
+    def world_jobs(self, data_dir: str) -> List[tuple]:
+        """(name, source, regions) of every world below ``data_dir``."""
+        from region_extractor import MinecraftRegionExtractor, WorldWrapper
+
+        jobs = []
+        for level_dat in MinecraftRegionExtractor.discover_worlds(data_dir):
+            world_dir = os.path.dirname(level_dat)
+            world = WorldWrapper(Path(world_dir))
+            # Only the overworld is rendered
+            regions = [c for c in world.mca_coords if Path(world._mca_coord_to_path[c]).parent == Path(world_dir) / "region"]
+            jobs.append((os.path.relpath(world_dir, data_dir), ("world", world_dir, self.native), sorted(regions)))
+        return jobs
+
+    def store_jobs(self, store_dir: str, worlds: List[str] = None) -> List[tuple]:
+        from volume_store import VolumeStore
+
+        store = VolumeStore(store_dir)
+        return [(world, ("store", str(store_dir), world), store.regions(world)) for world in worlds or store.worlds()]
+
+    def render(self, jobs: List[tuple], skip_existing: bool = True) -> Dict[str, int]:
+        """Render every region of every job, then build each world's zoom levels; returns the top zoom per world."""
+        start_time = time.time()
+        tasks = []
+        for name, source, regions in jobs:
+            world_out = self.out_dir / self.world_key(name)
+            for coords in regions:
+                if skip_existing and tile_path(world_out, 0, *coords).is_file():
+                    continue
+                tasks.append((name, source, coords, world_out))
+        print(f"Rendering {len(tasks)} regions of {len(jobs)} worlds on {self.workers} workers...")
+
+        pool = ProcessPoolExecutor(
+            max_workers=max(1, min(self.workers, len(tasks) or 1)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_render_worker,
+            initargs=(self.texture_dir,),
+        )
+        done = failed = 0
+        try:
+            futures = {pool.submit(_render_region_worker, source, coords, str(world_out)): (name, coords) for name, source, coords, world_out in tasks}
+            for future in as_completed(futures):
+                name, coords = futures[future]
+                if not self.running:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                try:
+                    _, coverage = future.result()
+                    done += 1
+                    elapsed = max(time.time() - start_time, 1e-9)
+                    print(f"[{name}] region {coords} {coverage:.0%} covered | {done}/{len(tasks)} | {done / elapsed * 60:.1f} regions/min")
+                except Exception as e:
+                    failed += 1
+                    print(f"[{name}] region {coords} failed: {e}")
+
+            zooms = {}
+            if self.running:
+                pyramids = {pool.submit(build_pyramid, self.out_dir / self.world_key(name)): name for name, _, _ in jobs}
+                for future in as_completed(pyramids):
+                    zooms[pyramids[future]] = future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        print(f"\n[Done] {done} regions rendered, {failed} failed in {time.time() - start_time:.1f}s. Maps in: {self.out_dir}")
+        return zooms
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Render top-down PNG map tiles of Minecraft worlds.")
+    parser.add_argument("source", help="Directory searched recursively for worlds, or a volume store with --store.")
+    parser.add_argument("--out", default="maps", help="Output directory, one tile pyramid per world.")
+    parser.add_argument("--store", action="store_true", help="Render the volumes of a VolumeStore instead of world files.")
+    parser.add_argument("--worlds", nargs="*", default=None, help="Only these worlds of the store.")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes, defaults to the CPU count.")
+    parser.add_argument("--amulet", action="store_true", help="Extract through amulet instead of the native .mca reader.")
+    parser.add_argument("--force", action="store_true", help="Re-render regions that already have a tile.")
+    args = parser.parse_args(argv)
+
+    renderer = MapRenderer(args.out, workers=args.workers, native=not args.amulet)
+    jobs = renderer.store_jobs(args.source, args.worlds) if args.store else renderer.world_jobs(args.source)
+    renderer.render(jobs, skip_existing=not args.force)
+
+
+if __name__ == "__main__":
+    main()
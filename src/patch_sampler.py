@@ -0,0 +1,199 @@
+from collections import OrderedDict
+from typing import Generator, List, Optional
+import numpy as np
+from volume_store import SECTION_SIZE, VolumeStore
+
+
+class PatchSampler:
+    """
+    Fixed-size 3-D patch sampler over a :class:`VolumeStore`.
+
+    Candidate patches come from the per-region occupancy grid written with every
+    volume, so air-only space is never read. Patch origins are aligned to 16-block
+    sections and only the requested slice is decompressed from the store.
+
+    ``mode="random"`` draws an occupied section uniformly over the whole dataset
+    and places a patch around it, ``mode="sliding"`` walks every window (with
+    ``stride``) that touches at least one occupied section. Iterating from several
+    DataLoader-style workers splits the work by ``worker_id``/``num_workers``.
+
+    Patches come with a (px, pz) biome map, or with the (px/4, pz/4, py/4) biome
+    cells of the patch when ``biomes_3d`` is set. Stored 2-D maps are then
+    repeated over the height.
+    """
+
+    def __init__(
+        self,
+        store: VolumeStore,
+        patch_size: tuple = (64, 64, 64),
+        batch_size: int = 16,
+        mode: str = "random",
+        stride: tuple = None,
+        worlds: List[str] = None,
+        num_batches: Optional[int] = None,
+        seed: int = 0,
+        max_open_regions: int = 32,
+        biomes_3d: bool = False,
+    ) -> None:
+        if mode not in ("random", "sliding"):
+            raise ValueError(f"Unknown sampling mode '{mode}'.")
+        if any(p % SECTION_SIZE for p in patch_size):
+            raise ValueError(f"Patch size must be a multiple of {SECTION_SIZE}, got {patch_size}.")
+
+        self.store = store
+        self.patch_size = tuple(patch_size)
+        self.batch_size = batch_size
+        self.mode = mode
+        self.stride = tuple(stride or patch_size)
+        self.num_batches = num_batches
+        self.seed = seed
+        self.max_open_regions = max_open_regions
+        self.biomes_3d = biomes_3d
+        self._open_regions = OrderedDict()
+
+        self.regions = []
+        self.occupancy = []
+        for world in worlds or store.worlds():
+            for region in store.regions(world):
+                grid = store.occupancy(world, region)
+                if grid.any():
+                    self.regions.append((world, region))
+                    self.occupancy.append(grid)
+
+        self._sections = [np.argwhere(grid) for grid in self.occupancy]
+        counts = np.array([len(s) for s in self._sections], dtype=np.float64)
+        self._region_weights = counts / counts.sum() if counts.sum() else counts
+
+    def __len__(self) -> int:
+        if self.mode == "sliding":
+            return -(-len(self.windows()) // self.batch_size)
+        return self.num_batches or 0
+
+    def _open(self, index: int) -> tuple:
+        arrays = self._open_regions.get(index)
+        if arrays is None:
+            world, region = self.regions[index]
+            volume = self.store.open(world, region)
+            biomes = None
+            layer = 0
+            if self.store.region_path(world, region, "biomes").is_file():
+                biomes = self.store.open(world, region, "biomes")
+                if biomes.ndim == 3:
+                    # 2-D patch maps show the cell layer at y=0, like the extractor's own maps
+                    layer = min(max(-volume.schunk.vlmeta["y_offset"] // 4, 0), biomes.shape[2] - 1)
+            arrays = (volume, biomes, layer)
+            self._open_regions[index] = arrays
+            if len(self._open_regions) > self.max_open_regions:
+                self._open_regions.popitem(last=False)
+        else:
+            self._open_regions.move_to_end(index)
+        return arrays
+
+    def read_patch(self, index: int, origin: tuple) -> tuple:
+        """Blocks (px, pz, py) and biomes (px, pz) of one patch, zero-padded past the volume edge."""
+        volume, biomes, layer = self._open(index)
+        x, z, y = origin
+        px, pz, py = self.patch_size
+
+        blocks = np.zeros(self.patch_size, dtype=volume.dtype)
+        data = volume[x:x + px, z:z + pz, y:y + py]
+        blocks[:data.shape[0], :data.shape[1], :data.shape[2]] = data
+
+        if self.biomes_3d:
+            patch_biomes = np.zeros((px // 4, pz // 4, py // 4), dtype=np.uint16)
+            if biomes is not None and biomes.ndim == 3:
+                data = biomes[x // 4:(x + px) // 4, z // 4:(z + pz) // 4, y // 4:(y + py) // 4]
+            elif biomes is not None:
+                data = np.repeat(biomes[x:x + px:4, z:z + pz:4][:, :, None], py // 4, axis=2)
+        else:
+            patch_biomes = np.zeros((px, pz), dtype=np.uint16)
+            if biomes is not None and biomes.ndim == 3:
+                cells = biomes[x // 4:(x + px) // 4, z // 4:(z + pz) // 4, layer]
+                data = np.repeat(np.repeat(cells, 4, axis=0), 4, axis=1)
+            elif biomes is not None:
+                data = biomes[x:x + px, z:z + pz]
+        if biomes is not None:
+            patch_biomes[tuple(slice(0, n) for n in data.shape)] = data
+        return blocks, patch_biomes
+
+    def _random_origin(self, rng: np.random.Generator, index: int) -> tuple:
+        sections = self._sections[index]
+        sx, sz, sy = sections[rng.integers(len(sections))]
+        grid_shape = self.occupancy[index].shape
+
+        origin = []
+        for s, p, n in zip((sx, sz, sy), self.patch_size, grid_shape):
+            cells = p // SECTION_SIZE
+            low = max(0, s - cells + 1)
+            high = max(low, min(s, n - cells))
+            origin.append(int(rng.integers(low, high + 1)) * SECTION_SIZE)
+        return tuple(origin)
+
+    def windows(self) -> List[tuple]:
+        """Every ``(region_index, origin)`` sliding window that touches an occupied section."""
+        cells = [p // SECTION_SIZE for p in self.patch_size]
+        steps = [max(1, s // SECTION_SIZE) for s in self.stride]
+
+        windows = []
+        for index, grid in enumerate(self.occupancy):
+            ranges = [range(0, max(1, n - c + 1), st) for n, c, st in zip(grid.shape, cells, steps)]
+            for i in ranges[0]:
+                for j in ranges[1]:
+                    for k in ranges[2]:
+                        if grid[i:i + cells[0], j:j + cells[1], k:k + cells[2]].any():
+                            windows.append((index, (i * SECTION_SIZE, j * SECTION_SIZE, k * SECTION_SIZE)))
+        return windows
+
+    def _iter_items(self, worker_id: int, num_workers: int) -> Generator[tuple, None, None]:
+        if self.mode == "sliding":
+            yield from self.windows()[worker_id::num_workers]
+            return
+
+        if not self.regions:
+            return
+        rng = np.random.default_rng([self.seed, worker_id])
+        total = None
+        if self.num_batches is not None:
+            per_worker = -(-self.num_batches // num_workers)
+            total = per_worker * self.batch_size
+
+        produced = 0
+        while total is None or produced < total:
+            index = int(rng.choice(len(self.regions), p=self._region_weights))
+            yield index, self._random_origin(rng, index)
+            produced += 1
+
+    def iter_batches(self, worker_id: int = 0, num_workers: int = 1) -> Generator[dict, None, None]:
+        """
+        Yield batches as dicts with ``blocks`` (B, px, pz, py), ``biomes`` (B, px, pz)
+        or (B, px/4, pz/4, py/4) with ``biomes_3d``,
+        ``regions`` [(world, region)] and ``origins`` [(x, z, y)] inside each region.
+        """
+        batch = []
+        for item in self._iter_items(worker_id, num_workers):
+            batch.append(item)
+            if len(batch) == self.batch_size:
+                yield self._collate(batch)
+                batch = []
+        if batch:
+            yield self._collate(batch)
+
+    def _collate(self, items: List[tuple]) -> dict:
+        patches = [self.read_patch(index, origin) for index, origin in items]
+        return {
+            "blocks": np.stack([blocks for blocks, _ in patches]),
+            "biomes": np.stack([biomes for _, biomes in patches]),
+            "regions": [self.regions[index] for index, _ in items],
+            "origins": [origin for _, origin in items],
+        }
+
+    def __iter__(self) -> Generator[dict, None, None]:
+        worker_id, num_workers = 0, 1
+        try:
+            from torch.utils.data import get_worker_info
+            info = get_worker_info()
+            if info is not None:
+                worker_id, num_workers = info.id, info.num_workers
+        except ImportError:
+            pass
+        return self.iter_batches(worker_id, num_workers)
@@ -0,0 +1,283 @@
+from pathlib import Path
+from typing import List
+import argparse
+import json
+import os
+import signal
+import time
+from fingerprint import NEAR_DUPLICATE_THRESHOLD, FingerprintIndex
+from instrumentation import configure, metrics, summarize_file
+from region_extractor import BlockStates, MinecraftRegionExtractor, WorldWrapper
+from region_stats import RegionStatsSink, parquet_available, region_key
+from volume_store import VolumeStore
+
+
+class JobManifest:
+    """
+    Append-only JSON-lines record of finished ``(world, region)`` units.
+
+    Every line is flushed and fsynced before the unit counts as done, so a crash
+    or Ctrl-C loses at most the region that was being written.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.completed = set()
+
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.completed.add((record["world"], tuple(record["region"])))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+
+    def __contains__(self, key: tuple) -> bool:
+        world, region = key
+        return (world, tuple(region)) in self.completed
+
+    def __len__(self) -> int:
+        return len(self.completed)
+
+    def mark_done(self, world: str, region: tuple, **info) -> None:
+        record = {"world": world, "region": [int(region[0]), int(region[1])], **info}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.completed.add((world, tuple(region)))
+
+
+class DatasetPipeline:
+    def __init__(
+        self,
+        data_dir: str,
+        store_dir: str,
+        workers: int = None,
+        min_inhabited_time: float = 0,
+        native: bool = False,
+        max_open_worlds: int = 4,
+        manifest_path: str = None,
+        biomes_3d: bool = False,
+        dedup: bool = True,
+        near_duplicate_threshold: float = NEAR_DUPLICATE_THRESHOLD,
+        stats: bool = True,
+    ) -> None:
+        self.running = True
+        self.data_dir = data_dir
+        self.workers = workers
+        self.min_inhabited_time = min_inhabited_time
+        self.native = native
+        self.biomes_3d = biomes_3d
+        self.dedup = dedup
+        self.near_duplicate_threshold = near_duplicate_threshold
+
+        self.extractor = MinecraftRegionExtractor(data_dir, max_open_worlds=max_open_worlds)
+        self.store = VolumeStore(store_dir)
+        self.manifest = JobManifest(manifest_path or Path(store_dir) / "manifest.jsonl")
+        self.fingerprints = FingerprintIndex(Path(store_dir) / "fingerprints.jsonl") if dedup else None
+        if stats and not parquet_available():
+            print("No Parquet engine installed (pip install pyarrow), region statistics are not recorded.")
+            stats = False
+        self.stats = RegionStatsSink(Path(store_dir) / "stats") if stats else None
+
+        signal.signal(signal.SIGINT, self.handle_exit)
+
+    def handle_exit(self, signum, frame):
+        print("\n[!] Exit signal received. Finishing the current region and stopping...")
+        self.running = False
+
+    def world_name(self, index: int) -> str:
+        world_dir = os.path.dirname(self.extractor.world_paths[index])
+        return os.path.relpath(world_dir, self.data_dir)
+
+    def select_regions(self, world: WorldWrapper) -> List[tuple]:
+        """Regions whose mean chunk InhabitedTime reaches ``min_inhabited_time``."""
+        coords = sorted(world.mca_coords)
+        if self.min_inhabited_time <= 0 or not coords:
+            return coords
+
+        grid = world.inhabited_time_map(self.workers)
+        min_rx = min(x for x, _ in coords)
+        min_rz = min(z for _, z in coords)
+
+        selected = []
+        for rx, rz in coords:
+            tile = grid[(rz - min_rz) * 32:(rz - min_rz + 1) * 32, (rx - min_rx) * 32:(rx - min_rx + 1) * 32]
+            present = tile[tile >= 0]
+            if present.size and present.mean() >= self.min_inhabited_time:
+                selected.append((rx, rz))
+        return selected
+
+    def find_duplicates(self, name: str, coords: tuple, fingerprint) -> tuple:
+        """
+        The stored region with exactly the same content, or None, and the
+        ``[world, region, similarity]`` of stored near-duplicates.
+        """
+        key = (name, tuple(coords))
+        original = next((k for k in self.fingerprints.duplicates(fingerprint) if k != key and k in self.store), None)
+        if original is not None:
+            return original, []
+        near = self.fingerprints.similar(fingerprint, self.near_duplicate_threshold, limit=5)
+        return None, [[world, list(region), round(score, 3)] for world, region, score in near if (world, region) != key]
+
+    def _write_stats(self, write, *args, **kwargs) -> None:
+        """
+        The statistics table is secondary data: a failed write is reported and the
+        rows stay buffered for the next flush, the extraction goes on.
+        """
+        try:
+            write(*args, **kwargs)
+        except Exception as e:
+            print(f"Could not write region statistics to {self.stats.path}: {e}")
+
+    def store_region(self, name: str, coords: tuple, volume, biomes, y_offset: int, fingerprint, stats, version: int) -> None:
+        """Write one extracted region, unless it duplicates a stored one, and mark it done."""
+        region_start = time.time()
+        duplicate_of, near_duplicates, info = None, [], {}
+        if fingerprint is not None:
+            duplicate_of, near_duplicates = self.find_duplicates(name, coords, fingerprint)
+
+        if near_duplicates:
+            info["near_duplicates"] = near_duplicates
+            other, region, score = near_duplicates[0]
+            print(f"[{name}] region {coords} is {score:.0%} similar to {other} r.{region[0]}.{region[1]}")
+        if duplicate_of is not None:
+            # Same content is already stored, the costly write is skipped
+            info["duplicate_of"] = [duplicate_of[0], list(duplicate_of[1])]
+            print(f"[{name}] region {coords} duplicates {duplicate_of[0]} r.{duplicate_of[1][0]}.{duplicate_of[1][1]}, not written")
+        else:
+            with metrics.timer("region_write"):
+                self.store.write(name, coords, volume, biomes, y_offset, version)
+            metrics.emit("region_write", world=name, region=list(coords), bytes=int(volume.nbytes))
+        if fingerprint is not None:
+            self.fingerprints.add(name, coords, fingerprint, **info)
+        if stats is not None:
+            duplicate = region_key(*duplicate_of) if duplicate_of is not None else None
+            self._write_stats(self.stats.add_region, name, coords, stats, stored=duplicate_of is None, duplicate_of=duplicate)
+
+        self.manifest.mark_done(
+            name,
+            coords,
+            shape=list(volume.shape),
+            y_offset=int(y_offset),
+            write_seconds=round(time.time() - region_start, 3),
+            finished_at=time.strftime("%Y-%m-%d %H:%M:%S"),
+            **info,
+        )
+
+    def run(self):
+        start_time = time.time()
+        done_regions = 0
+        done_bytes = 0
+        failed = []
+        registry = BlockStates.shared()
+
+        print(f"Found {len(self.extractor.worlds)} worlds, {len(self.manifest)} regions already done.")
+
+        for i in range(len(self.extractor.worlds)):
+            if not self.running: break
+
+            world = self.extractor.worlds[i]
+            name = self.world_name(i)
+            pending = [c for c in self.select_regions(world) if (name, c) not in self.manifest]
+            print(f"--- [World {i+1}/{len(self.extractor.worlds)}: {name}] [Pending regions: {len(pending)}] ---")
+            if not pending:
+                continue
+
+            def region_failed(coords, error):
+                failed.append((name, coords))
+                print(f"[{name}] Error while extracting region {coords}: {error}. It is retried on the next run.")
+
+            results = world.extract_regions(
+                pending,
+                self.workers,
+                native=self.native,
+                return_y_offset=True,
+                biomes_3d=self.biomes_3d,
+                fingerprint=self.dedup,
+                stats=self.stats is not None,
+                on_error=region_failed,
+            )
+            try:
+                for coords, volume, biomes, y_offset, *extra in results:
+                    fingerprint = extra.pop(0) if self.dedup else None
+                    stats = extra.pop(0) if self.stats is not None else None
+                    try:
+                        self.store_region(name, coords, volume, biomes, y_offset, fingerprint, stats, registry.version)
+                    except Exception as e:
+                        # Not marked done, so the region is retried on the next run
+                        region_failed(coords, e)
+                        if not self.running: break
+                        continue
+
+                    done_regions += 1
+                    done_bytes += volume.nbytes
+                    elapsed = max(time.time() - start_time, 1e-9)
+                    print(
+                        f"[{name}] region {coords} {volume.shape} | "
+                        f"{done_regions / elapsed * 60:.1f} regions/min, {done_bytes / elapsed / 1e6:.1f} MB/s"
+                    )
+                    if not self.running: break
+            except Exception as e:
+                if not self.running: break
+                print(f"Error while extracting {name}: {e}. Skipping to the next world...")
+            finally:
+                results.close()
+                world.close()
+                if self.stats is not None:
+                    self._write_stats(self.stats.flush)
+
+        elapsed = max(time.time() - start_time, 1e-9)
+        print(
+            f"\n[Done] {done_regions} regions in {elapsed:.1f}s "
+            f"({done_regions / elapsed * 60:.1f} regions/min, {done_bytes / elapsed / 1e6:.1f} MB/s). "
+            f"Store: {self.store.root}"
+        )
+        if failed:
+            print(f"{len(failed)} regions failed and stay pending: " + ", ".join(f"{world} r.{x}.{z}" for world, (x, z) in failed))
+        if metrics.path and metrics.path.exists():
+            print(summarize_file(metrics.path))
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Extract a directory of Minecraft worlds into a compressed volume dataset.")
+    parser.add_argument("data_dir", help="Directory searched recursively for worlds (level.dat).")
+    parser.add_argument("--store", default="dataset", help="Output directory of the volume store.")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes for --native, defaults to the CPU count; the amulet path uses one.")
+    parser.add_argument("--min-inhabited-time", type=float, default=0, help="Only extract regions with at least this mean chunk InhabitedTime.")
+    parser.add_argument("--native", action="store_true", help="Decode .mca files directly instead of through amulet.")
+    parser.add_argument("--biomes-3d", action="store_true", help="Store 4x4x4 biome cells (X/4, Z/4, Y/4) instead of a 2-D biome map.")
+    parser.add_argument("--no-dedup", action="store_true", help="Write every region, without fingerprinting or duplicate checks.")
+    parser.add_argument("--near-duplicate-threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD, help="MinHash similarity from which a region is flagged as a near-duplicate.")
+    parser.add_argument("--no-stats", action="store_true", help="Do not record per-region block/biome statistics in <store>/stats (Parquet, needs pyarrow).")
+    parser.add_argument("--max-open-worlds", type=int, default=4)
+    parser.add_argument("--manifest", default=None, help="Job manifest path, defaults to <store>/manifest.jsonl.")
+    parser.add_argument("--metrics", default=None, help="Write per-region stage timings to this JSON-lines file.")
+    parser.add_argument("--profile", default=None, help="Dump cProfile stats for snakeviz into this directory, one file per region.")
+    args = parser.parse_args(argv)
+
+    if args.metrics or args.profile:
+        configure(args.metrics, enabled=bool(args.metrics), profile_dir=args.profile)
+
+    pipeline = DatasetPipeline(
+        args.data_dir,
+        args.store,
+        workers=args.workers,
+        min_inhabited_time=args.min_inhabited_time,
+        native=args.native,
+        max_open_worlds=args.max_open_worlds,
+        manifest_path=args.manifest,
+        biomes_3d=args.biomes_3d,
+        dedup=not args.no_dedup,
+        near_duplicate_threshold=args.near_duplicate_threshold,
+        stats=not args.no_stats,
+    )
+    with metrics.profiled("pipeline"):
+        pipeline.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urljoin
+import re
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+
+# Only found on the interstitial itself: the /cdn-cgi/challenge-platform/ script is
+# injected into ordinary pages too. Throttling (429) is not a challenge either.
+CHALLENGE_MARKERS = (
+    "<title>Just a moment...</title>",
+    "<title>Attention Required! | Cloudflare</title>",
+    'id="challenge-form"',
+    "window._cf_chl_opt",
+)
+CHALLENGE_STATUSES = {403, 503}
+
+
+class Node:
+    """Element of the lightweight DOM built by :func:`parse_html`."""
+
+    __slots__ = ("tag", "attrs", "classes", "children", "parent")
+
+    def __init__(self, tag: str, attrs: dict, parent: Optional["Node"] = None) -> None:
+        self.tag = tag
+        self.attrs = attrs
+        self.classes = set((attrs.get("class") or "").split())
+        self.children = []
+        self.parent = parent
+
+    def get(self, attr: str, default: str = None) -> Optional[str]:
+        return self.attrs.get(attr, default)
+
+    @property
+    def text(self) -> str:
+        """Text content of the element and its descendants, whitespace-collapsed like Selenium's ``.text``."""
+        return re.sub(r"\s+", " ", "".join(self._iter_text())).strip()
+
+    def _iter_text(self):
+        for child in self.children:
+            if isinstance(child, str):
+                yield child
+            elif child.tag not in ("script", "style"):
+                yield from child._iter_text()
+                if child.tag in ("br", "p", "div", "li", "tr"):
+                    yield " "
+
+    @property
+    def elements(self) -> List["Node"]:
+        return [child for child in self.children if isinstance(child, Node)]
+
+    def iter(self):
+        for child in self.elements:
+            yield child
+            yield from child.iter()
+
+    def previous_element(self) -> Optional["Node"]:
+        if self.parent is None:
+            return None
+        siblings = self.parent.elements
+        index = siblings.index(self)
+        return siblings[index - 1] if index > 0 else None
+
+    def select(self, selector: str) -> List["Node"]:
+        matcher = compile_selector(selector)
+        return [node for node in self.iter() if matcher(node)]
+
+    def select_one(self, selector: str) -> Optional["Node"]:
+        matcher = compile_selector(selector)
+        return next((node for node in self.iter() if matcher(node)), None)
+
+
+class _DomBuilder(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document", {})
+        self._stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {k: (v if v is not None else "") for k, v in attrs}, self._stack[-1])
+        self._stack[-1].children.append(node)
+        if tag not in VOID_TAGS:
+            self._stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        node = Node(tag, {k: (v if v is not None else "") for k, v in attrs}, self._stack[-1])
+        self._stack[-1].children.append(node)
+
+    def handle_endtag(self, tag):
+        for i in range(len(self._stack) - 1, 0, -1):
+            if self._stack[i].tag == tag:
+                del self._stack[i:]
+                return
+
+    def handle_data(self, data):
+        self._stack[-1].children.append(data)
+
+
+def parse_html(html: str) -> Node:
+    builder = _DomBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+_COMPOUND_RE = re.compile(r"([a-zA-Z][\w-]*|\*)?((?:[.#][\w-]+|\[[^\]]+\])*)")
+_PART_RE = re.compile(r"\.([\w-]+)|#([\w-]+)|\[\s*([\w-]+)\s*(=\s*['\"]?([^'\"\]]*)['\"]?)?\s*\]")
+
+
+def _compile_compound(compound: str) -> Callable[[Node], bool]:
+    match = _COMPOUND_RE.fullmatch(compound)
+    if not match:
+        raise ValueError(f"Unsupported selector '{compound}'.")
+    tag = match.group(1)
+    classes, ids, attrs = set(), [], []
+    for cls, id_, attr, equals, value in _PART_RE.findall(match.group(2)):
+        if cls:
+            classes.add(cls)
+        elif id_:
+            ids.append(id_)
+        else:
+            attrs.append((attr, value if equals else None))
+
+    def matches(node: Node) -> bool:
+        if tag and tag != "*" and node.tag != tag:
+            return False
+        if not classes <= node.classes:
+            return False
+        if any(node.attrs.get("id") != id_ for id_ in ids):
+            return False
+        for attr, value in attrs:
+            if attr not in node.attrs or (value is not None and node.attrs[attr] != value):
+                return False
+        return True
+
+    return matches
+
+
+def compile_selector(selector: str) -> Callable[[Node], bool]:
+    """
+    Compile the small CSS subset the crawlers use: compound selectors
+    (``tag.class#id[attr='value']``) joined by descendant (space) and
+    adjacent sibling (``+``) combinators.
+    """
+    tokens = re.findall(r"\+|[^\s+]+", selector.strip())
+    steps: List[Tuple[str, Callable]] = []
+    combinator = " "
+    for token in tokens:
+        if token == "+":
+            combinator = "+"
+            continue
+        steps.append((combinator, _compile_compound(token)))
+        combinator = " "
+
+    def matches(node: Node, index: int = len(steps) - 1) -> bool:
+        combinator, matcher = steps[index]
+        if not matcher(node):
+            return False
+        if index == 0:
+            return True
+        if combinator == "+":
+            previous = node.previous_element()
+            return previous is not None and matches(previous, index - 1)
+        ancestor = node.parent
+        while ancestor is not None:
+            if matches(ancestor, index - 1):
+                return True
+            ancestor = ancestor.parent
+        return False
+
+    return matches
+
+
+def is_challenge_page(html: str, status: int = 200) -> bool:
+    """Detect anti-bot interstitials that need a real browser to get through."""
+    if status in CHALLENGE_STATUSES:
+        return True
+    head = html[:20000]
+    return any(marker in head for marker in CHALLENGE_MARKERS)
+
+
+def _safe_text(parent: Node, selector: str, attr: str = None) -> str:
+    el = parent.select_one(selector)
+    if el is None:
+        return "0" if "num" in selector or "span" in selector else ""
+    return (el.get(attr) or "") if attr else el.text
+
+
+def _parse_date(value: str) -> Optional[datetime]:
+    """A timeago title (ISO 8601, or an HTTP date) as an aware UTC datetime, None when it does not parse."""
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _latest_date(titles: List[str]) -> str:
+    """The title of the latest date, compared as dates rather than strings; titles that do not parse are skipped."""
+    latest, latest_title = None, ""
+    for title in titles:
+        parsed = _parse_date(title)
+        if parsed is not None and (latest is None or parsed > latest):
+            latest, latest_title = parsed, title
+    return latest_title
+
+
+def parse_listing(html: str, base_url: str = "") -> tuple:
+    """
+    Parse a project listing page in one pass.
+
+    Links are resolved against ``base_url`` (the page URL) so they match the
+    absolute URLs Selenium reports.
+
+    Returns:
+        (items, has_next) where items are dicts with the listing fields of
+        every ``li.resource`` entry and has_next tells whether a next page exists.
+    """
+    root = parse_html(html)
+    items = []
+    for item in root.select("li.resource[data-type='resource']"):
+        title_el = item.select_one("a.r-title")
+        if title_el is None:
+            continue
+        # An updated project shows its latest activity next to the publish date
+        dates = [abbr.get("title") for abbr in item.select(".contributed abbr.timeago") if abbr.get("title")]
+        items.append({
+            "id": item.get("data-id"),
+            "title": title_el.text,
+            "url": urljoin(base_url, title_el.get("href") or ""),
+            "category": _safe_text(item, ".r-subject"),
+            "creator": _safe_text(item, ".activity_name"),
+            "creator_id": _safe_text(item, ".activity_name", "data-mid"),
+            "views": _safe_text(item, "i.visibility + span"),
+            "downloads": _safe_text(item, "i.get_app + span"),
+            "comments": _safe_text(item, "i.chat_bubble + span"),
+            "diamonds": _safe_text(item, ".c-num-votes"),
+            "favorites": _safe_text(item, ".c-num-favs"),
+            "published_date": _safe_text(item, ".contributed abbr.timeago", "title"),
+            "updated_date": _latest_date(dates),
+        })
+
+    has_next = root.select_one("a.pagination_next") is not None
+    return items, has_next
+
+
+def _one_line(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def parse_details(html: str, base_url: str = "") -> dict:
+    """
+    Extract the project detail fields from a saved or live ``page_source``.
+
+    Mirrors ``DETAIL_SCRIPT`` in detail_crawler, so both paths produce the same
+    values: gallery URLs and ``{"name", "url"}`` mirrors are lists of links
+    resolved against ``base_url``, and the description is collapsed to one line.
+    """
+    root = parse_html(html)
+
+    breadcrumbs = root.select(".post_context a")
+    category = breadcrumbs[1].text if len(breadcrumbs) > 1 else "Unknown"
+
+    progress = "Unknown"
+    for row in root.select("table.resource-info tr"):
+        if "Progress" in row.text:
+            cell = row.select_one("td")
+            progress = cell.text if cell is not None else "Unknown"
+            break
+
+    platform_el = root.select_one(".platform")
+    author_el = root.select_one("#author_id")
+    description_el = root.select_one("#r-text-block")
+
+    images = []
+    for link in root.select("#light-gallery a.rsImg"):
+        if link.get("href"):
+            images.append(urljoin(base_url, link.get("href")))
+
+    dates = []
+    date_block = root.select_one(".post_date")
+    if date_block is not None:
+        dates = [abbr.get("title") or "" for abbr in date_block.select("abbr")]
+
+    mirrors = []
+    for link in root.select("ul.content-actions li a"):
+        url = urljoin(base_url, link.get("href")) if link.get("href") else ""
+        if url and ("download" in url or "mirror" in url):
+            mirrors.append({"name": _one_line(link.text), "url": url})
+
+    return {
+        "author_id": author_el.text if author_el is not None else "Unknown",
+        "category": category,
+        "platform": platform_el.text if platform_el is not None else "Unknown",
+        "progress": progress,
+        "description": _one_line(description_el.text) if description_el is not None else "",
+        "gallery_urls": images,
+        "download_mirrors": mirrors,
+        "date_published": dates[1] if len(dates) >= 2 else "",
+        "date_updated": dates[0] if dates else "",
+    }
@@ -0,0 +1,198 @@
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import random
+import threading
+import time
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Delay of a ``Retry-After`` header, given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Throttled(Exception):
+    """HTTP 429 from a host, ``retry_after`` is the delay it asked for, if any."""
+
+    def __init__(self, url: str, retry_after: Optional[float] = None) -> None:
+        wait = f", retry after {retry_after:.0f}s" if retry_after is not None else ""
+        super().__init__(f"HTTP 429 from {urlparse(url).netloc or url}{wait}")
+        self.url = url
+        self.retry_after = retry_after
+
+
+class _Bucket:
+    __slots__ = ("rate", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+
+class AdaptiveRateLimiter:
+    """
+    Per-host token bucket whose refill rate adapts AIMD-style to how the site responds.
+
+    Every request takes a token, so requests to one host are spaced at ``1 / rate``
+    seconds no matter how many threads share the limiter. Fast successful responses
+    raise the rate additively by ``increase`` requests/s, and slow responses
+    (above ``target_latency``), error pages and challenge pages cut it by
+    ``decrease``. Challenge pages count twice. The rate always stays inside
+    ``[min_rate, max_rate]``.
+
+    A 429 goes to :meth:`throttled`, which also holds back the host for as long
+    as its ``Retry-After`` asks. :meth:`backoff` sleeps a jittered exponential
+    delay, or the ``Retry-After`` delay when longer, before retrying a failed
+    request, and :meth:`metrics` reports the current rates, retries and time
+    spent sleeping.
+    """
+
+    def __init__(
+        self,
+        rate: float = 0.5,
+        min_rate: float = 0.05,
+        max_rate: float = 4.0,
+        burst: float = 1.0,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        target_latency: float = 3.0,
+        jitter: float = 0.25,
+        backoff_base: float = 5.0,
+        backoff_cap: float = 120.0,
+    ) -> None:
+        self.initial_rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self.jitter = jitter
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _Bucket] = {}
+        self.requests = 0
+        self.successes = 0
+        self.errors = 0
+        self.challenges = 0
+        self.retries = 0
+        self.slept_seconds = 0.0
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlparse(url).netloc or url
+
+    def _bucket(self, host: str) -> _Bucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _Bucket(self.initial_rate, self.burst)
+        return bucket
+
+    def acquire(self, url: str) -> float:
+        """Block until a request to the host of ``url`` may be sent; returns the seconds waited."""
+        with self._lock:
+            bucket = self._bucket(self.host(url))
+            now = time.monotonic()
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+            # Taking the token before sleeping reserves this slot, later callers queue up behind it
+            bucket.tokens -= 1
+            delay = -bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0
+            self.requests += 1
+
+        if delay > 0:
+            delay *= random.uniform(1.0, 1.0 + self.jitter)
+            self._sleep(delay)
+        return delay
+
+    def _sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+        with self._lock:
+            self.slept_seconds += seconds
+
+    def _set_rate(self, host: str, rate: float) -> None:
+        bucket = self._bucket(host)
+        bucket.rate = min(self.max_rate, max(self.min_rate, rate))
+
+    def success(self, url: str, latency: float) -> None:
+        """Feed back a served page and how long it took."""
+        host = self.host(url)
+        with self._lock:
+            self.successes += 1
+            rate = self._bucket(host).rate
+            if latency > self.target_latency:
+                self._set_rate(host, rate * self.decrease)
+            else:
+                self._set_rate(host, rate + self.increase)
+
+    def failure(self, url: str, challenge: bool = False) -> None:
+        """Feed back an error or throttling response, or an anti-bot challenge when ``challenge``."""
+        host = self.host(url)
+        with self._lock:
+            if challenge:
+                self.challenges += 1
+            else:
+                self.errors += 1
+            factor = self.decrease ** 2 if challenge else self.decrease
+            self._set_rate(host, self._bucket(host).rate * factor)
+
+    def throttled(self, url: str, retry_after: Optional[float] = None) -> None:
+        """Feed back a 429; no request to the host is let through before ``retry_after`` seconds."""
+        host = self.host(url)
+        with self._lock:
+            self.errors += 1
+            bucket = self._bucket(host)
+            self._set_rate(host, bucket.rate * self.decrease)
+            if retry_after:
+                now = time.monotonic()
+                # The next acquire() takes its token and then waits out the rest
+                bucket.tokens = min(bucket.tokens + (now - bucket.updated) * bucket.rate, 1 - retry_after * bucket.rate)
+                bucket.updated = now
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Sleep before retry number ``attempt`` (1-based), jittered between half and
+        all of the exponential delay, and at least ``retry_after`` seconds.
+        """
+        ceiling = min(self.backoff_cap, self.backoff_base * 2 ** max(0, attempt - 1))
+        delay = max(random.uniform(ceiling / 2, ceiling), retry_after or 0.0)
+        with self._lock:
+            self.retries += 1
+        self._sleep(delay)
+        return delay
+
+    def rate(self, url: str) -> float:
+        with self._lock:
+            return self._bucket(self.host(url)).rate
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "rates": {host: round(bucket.rate, 3) for host, bucket in self._buckets.items()},
+                "requests": self.requests,
+                "successes": self.successes,
+                "errors": self.errors,
+                "challenges": self.challenges,
+                "retries": self.retries,
+                "slept_seconds": round(self.slept_seconds, 2),
+            }
+
+    def summary(self) -> str:
+        m = self.metrics()
+        rates = ", ".join(f"{host} {rate:.2f}/s" for host, rate in m["rates"].items()) or "-"
+        return (
+            f"Rate: {rates} | Requests: {m['requests']} | Errors: {m['errors']} | "
+            f"Challenges: {m['challenges']} | Retries: {m['retries']} | Slept: {m['slept_seconds']:.1f}s"
+        )
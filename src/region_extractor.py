@@ -1,26 +1,59 @@
 from amulet.api.block import Block
+from amulet.api.chunk.biomes import BiomesShape
 from amulet.api.registry import BlockManager
-from itertools import product
-from networkx import volume
+from amulet_nbt import StringTag
+from anvil_reader import AIR_BLOCK, AnvilRegion, ChunkSections, read_region_locations, region_inhabited_times, section_span
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fingerprint import Fingerprint, block_histogram
+from instrumentation import metrics
 from pathlib import Path
-from typing import List
+from region_stats import region_stats
+from registry import Registry
+from typing import Callable, Generator, Iterable, List, Optional
 import amulet
-import anvil
+import PyMCTranslate
 import glob 
+import json
+import multiprocessing
 import numpy as np
-import re
+import os
+import signal
+import time
 
 
 
 class WorldWrapper:
+    INDEX_FILE = ".mc_index.json"
+
     def __init__(self, world_path: Path) -> None:
-        self._world = amulet.load_level(world_path)
-        self._mca_files = glob.glob(f"{world_path}/**/region/*.mca", recursive=True)
+        self._world_path = world_path
+        self._level = None
+        self._index = self._load_index()
+        self._mca_files = self._index_region_files()
         self._mca_coords = tuple(tuple(int(val) for val in file.stem.split(".")[-2:]) for file in map(Path, self._mca_files))
         self._mca_coord_to_path = {(x, z): path for (x, z), path in zip(self._mca_coords, self._mca_files)}
-        self._chunk_coords = tuple(self._world.all_chunk_coords("minecraft:overworld"))
-        self._blockstates = BlockStates()
-        self._biomes = Biomes()
+        self._chunk_coords = None
+        self._blockstates = BlockStates.shared()
+        self._biomes = Biomes.shared()
+
+    @property
+    def _world(self):
+        """The amulet level, only loaded on first use."""
+        if self._level is None:
+            self._level = amulet.load_level(str(self._world_path))
+        return self._level
+
+    @property
+    def is_open(self) -> bool:
+        return self._level is not None
+
+    def close(self) -> None:
+        """Release the amulet level handle, it is reopened on the next access."""
+        if self._level is not None:
+            self._level.close()
+            self._level = None
     
     @property
     def mca_coords(self) -> List[tuple]:
@@ -28,80 +61,572 @@ class WorldWrapper:
 
     @property
     def chunk_coords(self) -> List[tuple]:
+        if self._chunk_coords is None:
+            self._chunk_coords = self._index_chunk_coords()
         return self._chunk_coords
     
     def misc_keys(self) -> None:
-        x, z = list(self._chunk_coords)[0]
+        x, z = list(self.chunk_coords)[0]
         return self._world.get_chunk(x, z, "minecraft:overworld").misc.keys()
+
+    def _index_path(self) -> Path:
+        return Path(self._world_path) / self.INDEX_FILE
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self._index_path(), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self) -> None:
+        try:
+            with open(self._index_path(), "w") as f:
+                json.dump(self._index, f)
+        except OSError:
+            pass
+
+    def _index_region_files(self) -> List[str]:
+        """Region file listing, reused from the index while the region directories are unchanged."""
+        world_path = Path(self._world_path)
+        region_dirs = self._index.get("region_dirs")
+        if region_dirs:
+            try:
+                if all(os.path.getmtime(world_path / d) == mtime for d, mtime in region_dirs.items()):
+                    return [str(world_path / f) for f in self._index["mca_files"]]
+            except OSError:
+                pass
+
+        files = glob.glob(f"{glob.escape(str(world_path))}/**/region/*.mca", recursive=True)
+        relative = [os.path.relpath(f, world_path) for f in files]
+        self._index["region_dirs"] = {d: os.path.getmtime(world_path / d) for d in {os.path.dirname(f) for f in relative}}
+        self._index["mca_files"] = relative
+        self._index.pop("chunks", None)
+        self._save_index()
+        return files
+
+    def _index_chunk_coords(self) -> tuple:
+        """Overworld chunk coordinates read from the region headers, cached per ``.mca`` mtime."""
+        overworld = Path(self._world_path) / "region"
+        cached = self._index.get("chunks", {})
+        chunks = {}
+        coords = []
+
+        for (region_x, region_z), path in sorted(self._mca_coord_to_path.items()):
+            if Path(path).parent != overworld:
+                continue
+            relative = os.path.relpath(path, self._world_path)
+            mtime = os.path.getmtime(path)
+            entry = cached.get(relative)
+            if entry is None or entry["mtime"] != mtime:
+                entry = {"mtime": mtime, "chunks": np.flatnonzero(read_region_locations(path)).tolist()}
+            chunks[relative] = entry
+            coords.extend((region_x * 32 + i % 32, region_z * 32 + i // 32) for i in entry["chunks"])
+
+        if chunks != cached:
+            self._index["chunks"] = chunks
+            self._save_index()
+        return tuple(coords)
     
-    def get_region_volume(self, region_x: int, region_z: int) -> np.array:
+    def get_region_volume(self, region_x: int, region_z: int, return_y_offset: bool = False, out: np.array = None, biomes_3d: bool = False) -> np.array:
+        """
+        Block volume (512, 512, H) in (x, z, y) order and biome map (512, 512) of a region.
+
+        All chunks are loaded and their sections classified first, see
+        :meth:`scan_chunks`, which gives the band of y-layers holding blocks. Only
+        that band is allocated (or written, when ``out`` of the untrimmed
+        :meth:`region_volume_shape` is given) and translated, and the returned
+        volume is its exactly trimmed view.
+
+        With ``biomes_3d`` the biome map is replaced by the (128, 128, H/4) volume of
+        4x4x4 biome cells. The y-trim is then widened to whole cells, so cell
+        ``[i, j, k]`` covers blocks ``[4i:4i+4, 4j:4j+4, 4k:4k+4]`` of the volume.
+        """
         if (region_x, region_z) not in self._mca_coords:
             raise ValueError(f"Region ({region_x}, {region_z}) not found in world.")
 
+        started = time.perf_counter()
+        shape = self.region_volume_shape(region_x, region_z)
+        min_y = self._world.bounds("minecraft:overworld").min_y
+        try:
+            chunks = self.scan_chunks(region_x, region_z)
+            band = layer_band((self._amulet_chunk_layers(sections) for _, _, _, sections in chunks), shape[2])
+            columns = self.iter_chunks(region_x, region_z, y_band=band, chunks=chunks)
+            volume, biomes, start = self._assemble_region(columns, shape, out, min_y, biomes_3d, band)
+        finally:
+            self._world.unload()
+        self._emit_region_metrics(region_x, region_z, "amulet", volume, started)
+        if return_y_offset:
+            return volume, biomes, min_y + start
+        return volume, biomes
+
+    def get_region_volume_native(self, region_x: int, region_z: int, return_y_offset: bool = False, out: np.array = None, biomes_3d: bool = False) -> np.array:
+        """
+        Fast path of :meth:`get_region_volume` reading the ``.mca`` file directly.
+
+        Block states are translated to the same universal strings amulet produces,
+        once per distinct palette, so both paths share global IDs; so are biomes,
+        from the section palettes or the numeric ``Biomes`` array of older chunks.
+
+        The y-band is taken from the section palettes and the ``WORLD_SURFACE``
+        heightmaps before any block data is unpacked. Air-only sections are never
+        decoded and single-block sections are filled without decoding.
+        """
+        path = self._mca_coord_to_path.get((region_x, region_z))
+        if path is None:
+            raise ValueError(f"Region ({region_x}, {region_z}) not found in world.")
+
+        started = time.perf_counter()
+        region = AnvilRegion(path)
+        chunks = self.scan_chunks_native(region_x, region_z, region)
+        # Chunks keep their own layout until the game upgrades them, so one region
+        # may mix pre- and post-1.18 Y ranges; the volume covers both
+        span = section_span({sections.data_version for _, _, sections in chunks} or {region.data_version()})
+        min_section, section_count = span
+        shape = (512, 512, section_count * 16)
+        band = layer_band((_native_chunk_layers(sections, min_section) for _, _, sections in chunks), shape[2])
+        columns = self.iter_chunks_native(region_x, region_z, y_band=band, chunks=chunks, section_span=span)
+        volume, biomes, start = self._assemble_region(columns, shape, out, min_section * 16, biomes_3d, band)
+        self._emit_region_metrics(region_x, region_z, "native", volume, started)
+        if return_y_offset:
+            return volume, biomes, min_section * 16 + start
+        return volume, biomes
+
+    def _emit_region_metrics(self, region_x: int, region_z: int, backend: str, volume: np.array, started: float) -> None:
+        metrics.emit(
+            "region",
+            world=str(self._world_path),
+            region=[region_x, region_z],
+            backend=backend,
+            shape=list(volume.shape),
+            seconds=round(time.perf_counter() - started, 6),
+        )
+
+    def region_volume_shape(self, region_x: int, region_z: int, native: bool = False) -> tuple:
+        """Untrimmed shape of a region volume, for allocating an ``out`` buffer (e.g. ``np.memmap``)."""
+        if native:
+            region = AnvilRegion(self._mca_coord_to_path[(region_x, region_z)])
+            return (512, 512, section_span(region.data_versions())[1] * 16)
+
         bounds = self._world.bounds("minecraft:overworld")
         height = (bounds.max_y - bounds.min_y)
+        return (512, 512, (height // 16 + 1) * 16)
+
+    def scan_chunks(self, region_x: int, region_z: int) -> List[tuple]:
+        """
+        Load every chunk of a region through amulet without translating its blocks.
 
-        volume_6d = np.zeros((32, 32, height // 16 + 1, 16, 16, 16), dtype=np.uint16)
-        biomes = np.zeros((512, 512), dtype=np.uint16)
+        Returns:
+            (rx, rz, chunk, sections) per chunk, see :meth:`_amulet_sections`.
+        """
+        return list(self._load_chunks(region_x, region_z))
+
+    def _load_chunks(self, region_x: int, region_z: int) -> Generator[tuple, None, None]:
+        section_count = self.region_volume_shape(region_x, region_z)[2] // 16
+        min_section = self._world.bounds("minecraft:overworld").min_y // 16
 
         for rx in range(32):
             for rz in range(32):
                 chunk_coords = self.to_chunk_coords(region_x, region_z, rx, rz)
                 try:
-                    chunk = self._world.get_chunk(chunk_coords["x"], chunk_coords["z"], "minecraft:overworld")
+                    with metrics.timer("chunk_load"):
+                        chunk = self._world.get_chunk(chunk_coords["x"], chunk_coords["z"], "minecraft:overworld")
                 except:
                     continue
+                with metrics.timer("section_decode"):
+                    sections = self._amulet_sections(chunk, min_section, section_count)
+                yield rx, rz, chunk, sections
+
+    def _amulet_sections(self, chunk, min_section: int, section_count: int) -> List[tuple]:
+        """
+        (index, sub_chunk, uniform) of the sections of an amulet chunk, ``index``
+        counted from the bottom of the world. ``uniform`` is the global ID of a
+        section made of a single block (0 for air), None for mixed sections.
+        """
+        lut = self._blockstates._palette_lut(chunk._block_palette)
+        sections = []
+        for cy in sorted(chunk.blocks.sections):
+            i = cy - min_section
+            if not 0 <= i < section_count:
+                continue
+            sub_chunk = chunk.blocks.get_sub_chunk(cy)
+            low = sub_chunk.min()
+            uniform = int(lut[low]) if low == sub_chunk.max() else None
+            sections.append((i, sub_chunk, uniform))
+        return sections
+
+    @staticmethod
+    def _amulet_chunk_layers(sections: List[tuple]) -> Optional[tuple]:
+        occupied = [i for i, _, uniform in sections if uniform != 0]
+        if not occupied:
+            return None
+        return occupied[0] * 16, (occupied[-1] + 1) * 16
+
+    def iter_chunks(self, region_x: int, region_z: int, y_band: tuple = None, chunks: List[tuple] = None) -> Generator[tuple, None, None]:
+        """
+        Stream the chunks of a region through amulet.
+
+        ``chunks`` are the already loaded chunks of :meth:`scan_chunks`, by default
+        they are loaded as the iteration goes. With ``y_band``, a half-open range of
+        y-layers from the bottom of the world, columns only cover that band.
+        Sections of a single block are filled without translation.
+
+        Yields:
+            (rx, rz, column, biomes) with ``rx``/``rz`` the chunk offsets inside the
+            region, ``column`` a (16, 16, H) uint16 array in (x, z, y) order and
+            ``biomes`` the (4, 4, H/4) biome cells of the column, a (16, 16) map for
+            chunks that only store 2-D biomes, or None.
+        """
+        height = self.region_volume_shape(region_x, region_z)[2]
+        min_y = self._world.bounds("minecraft:overworld").min_y
+        band_start, band_stop = y_band or (0, height)
+
+        try:
+            for rx, rz, chunk, sections in chunks if chunks is not None else self._load_chunks(region_x, region_z):
+                column = np.zeros((16, 16, band_stop - band_start), dtype=np.uint16)
+                palette = chunk._block_palette
+                for i, sub_chunk, uniform in sections:
+                    start, stop = max(i * 16, band_start), min((i + 1) * 16, band_stop)
+                    if start >= stop:
+                        continue
+                    target = column[:, :, start - band_start:stop - band_start]
+                    if uniform is not None:
+                        metrics.count("uniform_sections" if uniform else "empty_sections")
+                        if uniform:
+                            target[...] = uniform
+                        continue
+                    with metrics.timer("palette_translation"):
+                        global_ids = self._blockstates.to_global_ids(sub_chunk, palette)
+                    with metrics.timer("section_copy"):
+                        target[...] = global_ids.transpose(0, 2, 1)[:, :, start - i * 16:stop - i * 16]
+                    metrics.count("sections")
+                metrics.count("chunks")
+
+                with metrics.timer("biome_conversion"):
+                    biomes = self._chunk_biomes(chunk, min_y, height // 4)
+
+                yield rx, rz, column, biomes
+        finally:
+            if chunks is None:
+                self._world.unload()
+
+    def _chunk_biomes(self, chunk, min_y: int, depth: int) -> np.array:
+        """Global biome IDs of an amulet chunk, translated with a single lookup over all of its cells."""
+        if chunk.biome_palette is None:
+            return None
+        if chunk.biomes.dimension is BiomesShape.Shape2D:
+            return self._biomes.to_global_ids(chunk.biomes._2d, chunk.biome_palette)
+        if chunk.biomes.dimension is not BiomesShape.Shape3D:
+            return None
+
+        cells = np.zeros((4, 4, depth), dtype=np.uint32)
+        present = np.zeros(depth, dtype=bool)
+        for cy in chunk.biomes.sections:
+            k = (cy * 16 - min_y) // 4
+            if 0 <= k and k + 4 <= depth:
+                cells[:, :, k:k + 4] = chunk.biomes.get_section(cy).transpose(0, 2, 1)
+                present[k:k + 4] = True
+        biomes = self._biomes.to_global_ids(cells, chunk.biome_palette)
+        biomes[:, :, ~present] = 0
+        return biomes
+
+    def scan_chunks_native(self, region_x: int, region_z: int, region: AnvilRegion = None) -> List[tuple]:
+        """(rx, rz, ChunkSections) of every chunk of a region, parsed but with no block data unpacked."""
+        if region is None:
+            region = AnvilRegion(self._mca_coord_to_path[(region_x, region_z)])
+        return [(rx, rz, ChunkSections(nbt)) for rx, rz, nbt in metrics.timed_iter("chunk_load", region.iter_chunks())]
+
+    def iter_chunks_native(
+        self,
+        region_x: int,
+        region_z: int,
+        region: AnvilRegion = None,
+        y_band: tuple = None,
+        chunks: List[tuple] = None,
+        section_span: tuple = None,
+    ) -> Generator[tuple, None, None]:
+        """
+        Same as :meth:`iter_chunks` but decoded directly from the ``.mca`` file.
+
+        ``chunks`` are the parsed chunks of :meth:`scan_chunks_native`. Columns and
+        ``y_band`` count layers from the bottom of ``section_span``, the
+        ``(min_section, section_count)`` of the region volume, which defaults to
+        each chunk's own range. Sections outside ``y_band`` are not decoded at all.
+        """
+        if chunks is None:
+            if region is None:
+                region = AnvilRegion(self._mca_coord_to_path[(region_x, region_z)])
+            chunks = ((rx, rz, ChunkSections(nbt)) for rx, rz, nbt in metrics.timed_iter("chunk_load", region.iter_chunks()))
+
+        for rx, rz, sections in chunks:
+            min_section, section_count = section_span or (sections.min_section, sections.section_count)
+            band_start, band_stop = y_band or (0, section_count * 16)
+            column = np.zeros((16, 16, band_stop - band_start), dtype=np.uint16)
+            y_range = (min_section + band_start // 16, min_section - (-band_stop // 16))
+
+            for y, palette, indices in metrics.timed_iter("section_decode", sections.iter_block_sections(y_range, decode_uniform=False)):
+                i = y - min_section
+                start, stop = max(i * 16, band_start), min((i + 1) * 16, band_stop)
+                target = column[:, :, start - band_start:stop - band_start]
+                if indices is None:
+                    uniform = self._blockstates.native_to_global_ids(0, palette, sections.data_version)
+                    metrics.count("uniform_sections" if uniform else "empty_sections")
+                    if uniform:
+                        target[...] = uniform
+                    continue
+                with metrics.timer("palette_translation"):
+                    global_ids = self._blockstates.native_to_global_ids(indices, palette, sections.data_version)
+                with metrics.timer("section_copy"):
+                    target[...] = global_ids.transpose(0, 2, 1)[:, :, start - i * 16:stop - i * 16]
+                metrics.count("sections")
+            metrics.count("chunks")
+
+            biomes = None
+            with metrics.timer("biome_conversion"):
+                for y, palette, indices in sections.iter_biome_sections(decode_uniform=False):
+                    k = (y - min_section) * 4
+                    if 0 <= k < section_count * 4:
+                        if biomes is None:
+                            biomes = np.zeros((4, 4, section_count * 4), dtype=np.uint16)
+                        # Palettes repeat across sections, so the translation is a cached lookup
+                        if indices is None:
+                            biomes[:, :, k:k + 4] = self._biomes.native_to_global_ids(0, palette, sections.data_version)
+                        else:
+                            biomes[:, :, k:k + 4] = self._biomes.native_to_global_ids(indices, palette, sections.data_version).transpose(0, 2, 1)
+                legacy = sections.legacy_biomes() if biomes is None else None
+                if legacy is not None:
+                    biomes = self._biomes.legacy_to_global_ids(legacy, sections.data_version)
+                    if biomes.ndim == 3:
+                        cells = np.zeros((4, 4, section_count * 4), dtype=np.uint16)
+                        start = (sections.min_section - min_section) * 4
+                        depth = min(biomes.shape[2], cells.shape[2] - start)
+                        cells[:, :, start:start + depth] = biomes[:, :, :depth]
+                        biomes = cells
+
+            yield rx, rz, column, biomes
+
+    def _assemble_region(self, chunks: Iterable[tuple], shape: tuple, out: np.array = None, min_y: int = 0, biomes_3d: bool = False, y_band: tuple = None) -> tuple:
+        """
+        Copy chunk columns covering ``y_band`` of the untrimmed ``shape`` into a
+        region volume and trim it; returns (volume, biomes, y_start).
+        """
+        provided = out is not None
+        if provided and (out.shape != shape or out.dtype != np.uint16):
+            raise ValueError(f"Output buffer must be uint16 with shape {shape}, got {out.dtype} {out.shape}.")
+        band_start, band_stop = y_band or (0, shape[2])
+        if band_start >= band_stop:
+            band_start, band_stop = 0, shape[2]
+        band = out[:, :, band_start:band_stop] if provided else np.zeros((*shape[:2], band_stop - band_start), dtype=np.uint16)
+
+        biomes = np.zeros((128, 128, shape[2] // 4), dtype=np.uint16)
+        # Chunks that only store a 2-D map keep it at full resolution for the 2-D output
+        legacy_maps = []
+        filled = np.zeros((32, 32), dtype=bool)
+
+        for rx, rz, column, chunk_biomes in chunks:
+            x_slice = slice(rx * 16, (rx + 1) * 16)
+            z_slice = slice(rz * 16, (rz + 1) * 16)
+            height = min(column.shape[2], band.shape[2])
+            with metrics.timer("section_copy"):
+                band[x_slice, z_slice, :height] = column[:, :, :height]
+                band[x_slice, z_slice, height:] = 0
+            filled[rx, rz] = True
+
+            if chunk_biomes is not None:
+                if chunk_biomes.ndim == 2:
+                    legacy_maps.append((x_slice, z_slice, chunk_biomes))
+                    chunk_biomes = np.repeat(chunk_biomes[::4, ::4, None], biomes.shape[2], axis=2)
+                depth = min(chunk_biomes.shape[2], biomes.shape[2])
+                biomes[rx * 4:(rx + 1) * 4, rz * 4:(rz + 1) * 4, :depth] = chunk_biomes[:, :, :depth]
+
+        # A caller-provided buffer may hold stale data where chunks are missing
+        if provided:
+            for rx, rz in zip(*np.nonzero(~filled)):
+                band[rx * 16:(rx + 1) * 16, rz * 16:(rz + 1) * 16, :] = 0
+
+        if not biomes_3d:
+            biomes = biome_map(biomes, -min_y // 4)
+            for x_slice, z_slice, chunk_map in legacy_maps:
+                biomes[x_slice, z_slice] = chunk_map
+
+        with metrics.timer("transpose_trim"):
+            y_start, y_stop = occupied_layers(band)
+        if y_start >= y_stop:
+            # Empty regions keep their full height
+            if provided:
+                out[...] = 0
+                return out, biomes, 0
+            return np.zeros(shape, dtype=np.uint16), biomes, 0
+
+        y_start, y_stop = y_start + band_start, y_stop + band_start
+        if biomes_3d:
+            y_start, y_stop = y_start // 4 * 4, min(-(-y_stop // 4) * 4, shape[2])
+            biomes = biomes[:, :, y_start // 4:y_stop // 4]
+        if provided:
+            return out[:, :, y_start:y_stop], biomes, y_start
+        return band[:, :, y_start - band_start:y_stop - band_start], biomes, y_start
+
+    def extract_regions(
+        self,
+        coords: Iterable[tuple],
+        workers: int = None,
+        native: bool = False,
+        return_y_offset: bool = False,
+        biomes_3d: bool = False,
+        fingerprint: bool = False,
+        stats: bool = False,
+        on_error: Callable[[tuple, Exception], None] = None,
+    ) -> Generator[tuple, None, None]:
+        """
+        Extract many regions in parallel on a process pool.
+
+        Every worker process opens its own level handle once and reuses it for
+        all regions it is given. Results are yielded as soon as each region is
+        done, so the order does not follow ``coords``.
+
+        Args:
+            coords: Iterable of (region_x, region_z) tuples.
+            workers: Number of worker processes, defaults to the CPU count. The
+                amulet path always uses a single worker, see ``native``.
+            native: Use :meth:`get_region_volume_native` instead of amulet, which
+                can only have the world open in one process at a time.
+            return_y_offset: Also yield the y-offset of every volume.
+            biomes_3d: Yield (128, 128, H/4) biome volumes instead of 2-D maps.
+            fingerprint: Also yield the :class:`fingerprint.Fingerprint` of every
+                volume, computed in the worker.
+            stats: Also yield the :func:`region_stats.region_stats` record of every
+                region, computed in the worker from the same block histogram.
+            on_error: Called with the coordinates and the exception of every region
+                that fails, the other regions are still extracted. Without it the
+                first failure is raised.
+
+        Yields:
+            ((region_x, region_z), volume, biomes) tuples, followed by the y_offset,
+            the fingerprint and the statistics record when requested.
+        """
+        coords = [tuple(c) for c in coords]
+        missing = [c for c in coords if c not in self._mca_coords]
+        if missing:
+            raise ValueError(f"Regions {missing} not found in world.")
+        if not coords:
+            return
+
+        workers = min(workers or os.cpu_count() or 1, len(coords))
+        if not native:
+            # amulet holds an exclusive session.lock for as long as a level is open and
+            # truncates it when opening, so a second handle blocks or breaks the first
+            workers = 1
+            self.close()
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_region_worker,
+            initargs=(self._world_path,),
+        )
+        try:
+            futures = {pool.submit(_extract_region_worker, c, native, return_y_offset, biomes_3d, fingerprint, stats): c for c in coords}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if on_error is None:
+                        raise
+                    on_error(futures[future], e)
+                    continue
+                yield result
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _trim_y_axis(self, volume: np.array, return_start: bool = False) -> np.array:
+        start, stop = occupied_layers(volume)
+        if start >= stop:
+            return (volume, 0) if return_start else volume
+
+        trimmed = volume[:, :, start:stop]
+        return (trimmed, start) if return_start else trimmed
 
-                y_sections = sorted(chunk.blocks.sections)
-                for i, y in enumerate(y_sections[:24]):
-                    sub_chunk = chunk.blocks.get_sub_chunk(y)
-                    palette = chunk._block_palette
-                    volume_6d[rx, rz, i] = self._blockstates.to_global_ids(sub_chunk, palette)
-
-                chunk.biomes.convert_to_2d()
-                if chunk.biomes._2d is not None and chunk.biome_palette is not None:
-                    x_start, x_end = rx * 16, (rx + 1) * 16
-                    z_start, z_end = rz * 16, (rz + 1) * 16
-                    tmp = self._biomes.to_global_ids(chunk.biomes._2d, chunk.biome_palette)
-                    biomes[x_start:x_end, z_start:z_end] = tmp
-                    
-        self._world.unload()
-        data = volume_6d.transpose(0, 3, 1, 5, 2, 4)
-        return self._trim_y_axis(data.reshape(512, 512, -1)), biomes
-
-    def _trim_y_axis(self, volume: np.array) -> np.array:
-        has_content = np.any(volume != 0, axis=(0, 1))
-        if not np.any(has_content):
-            return volume
-        
-        indices = np.where(has_content)[0]
-        return volume[:, :, indices[0] : indices[-1] + 1]
-    
     def mca_inhabited_times(self, region_x: int, region_z: int) -> np.array:
         path = self._mca_coord_to_path.get((region_x, region_z))
         if not path:
             return np.zeros((32, 32), dtype=np.int64)
 
-        data = np.zeros((32, 32), dtype=np.int64)
-    
-        region = anvil.Region.from_file(path)
+        return np.maximum(region_inhabited_times(path), 0)
 
-        for cz in range(32):
-            for cx in range(32):
-                try:
-                    chunk = region.chunk_data(cx, cz)
-                    if chunk:
-                        it_value = 0
-                        if "InhabitedTime" in chunk:
-                            it_value = chunk["InhabitedTime"].value
-                        elif "Level" in chunk and "InhabitedTime" in chunk["Level"]:
-                            it_value = chunk["Level"]["InhabitedTime"].value
-                        
-                        data[cx, cz] = it_value 
-                except Exception:
-                    continue
+    def inhabited_time_map(self, workers: int = None) -> np.array:
+        """
+        Stitch the InhabitedTime of every chunk in the world into one grid.
+
+        Regions are scanned in parallel and only the InhabitedTime tag is read
+        from each chunk. Per-region results are cached in the world directory and
+        reused as long as the ``.mca`` file's mtime does not change.
 
-        return data 
+        Args:
+            workers: Number of worker processes, defaults to the CPU count.
+
+        Returns:
+            (Z, X) int64 array of chunks, row 0 / column 0 is the first chunk of the
+            region with the smallest coordinates. Missing chunks are -1.
+        """
+        if not self._mca_coords:
+            return np.zeros((0, 0), dtype=np.int64)
+
+        cache = self._load_inhabited_cache()
+        mtimes = {coords: os.path.getmtime(path) for coords, path in self._mca_coord_to_path.items()}
+        stale = [coords for coords in self._mca_coords if cache.get(coords, (None,))[0] != mtimes[coords]]
+
+        if stale:
+            paths = [self._mca_coord_to_path[coords] for coords in stale]
+            workers = min(workers or os.cpu_count() or 1, len(stale))
+            if workers == 1:
+                results = map(region_inhabited_times, paths)
+            else:
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                with pool:
+                    results = list(pool.map(region_inhabited_times, paths, chunksize=max(1, len(paths) // (workers * 4))))
+            for coords, data in zip(stale, results):
+                cache[coords] = (mtimes[coords], data)
+            self._save_inhabited_cache(cache)
+
+        min_rx = min(x for x, _ in self._mca_coords)
+        min_rz = min(z for _, z in self._mca_coords)
+        max_rx = max(x for x, _ in self._mca_coords)
+        max_rz = max(z for _, z in self._mca_coords)
+
+        grid = np.full(((max_rz - min_rz + 1) * 32, (max_rx - min_rx + 1) * 32), -1, dtype=np.int64)
+        for (rx, rz) in self._mca_coords:
+            z_start = (rz - min_rz) * 32
+            x_start = (rx - min_rx) * 32
+            grid[z_start:z_start + 32, x_start:x_start + 32] = cache[(rx, rz)][1].T
+        return grid
+
+    def _inhabited_cache_path(self) -> Path:
+        return Path(self._world_path) / ".inhabited_times.npz"
+
+    def _load_inhabited_cache(self) -> dict:
+        path = self._inhabited_cache_path()
+        if not path.is_file():
+            return {}
+        try:
+            with np.load(path) as cached:
+                return {
+                    (int(x), int(z)): (float(mtime), data)
+                    for (x, z), mtime, data in zip(cached["coords"], cached["mtimes"], cached["data"])
+                }
+        except (OSError, KeyError, ValueError):
+            return {}
+
+    def _save_inhabited_cache(self, cache: dict) -> None:
+        coords = [c for c in self._mca_coords if c in cache]
+        try:
+            with open(self._inhabited_cache_path(), "wb") as f:
+                np.savez(
+                    f,
+                    coords=np.array(coords, dtype=np.int64).reshape(-1, 2),
+                    mtimes=np.array([cache[c][0] for c in coords], dtype=np.float64),
+                    data=np.array([cache[c][1] for c in coords], dtype=np.int64).reshape(-1, 32, 32),
+                )
+        except OSError:
+            pass
 
     def chunk_inhibited_time(self, x: int, z: int) -> int:
         return self._world.get_chunk(x, z, "minecraft:overworld").misc.get("InhabitedTime", 0)
@@ -120,97 +645,432 @@ class WorldWrapper:
         chunk_z = region_z * 32 + region_z_offset
         return {"x": chunk_x, "z": chunk_z}
 
+_worker_world = None
+
+def _init_region_worker(world_path: Path) -> None:
+    global _worker_world
+    # Ctrl-C is handled by the parent, which cancels pending work and shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_world = WorldWrapper(world_path)
+
+def _extract_region_worker(
+    coords: tuple,
+    native: bool = False,
+    return_y_offset: bool = False,
+    biomes_3d: bool = False,
+    fingerprint: bool = False,
+    stats: bool = False,
+) -> tuple:
+    extract = _worker_world.get_region_volume_native if native else _worker_world.get_region_volume
+    with metrics.profiled(f"{Path(_worker_world._world_path).name}.r.{coords[0]}.{coords[1]}"):
+        volume, biomes, y_offset = extract(*coords, return_y_offset=True, biomes_3d=biomes_3d)
+        result = (coords, volume, biomes, y_offset) if return_y_offset else (coords, volume, biomes)
+        if not (fingerprint or stats):
+            return result
+
+        # One pass over the volume feeds both the fingerprint and the statistics
+        with metrics.timer("block_histogram"):
+            histogram = block_histogram(volume)
+        if fingerprint:
+            with metrics.timer("fingerprint"):
+                result += (Fingerprint.of(volume, histogram),)
+        if stats:
+            with metrics.timer("region_stats"):
+                inhabited_times = region_inhabited_times(_worker_world._mca_coord_to_path[coords])
+                result += (region_stats(volume, biomes, y_offset, inhabited_times, histogram),)
+        metrics.emit("region_analysis", world=str(_worker_world._world_path), region=list(coords))
+        return result
+
+def occupied_layers(volume: np.array) -> tuple:
+    """
+    Half-open range of the y-layers of an (X, Z, Y) volume holding non-zero blocks,
+    (0, 0) for an empty volume. A single max-reduction, without the boolean
+    temporary of ``volume != 0``.
+    """
+    layers = np.flatnonzero(volume.max(axis=(0, 1))) if volume.size else ()
+    if not len(layers):
+        return 0, 0
+    return int(layers[0]), int(layers[-1]) + 1
+
+def layer_band(chunk_layers: Iterable[Optional[tuple]], height: int, align: int = 4) -> tuple:
+    """
+    Half-open y-layer band covering the ``(start, stop)`` layer ranges of all chunks
+    (None for empty ones), widened to multiples of ``align`` so biome cells stay
+    whole, or (0, 0) when every chunk is empty.
+    """
+    start, stop = height, 0
+    for layers in chunk_layers:
+        if layers is not None:
+            start, stop = min(start, layers[0]), max(stop, layers[1])
+    if start >= stop:
+        return 0, 0
+    return start // align * align, min(-(-stop // align) * align, height)
+
+def _native_chunk_layers(sections: ChunkSections, min_section: int = None) -> Optional[tuple]:
+    """
+    Layers of a native chunk that can hold blocks, from its palettes and surface
+    heightmap, counted from ``min_section`` (the chunk's own bottom by default).
+    """
+    occupied = sections.occupied_sections()
+    if occupied is None:
+        return None
+    base = sections.min_section if min_section is None else min_section
+    low = max(occupied[0], sections.min_section) - base
+    high = min(occupied[1], sections.min_section + sections.section_count) - base
+    if low >= high:
+        return None
+
+    stop = high * 16
+    surface = sections.surface_height()
+    if surface is not None:
+        surface += (sections.min_section - base) * 16
+    # A surface below the top occupied section means the heightmap is stale or the
+    # section only holds blocks the heightmap ignores, so it is not trusted then
+    if surface is not None and (high - 1) * 16 < surface <= stop:
+        stop = surface
+    return low * 16, stop
+
+def biome_map(biomes: np.array, layer: int = 0) -> np.array:
+    """
+    Block-resolution (X*4, Z*4) map of one layer of a (X, Z, Y) biome cell volume.
+
+    ``layer`` is clamped to the stored cells; the region extractors use the cell
+    at y=0, the layer amulet's own 2-D conversion reads.
+    """
+    if biomes.shape[2] == 0:
+        return np.zeros((biomes.shape[0] * 4, biomes.shape[1] * 4), dtype=biomes.dtype)
+    layer = min(max(layer, 0), biomes.shape[2] - 1)
+    return np.repeat(np.repeat(biomes[:, :, layer], 4, axis=0), 4, axis=1)
+
+# Java chunks store waterlogging as a property, amulet as an extra water block
+WATER_BLOCK = Block.from_string_blockstate("minecraft:water[level=0]")
+UNIVERSAL_AIR_BLOCK = "universal_minecraft:air"
+# Blocks amulet could not translate (numerical IDs) are all stored as this marker
+NUMERICAL_MARKER_BLOCK = 'universal_minecraft:wool[color="magenta"]'
+
+_translation_manager = None
+
+def _java_version(data_version: int):
+    global _translation_manager
+    if _translation_manager is None:
+        _translation_manager = PyMCTranslate.new_translation_manager()
+    return _translation_manager.get_version("java", data_version)
+
+
+def native_biome_to_universal(data_version: int, biome) -> str:
+    """
+    Universal biome string of a native biome name, or of a numeric ID from the
+    pre-1.18 ``Biomes`` array, as amulet loads it (unknown IDs become plains).
+    """
+    version = _java_version(data_version)
+    if not isinstance(biome, str):
+        biome = version.biome.unpack(int(biome))
+    return version.biome.to_universal(biome)
+
+
+def native_to_universal(data_version: int, name: str, properties: tuple = ()) -> str:
+    """
+    Universal block string of a native Java palette entry, as amulet loads it.
+
+    ``waterlogged`` is unpacked into an extra water block, then every block of the
+    tuple is translated by PyMCTranslate for the chunk's DataVersion. Blocks that
+    amulet would re-translate from their neighbours (e.g. fence connections) get
+    the context-free translation.
+    """
+    version = _java_version(data_version)
+    namespace, _, base_name = name.rpartition(":")
+    namespace = namespace or "minecraft"
+    properties = {key: StringTag(str(value)) for key, value in properties}
+    waterlogged = False
+    if version.block.is_waterloggable(f"{namespace}:{base_name}"):
+        waterlogged = properties.pop("waterlogged", None) == StringTag("true")
+    elif version.block.is_waterloggable(f"{namespace}:{base_name}", True):
+        waterlogged = True
+    block = Block(namespace, base_name, properties)
+    if waterlogged:
+        block += WATER_BLOCK
+
+    universal = None
+    for part in block.block_tuple:
+        output, _, _ = version.block.to_universal(part)
+        if isinstance(output, Block):
+            universal = output if universal is None else universal + output
+    return str(universal) if universal is not None else UNIVERSAL_AIR_BLOCK
+
 class BlockStates:
-    def __init__(self) -> None:
-        Path("../../assets/").mkdir(parents=True, exist_ok=True)
-        Path("../../assets/blockstates.txt").touch(exist_ok=True)
-        with open("../../assets/blockstates.txt", "r") as f:
-            lines = f.read().splitlines()
-            self._blockstates = lines
-            self._blockstates_dict = {state: i for i, state in enumerate(lines)}
-
-    def _add_blockstate(self, blockstate: str) -> int:
-        new_id = len(self._blockstates)
-        self._blockstates.append(blockstate)
-        self._blockstates_dict[blockstate] = new_id
-        
-        with open("../../assets/blockstates.txt", "a") as f:
-            f.write(f"{blockstate}\n") 
-        return new_id
+    _shared = None
+
+    @classmethod
+    def shared(cls) -> "BlockStates":
+        """Process-wide instance, so the registry file is only read once."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def __init__(
+        self,
+        palette_cache_size: int = 256,
+        block_cache_size: int = 65536,
+        registry: Registry = None,
+        native_palette_cache_size: int = 4096,
+    ) -> None:
+        self._registry = registry or Registry("blockstates")
+        self._blockstates = self._registry.entries
+        self._blockstates_dict = self._registry.ids
+
+        # id(palette) -> (palette, lookup table); the palette reference keeps the id from being reused
+        self._palette_cache = OrderedDict()
+        self._palette_cache_size = palette_cache_size
+        # Native palette content -> lookup table; real worlds have many small, recurring palettes
+        self._native_palette_cache = OrderedDict()
+        self._native_palette_cache_size = native_palette_cache_size
+        # Block, or (data_version, name, properties) of a native entry -> global id,
+        # saves the formatting and translation for blocks seen in other palettes
+        self._block_cache = {}
+        self._block_cache_size = block_cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def to_global_ids(self, blocks_array: np.array, block_palette: BlockManager) -> np.array:
-        palette_translation = []
-        
-        marker_block = 'universal_minecraft:wool[color="magenta"]'
-
-        for i in range(len(block_palette)):
-            block_obj = block_palette._index_to_block[i]
-            block_str = str(block_obj)
-            
-            if "minecraft:numerical" in block_str:
-                global_id = self.get_global_id_by_block(marker_block)
-            else:
-                global_id = self.get_global_id_by_block(block_str)
-                
-            palette_translation.append(global_id)
+        return self._palette_lut(block_palette)[blocks_array]
+
+    def _palette_lut(self, block_palette: BlockManager) -> np.array:
+        """
+        Lookup table from palette index to global ID, memoized per palette object.
+
+        Amulet block palettes only ever grow, so a cached table is extended with
+        the new entries instead of being rebuilt.
+        """
+        key = id(block_palette)
+        entry = self._palette_cache.get(key)
+        start = 0
+        lut = None
 
-        palette_translation = np.array(palette_translation, dtype=np.uint16)
-        return palette_translation[blocks_array]
+        if entry is not None and entry[0] is block_palette:
+            self._palette_cache.move_to_end(key)
+            lut = entry[1]
+            if len(lut) == len(block_palette):
+                self.cache_hits += 1
+                return lut
+            start = len(lut)
+
+        self.cache_misses += 1
+        new_ids = self._blocks_to_global_ids([block_palette._index_to_block[i] for i in range(start, len(block_palette))])
+        lut = new_ids if lut is None else np.concatenate((lut, new_ids))
+
+        self._palette_cache[key] = (block_palette, lut)
+        if len(self._palette_cache) > self._palette_cache_size:
+            self._palette_cache.popitem(last=False)
+        return lut
+
+    def _blocks_to_global_ids(self, blocks: List[Block]) -> np.array:
+        global_ids = [self._block_cache.get(block_obj) for block_obj in blocks]
+        uncached = [i for i, global_id in enumerate(global_ids) if global_id is None]
+
+        if uncached:
+            block_strs = [str(blocks[i]) for i in uncached]
+            block_strs = [NUMERICAL_MARKER_BLOCK if "minecraft:numerical" in b else b for b in block_strs]
+            if len(self._block_cache) + len(uncached) > self._block_cache_size:
+                self._block_cache.clear()
+            for i, global_id in zip(uncached, self._registry.get_ids(block_strs)):
+                global_ids[i] = global_id
+                self._block_cache[blocks[i]] = global_id
+
+        return np.array(global_ids, dtype=np.uint16)
+
+    def cache_info(self) -> dict:
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "palettes": len(self._palette_cache) + len(self._native_palette_cache),
+            "blocks": len(self._block_cache),
+        }
+
+    def native_to_global_ids(self, blocks_array: np.array, native_palette: list, data_version: int) -> np.array:
+        return self._native_palette_lut(native_palette, data_version)[blocks_array]
+
+    def _native_palette_lut(self, native_palette: list, data_version: int) -> np.array:
+        """
+        Lookup table from native palette index to global ID, memoized per palette
+        content since every section parses into fresh palette objects.
+
+        Entries are translated to amulet's universal block strings, see
+        :func:`native_to_universal`, so native and amulet volumes share their IDs.
+        """
+        key = (data_version, *((e["Name"], *e["Properties"].items()) if "Properties" in e else e.get("Name") for e in native_palette))
+        lut = self._native_palette_cache.get(key)
+        if lut is not None:
+            self._native_palette_cache.move_to_end(key)
+            self.cache_hits += 1
+            return lut
+
+        self.cache_misses += 1
+        blocks = [(data_version, entry.get("Name", AIR_BLOCK), tuple(entry.get("Properties", {}).items())) for entry in native_palette]
+        global_ids = [self._block_cache.get(block) for block in blocks]
+        uncached = [i for i, global_id in enumerate(global_ids) if global_id is None]
+        if uncached:
+            block_strs = [native_to_universal(*blocks[i]) for i in uncached]
+            if len(self._block_cache) + len(uncached) > self._block_cache_size:
+                self._block_cache.clear()
+            for i, global_id in zip(uncached, self._registry.get_ids(block_strs)):
+                global_ids[i] = global_id
+                self._block_cache[blocks[i]] = global_id
+
+        lut = np.array(global_ids, dtype=np.uint16)
+        self._native_palette_cache[key] = lut
+        if len(self._native_palette_cache) > self._native_palette_cache_size:
+            self._native_palette_cache.popitem(last=False)
+        return lut
+
+    @property
+    def version(self) -> int:
+        """The registry is append-only, so its length identifies which IDs a volume may use."""
+        self._registry.refresh()
+        return len(self._blockstates)
 
     def get_block_by_global_id(self, id: int) -> str:
-        return self._blockstates[id]
+        return self._registry.get(id)
     
     def get_global_id_by_block(self, blockstate: str) -> int:
-        if blockstate not in self._blockstates_dict:
-            return self._add_blockstate(blockstate)
-        return self._blockstates_dict[blockstate]
+        return self._registry.get_id(blockstate)
 
 class Biomes:
-    def __init__(self) -> None:
-        Path("../../assets/").mkdir(parents=True, exist_ok=True)
-        self._file_path = "../../assets/biomes.txt"
-        Path(self._file_path).touch(exist_ok=True)
-        
-        with open(self._file_path, "r") as f:
-            lines = f.read().splitlines()
-            self._biomes = lines
-            self._biomes_dict = {biome: i for i, biome in enumerate(lines)}
-
-    def _add_biome(self, biome_str: str) -> int:
-        new_id = len(self._biomes)
-        self._biomes.append(biome_str)
-        self._biomes_dict[biome_str] = new_id
-        
-        with open(self._file_path, "a") as f:
-            f.write(f"{biome_str}\n") 
-        return new_id
-
-    def to_global_ids(self, biome_indices: np.array, biome_palette: list) -> np.array:
-        palette_translation = []
-        
-        for biome_obj in biome_palette:
-            biome_str = str(biome_obj)
-            
-            global_id = self.get_global_id_by_biome(biome_str)
-            palette_translation.append(global_id)
-
-        palette_translation = np.array(palette_translation, dtype=np.uint16)
-        
-        return palette_translation[biome_indices]
+    _shared = None
+
+    @classmethod
+    def shared(cls) -> "Biomes":
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def __init__(self, registry: Registry = None, palette_cache_size: int = 256) -> None:
+        self._registry = registry or Registry("biomes")
+        self._biomes = self._registry.entries
+        self._biomes_dict = self._registry.ids
+
+        # Amulet biome managers by id() with the manager kept alive
+        self._palette_cache = OrderedDict()
+        self._palette_cache_size = palette_cache_size
+        # (data_version, *native palette) -> lookup table
+        self._native_palette_cache = OrderedDict()
+
+    def to_global_ids(self, biome_indices: np.array, biome_palette) -> np.array:
+        return self._palette_lut(biome_palette)[biome_indices]
+
+    def native_to_global_ids(self, biome_indices: np.array, native_palette: Sequence, data_version: int) -> np.array:
+        """
+        Global IDs of native biome cells. ``native_palette`` holds the biome names
+        of a 1.18+ section or numeric legacy IDs, both translated to the universal
+        biomes amulet reports, see :func:`native_biome_to_universal`.
+        """
+        key = (data_version, *native_palette)
+        lut = self._native_palette_cache.get(key)
+        if lut is not None:
+            self._native_palette_cache.move_to_end(key)
+        else:
+            biome_strs = [native_biome_to_universal(data_version, biome) for biome in native_palette]
+            lut = np.array(self._registry.get_ids(biome_strs), dtype=np.uint16)
+            self._native_palette_cache[key] = lut
+            if len(self._native_palette_cache) > self._palette_cache_size:
+                self._native_palette_cache.popitem(last=False)
+        return lut[biome_indices]
+
+    def legacy_to_global_ids(self, biome_array: np.array, data_version: int) -> np.array:
+        """Global IDs of a pre-1.18 ``Biomes`` array of numeric biome IDs."""
+        palette, indices = np.unique(biome_array, return_inverse=True)
+        return self.native_to_global_ids(indices.reshape(biome_array.shape), palette.tolist(), data_version)
+
+    def _palette_lut(self, biome_palette) -> np.array:
+        """
+        Lookup table from palette index to global ID, memoized like
+        :meth:`BlockStates._palette_lut`: a grown amulet biome manager only has its
+        new entries registered.
+        """
+        key = id(biome_palette)
+        entry = self._palette_cache.get(key)
+        start = 0
+        lut = None
+
+        if entry is not None and entry[0] is biome_palette:
+            self._palette_cache.move_to_end(key)
+            lut = entry[1]
+            if len(lut) == len(biome_palette):
+                return lut
+            start = len(lut)
+
+        biome_strs = [str(biome_obj) for biome_obj in list(biome_palette)[start:]]
+        new_ids = np.array(self._registry.get_ids(biome_strs), dtype=np.uint16)
+        lut = new_ids if lut is None else np.concatenate((lut, new_ids))
+
+        self._palette_cache[key] = (biome_palette, lut)
+        if len(self._palette_cache) > self._palette_cache_size:
+            self._palette_cache.popitem(last=False)
+        return lut
+
+    @property
+    def version(self) -> int:
+        self._registry.refresh()
+        return len(self._biomes)
 
     def get_biome_by_global_id(self, id: int) -> str:
-        return self._biomes[id]
+        return self._registry.get(id)
     
     def get_global_id_by_biome(self, biome_str: str) -> int:
-        if biome_str not in self._biomes_dict:
-            return self._add_biome(biome_str)
-        return self._biomes_dict[biome_str]
+        return self._registry.get_id(biome_str)
 
 class MinecraftRegionExtractor:
-    def __init__(self, directory_path) -> None:
+    # Directories inside a world that never contain another world
+    WORLD_SUBDIRS = {"region", "entities", "poi", "DIM-1", "DIM1", "data", "playerdata", "stats", "advancements", "datapacks"}
+
+    def __init__(self, directory_path, max_open_worlds: int = 4) -> None:
         self.path = directory_path 
-        self.world_paths = glob.glob(f"{self.path}/**/level.dat", recursive=True)
-        self.worlds = [WorldWrapper(Path(p).parent) for p in self.world_paths]
+        self.world_paths = self.discover_worlds(directory_path)
+        self.max_open_worlds = max_open_worlds
+        self._wrappers = OrderedDict()
+        self.worlds = _WorldList(self)
+
+    @classmethod
+    def discover_worlds(cls, directory_path) -> List[str]:
+        """Paths of every ``level.dat`` below the directory, without descending into world internals."""
+        world_paths = []
+        for root, dirs, files in os.walk(directory_path):
+            if "level.dat" in files:
+                world_paths.append(os.path.join(root, "level.dat"))
+                dirs[:] = [d for d in dirs if d not in cls.WORLD_SUBDIRS]
+            dirs.sort()
+        return world_paths
+
+    def world(self, key) -> WorldWrapper:
+        """
+        Get a world by index or ``level.dat`` path.
+
+        Wrappers are kept in an LRU, at most ``max_open_worlds`` of them hold an
+        open amulet level at a time; the least recently used ones are closed.
+        """
+        path = self.world_paths[key] if isinstance(key, int) else str(key)
+        wrapper = self._wrappers.pop(path, None)
+        if wrapper is None:
+            wrapper = WorldWrapper(Path(path).parent)
+        self._wrappers[path] = wrapper
+
+        others = [w for w in self._wrappers.values() if w.is_open and w is not wrapper]
+        for stale in others[:max(0, len(others) - self.max_open_worlds + 1)]:
+            stale.close()
+        return wrapper
+
+class _WorldList(Sequence):
+    """Read-only list view over the worlds of an extractor that opens them on access."""
+
+    def __init__(self, extractor: MinecraftRegionExtractor) -> None:
+        self._extractor = extractor
+
+    def __len__(self) -> int:
+        return len(self._extractor.world_paths)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._extractor.world(i) for i in range(len(self))[index]]
+        return self._extractor.world(range(len(self))[index])
 
 class Region:
     def __init__(self, x: int, z: int, region_cube: np.array, inhabited_time: int) -> None:
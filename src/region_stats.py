@@ -0,0 +1,244 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+import argparse
+import importlib.util
+import re
+import numpy as np
+from registry import Registry
+from result_sink import ParquetSink
+
+STATS_KEY = "key"
+LIST_FIELDS = ("block_ids", "block_counts", "biome_ids", "biome_counts")
+
+
+def region_key(world: str, region: tuple) -> str:
+    return f"{world}/r.{int(region[0])}.{int(region[1])}"
+
+
+def parquet_available() -> bool:
+    """Whether pandas has a Parquet engine to write the statistics table with."""
+    return any(importlib.util.find_spec(engine) is not None for engine in ("pyarrow", "fastparquet"))
+
+
+def _occupied_span(volume: np.array) -> Optional[tuple]:
+    """
+    First and last y-layer of an (X, Z, Y) volume holding blocks, None when it is
+    empty. Extracted volumes are trimmed, at most widened to whole biome cells, so
+    the scans from both ends stop within a few layers.
+    """
+    height = volume.shape[2]
+    low = next((k for k in range(height) if volume[:, :, k].any()), None)
+    if low is None:
+        return None
+    high = next(k for k in range(height - 1, low - 1, -1) if volume[:, :, k].any())
+    return low, high
+
+
+def _sparse_histogram(values: np.array, histogram: np.array = None) -> tuple:
+    if histogram is None:
+        histogram = np.bincount(values.reshape(-1), minlength=1)
+    ids = np.flatnonzero(histogram)
+    return ids.tolist(), histogram[ids].tolist()
+
+
+def region_stats(
+    volume: np.array,
+    biomes: np.array,
+    y_offset: int,
+    inhabited_times: np.array = None,
+    histogram: np.array = None,
+) -> dict:
+    """
+    Compact statistics record of an extracted region.
+
+    Block and biome histograms are stored sparsely as parallel ``*_ids`` and
+    ``*_counts`` lists of global IDs. Biomes are counted per cell of whatever was
+    extracted, the 2-D map or the 3-D cells. ``min_y``/``max_y`` are the lowest and
+    highest block layers, whatever padding the volume has for 3-D biome cells.
+    ``inhabited_times`` is the (32, 32) chunk array of
+    :func:`anvil_reader.region_inhabited_times`, -1 for missing chunks, which the
+    summary leaves out.
+
+    Args:
+        histogram: Block counts per global ID when already computed, see
+            :func:`fingerprint.block_histogram`.
+    """
+    block_ids, block_counts = _sparse_histogram(volume, histogram)
+    biome_ids, biome_counts = _sparse_histogram(biomes)
+    blocks = int(volume.size)
+    air = block_counts[0] if block_ids and block_ids[0] == 0 else 0
+    non_air = blocks - air
+    span = _occupied_span(volume) if non_air else None
+
+    record = {
+        "y_offset": int(y_offset),
+        "min_y": int(y_offset) + span[0] if span else None,
+        "max_y": int(y_offset) + span[1] if span else None,
+        "blocks": blocks,
+        "non_air": non_air,
+        "non_air_fraction": non_air / blocks if blocks else 0.0,
+        "block_ids": block_ids,
+        "block_counts": block_counts,
+        "biome_ids": biome_ids,
+        "biome_counts": biome_counts,
+    }
+
+    chunks = inhabited_times[inhabited_times >= 0] if inhabited_times is not None else np.zeros(0)
+    record.update(
+        chunks=int(chunks.size),
+        inhabited_mean=float(chunks.mean()) if chunks.size else None,
+        inhabited_median=float(np.median(chunks)) if chunks.size else None,
+        inhabited_max=int(chunks.max()) if chunks.size else None,
+        inhabited_fraction=float(np.mean(chunks > 0)) if chunks.size else None,
+    )
+    return record
+
+
+class RegionStatsSink(ParquetSink):
+    """
+    Parquet dataset of region statistics records, keyed by ``<world>/r.<x>.<z>``.
+    Needs a Parquet engine, see :func:`parquet_available`.
+    """
+
+    def __init__(self, path: Path, flush_rows: int = 200, **kwargs) -> None:
+        super().__init__(path, STATS_KEY, list_fields=LIST_FIELDS, flush_rows=flush_rows, **kwargs)
+
+    def add_region(self, world: str, region: tuple, stats: dict, **fields) -> None:
+        self.add({STATS_KEY: region_key(world, region), "world": world, "region_x": int(region[0]), "region_z": int(region[1]), **stats, **fields})
+
+
+class RegionStatsIndex:
+    """
+    In-memory view of a region statistics table for selecting training data.
+
+    ``frame`` holds one row per region with the scalar columns. The sparse
+    histograms are flattened into CSR-style arrays once, so the fraction of a set
+    of blocks or biomes in every region is a single masked ``bincount``::
+
+        stats = RegionStatsIndex.load("dataset/stats")
+        frame = stats.frame[(stats.block_fraction("stone_bricks") > 0.05) & (stats.biome_fraction("plains") > 0)]
+
+    Blocks and biomes are given as global IDs or names. A name without a namespace
+    matches it in every namespace, and a name without properties matches every
+    state of the block.
+    """
+
+    def __init__(self, frame, blockstates: Registry = None, biomes: Registry = None) -> None:
+        self.frame = frame.reset_index(drop=True)
+        self._blockstates = blockstates
+        self._biomes = biomes
+        self._blocks = self._flatten("block_ids", "block_counts")
+        self._biome_cells = self._flatten("biome_ids", "biome_counts")
+
+    @classmethod
+    def load(cls, path: Path, **kwargs) -> "RegionStatsIndex":
+        import pandas as pd
+
+        parts = sorted(Path(path).glob("part-*.parquet"))
+        if not parts:
+            return cls(pd.DataFrame(columns=[STATS_KEY, *LIST_FIELDS]), **kwargs)
+        frame = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+        return cls(frame.drop_duplicates(subset=STATS_KEY, keep="last"), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _flatten(self, ids_column: str, counts_column: str) -> tuple:
+        ids = [np.asarray(v, dtype=np.int64) for v in self.frame[ids_column]]
+        counts = [np.asarray(v, dtype=np.float64) for v in self.frame[counts_column]]
+        rows = np.repeat(np.arange(len(ids)), [len(v) for v in ids])
+        flat_ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+        flat_counts = np.concatenate(counts) if counts else np.zeros(0)
+        totals = np.bincount(rows, weights=flat_counts, minlength=len(ids))
+        return rows, flat_ids, flat_counts, totals
+
+    @staticmethod
+    def _resolve(names: Union[str, int, Iterable], registry: Registry) -> np.array:
+        if isinstance(names, (str, int, np.integer)):
+            names = [names]
+        ids = [int(n) for n in names if isinstance(n, (int, np.integer))]
+        patterns = [n for n in names if isinstance(n, str)]
+        if patterns:
+            registry.refresh()
+            for name in patterns:
+                namespace = "" if ":" in name else r"[\w.\-]+:"
+                properties = "" if "[" in name else r"(\[.*\])?"
+                # Amulet appends the waterlogging block in braces
+                pattern = re.compile(rf"{namespace}{re.escape(name)}{properties}(\{{.*\}})?")
+                ids.extend(i for i, entry in enumerate(registry.entries) if pattern.fullmatch(entry))
+        return np.unique(np.array(ids, dtype=np.int64))
+
+    def _fraction(self, flattened: tuple, ids: np.array, exclude_air: bool = False):
+        import pandas as pd
+
+        rows, flat_ids, flat_counts, totals = flattened
+        mask = np.isin(flat_ids, ids)
+        hits = np.bincount(rows[mask], weights=flat_counts[mask], minlength=len(self.frame))
+        if exclude_air:
+            air = np.bincount(rows[flat_ids == 0], weights=flat_counts[flat_ids == 0], minlength=len(self.frame))
+            totals = totals - air
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fraction = np.where(totals > 0, hits / totals, 0.0)
+        return pd.Series(fraction, index=self.frame.index)
+
+    def block_ids(self, blocks) -> np.array:
+        if self._blockstates is None:
+            self._blockstates = Registry("blockstates")
+        return self._resolve(blocks, self._blockstates)
+
+    def biome_ids(self, biomes) -> np.array:
+        if self._biomes is None:
+            self._biomes = Registry("biomes")
+        return self._resolve(biomes, self._biomes)
+
+    def block_fraction(self, blocks, exclude_air: bool = False):
+        """Share of the blocks of every region that are any of ``blocks``, aligned with :attr:`frame`."""
+        return self._fraction(self._blocks, self.block_ids(blocks), exclude_air)
+
+    def biome_fraction(self, biomes):
+        """Share of the biome cells of every region that are any of ``biomes``, aligned with :attr:`frame`."""
+        return self._fraction(self._biome_cells, self.biome_ids(biomes))
+
+    def select(self, blocks: Dict[str, float] = None, biomes: Dict[str, float] = None, **minimums):
+        """
+        Regions with at least the given fractions of ``blocks`` and ``biomes`` and at
+        least the given value of scalar columns, e.g.
+        ``select({"stone_bricks": 0.05}, {"plains": 0.01}, inhabited_mean=1000)``.
+        """
+        mask = np.ones(len(self.frame), dtype=bool)
+        for name, minimum in (blocks or {}).items():
+            mask &= self.block_fraction(name).to_numpy() >= minimum
+        for name, minimum in (biomes or {}).items():
+            mask &= self.biome_fraction(name).to_numpy() >= minimum
+        for column, minimum in minimums.items():
+            mask &= (self.frame[column] >= minimum).to_numpy()
+        return self.frame[mask]
+
+
+def _parse_thresholds(values: List[str]) -> Dict[str, float]:
+    thresholds = {}
+    for value in values or ():
+        name, _, minimum = value.rpartition("=")
+        thresholds[name] = float(minimum)
+    return thresholds
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Select regions from the statistics table of a volume store.")
+    parser.add_argument("stats", help="Statistics dataset, usually <store>/stats.")
+    parser.add_argument("--block", nargs="*", default=None, metavar="NAME=FRACTION", help="e.g. stone_bricks=0.05")
+    parser.add_argument("--biome", nargs="*", default=None, metavar="NAME=FRACTION", help="e.g. plains=0.5")
+    parser.add_argument("--min-inhabited-mean", type=float, default=None)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    stats = RegionStatsIndex.load(args.stats)
+    minimums = {"inhabited_mean": args.min_inhabited_mean} if args.min_inhabited_mean is not None else {}
+    selected = stats.select(_parse_thresholds(args.block), _parse_thresholds(args.biome), **minimums)
+    print(f"{len(selected)} of {len(stats)} regions selected.")
+    columns = ["world", "region_x", "region_z", "non_air_fraction", "min_y", "max_y", "inhabited_mean"]
+    print(selected[columns].head(args.limit).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
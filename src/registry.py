@@ -0,0 +1,132 @@
+from pathlib import Path
+from typing import Dict, Iterable, List
+import marshal
+import mmap
+import os
+import portalocker
+
+# Overridable through the environment, so spawned worker processes use the same tables
+ASSETS_ENV = "MC_ASSETS_DIR"
+ASSETS_DIR = Path(os.environ.get(ASSETS_ENV) or os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "assets")))
+
+INDEX_FORMAT_VERSION = 1
+LOCK_TIMEOUT = 60
+
+
+class Registry:
+    """
+    Append-only string <-> global ID table shared by every process on the machine.
+
+    ``<name>.txt`` holds one entry per line and is the source of truth, the line
+    number is the ID. New entries are only ever appended while holding an
+    exclusive lock on ``<name>.lock``, after re-reading whatever other processes
+    appended, so two processes can never hand out different IDs for one string.
+    ``<name>.idx`` is a marshal snapshot of the parsed table plus the text offset
+    it covers; on startup only the text written after that offset is read.
+    """
+
+    def __init__(self, name: str, directory: Path = None) -> None:
+        directory = Path(directory or ASSETS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.text_path = directory / f"{name}.txt"
+        self.index_path = directory / f"{name}.idx"
+        self.lock_path = directory / f"{name}.lock"
+        self.text_path.touch(exist_ok=True)
+
+        self.entries: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._offset = 0
+
+        loaded = self._load_index()
+        if self._read_tail() or not loaded:
+            self._write_index()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _load_index(self) -> bool:
+        try:
+            version, offset, entries = marshal.loads(self.index_path.read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+        if version != INDEX_FORMAT_VERSION or offset > self.text_path.stat().st_size:
+            return False
+
+        if offset > 0:
+            with open(self.text_path, "rb") as f:
+                f.seek(offset - 1)
+                if f.read(1) != b"\n":
+                    return False
+
+        self.entries.extend(entries)
+        self.ids.update({entry: i for i, entry in enumerate(entries)})
+        self._offset = offset
+        return True
+
+    def _write_index(self) -> None:
+        tmp_path = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_bytes(marshal.dumps((INDEX_FORMAT_VERSION, self._offset, self.entries)))
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+
+    def _read_tail(self) -> bool:
+        """Pick up complete lines appended to the text file since the last read."""
+        with open(self.text_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= self._offset:
+                return False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                end = mapped.rfind(b"\n", self._offset, size) + 1
+                if end <= self._offset:
+                    return False
+                tail = mapped[self._offset:end]
+
+        for entry in tail.decode("utf-8").splitlines():
+            self.ids[entry] = len(self.entries)
+            self.entries.append(entry)
+        self._offset = end
+        return True
+
+    def refresh(self) -> None:
+        """Load entries other processes appended since the registry was opened."""
+        self._read_tail()
+
+    def allocate(self, keys: Iterable[str]) -> None:
+        """Assign IDs to all keys that do not have one yet, in a single locked append."""
+        with portalocker.Lock(str(self.lock_path), mode="a", timeout=LOCK_TIMEOUT):
+            self._read_tail()
+            missing = [key for key in dict.fromkeys(keys) if key not in self.ids]
+            if not missing:
+                return
+
+            with open(self.text_path, "ab") as f:
+                f.write("".join(f"{key}\n" for key in missing).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                end = f.tell()
+
+            for key in missing:
+                self.ids[key] = len(self.entries)
+                self.entries.append(key)
+            self._offset = end
+            self._write_index()
+
+    def get_id(self, key: str) -> int:
+        global_id = self.ids.get(key)
+        if global_id is None:
+            self.allocate([key])
+            global_id = self.ids[key]
+        return global_id
+
+    def get_ids(self, keys: List[str]) -> List[int]:
+        missing = [key for key in keys if key not in self.ids]
+        if missing:
+            self.allocate(missing)
+        return [self.ids[key] for key in keys]
+
+    def get(self, global_id: int) -> str:
+        if global_id >= len(self.entries):
+            self._read_tail()
+        return self.entries[global_id]
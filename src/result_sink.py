@@ -0,0 +1,312 @@
+from abc import ABC, abstractmethod
+from io import StringIO
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class ResultSink(ABC):
+    """
+    Buffered writer of crawl results keyed by one column (``url`` or ``id``).
+
+    Rows are kept in memory and written as one batch every ``flush_rows`` rows or
+    ``flush_seconds`` seconds, and on :meth:`flush`/:meth:`close`. A later row with
+    an existing key supersedes the earlier one. Membership tests (``key in sink``)
+    never re-read the stored results. Fields listed in ``list_fields`` hold Python
+    lists; backends without a list type store them as JSON.
+
+    Use :func:`open_sink` to pick the backend from the file extension.
+    """
+
+    def __init__(self, path: Path, key: str, list_fields: Iterable[str] = (), flush_rows: int = 50, flush_seconds: float = 30.0) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.key = key
+        self.list_fields = set(list_fields)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+
+        self._lock = threading.RLock()
+        self._buffer: Dict[str, dict] = {}
+        self._last_flush = time.monotonic()
+        self.keys = self._load_keys()
+
+    def __contains__(self, key) -> bool:
+        return str(key) in self.keys
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __enter__(self) -> "ResultSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add(self, row: dict) -> None:
+        key = str(row[self.key])
+        with self._lock:
+            self._buffer[key] = row
+            self.keys.add(key)
+            if len(self._buffer) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_seconds:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._buffer:
+                self._write(list(self._buffer.values()))
+                self._buffer.clear()
+            self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+
+    def rows(self) -> Iterator[dict]:
+        """Every stored row, the latest version per key, with list fields decoded."""
+        self.flush()
+        yield from self._read()
+
+    def _encode(self, row: dict) -> dict:
+        return {k: json.dumps(v) if k in self.list_fields else v for k, v in row.items()}
+
+    def _decode(self, row: dict) -> dict:
+        for field in self.list_fields:
+            value = row.get(field)
+            if isinstance(value, str):
+                try:
+                    row[field] = json.loads(value) if value else []
+                except ValueError:
+                    row[field] = value.split(" | ")
+        return row
+
+    @abstractmethod
+    def _load_keys(self) -> set:
+        """Keys of the stored rows, read once when the sink is opened."""
+
+    @abstractmethod
+    def _write(self, rows: List[dict]) -> None:
+        """Store one batch of rows."""
+
+    @abstractmethod
+    def _read(self) -> Iterator[dict]:
+        """Stored rows, the latest version per key."""
+
+
+class CsvSink(ResultSink):
+    """
+    Appends each batch to a CSV file with a single write; when a key repeats, the
+    last row wins on read. Rows with new columns extend the header once.
+
+    CSV has no index, so opening the sink reads the whole file once to collect the
+    keys, and superseded rows stay in the file until it is compacted. That happens
+    on :meth:`close` once more than ``compact_ratio`` of the stored rows are stale.
+    Large or often updated results are better kept in .sqlite or .parquet.
+    """
+
+    def __init__(self, path: Path, key: str, compact_ratio: float = 0.25, **kwargs) -> None:
+        self.compact_ratio = compact_ratio
+        super().__init__(path, key, **kwargs)
+
+    def _load_keys(self) -> set:
+        self.fieldnames = None
+        self.row_count = 0
+        keys = set()
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return keys
+
+        with open(self.path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            self.fieldnames = next(reader, None)
+            if not self.fieldnames or self.key not in self.fieldnames:
+                return keys
+            index = self.fieldnames.index(self.key)
+            for record in reader:
+                if len(record) > index:
+                    keys.add(record[index])
+                    self.row_count += 1
+        return keys
+
+    def _rewrite(self, fieldnames: List[str], rows: Iterable[dict]) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as dst:
+            writer = csv.DictWriter(dst, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _extend_header(self, fields: List[str]) -> None:
+        """Rewrite the file under a header with extra columns, older rows leave them empty; compacts it too."""
+        rows = list(self._latest())
+        self._rewrite(self.fieldnames + fields, rows)
+        self.fieldnames += fields
+        self.row_count = len(rows)
+
+    def _write(self, rows: List[dict]) -> None:
+        new_file = self.fieldnames is None
+        if new_file:
+            self.fieldnames = list(rows[0].keys())
+        missing = [f for f in dict.fromkeys(k for row in rows for k in row) if f not in self.fieldnames]
+        if missing:
+            self._extend_header(missing)
+
+        buffer = StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.fieldnames)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(self._encode(row) for row in rows)
+
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            f.write(buffer.getvalue())
+            f.flush()
+            os.fsync(f.fileno())
+        self.row_count += len(rows)
+
+    def _latest(self) -> Iterator[dict]:
+        """Stored rows as written, the latest per key."""
+        if not self.path.exists():
+            return
+        latest = {}
+        with open(self.path, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                latest[row.get(self.key)] = row
+        yield from latest.values()
+
+    def _read(self) -> Iterator[dict]:
+        for row in self._latest():
+            yield self._decode(row)
+
+    def compact(self) -> None:
+        """Rewrite the file with only the latest row per key."""
+        with self._lock:
+            self.flush()
+            if self.fieldnames is None:
+                return
+            rows = list(self._latest())
+            self._rewrite(self.fieldnames, rows)
+            self.row_count = len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            super().close()
+            if self.row_count - len(self.keys) > self.row_count * self.compact_ratio:
+                self.compact()
+
+
+class ParquetSink(ResultSink):
+    """
+    Writes every batch as a new part file of a Parquet dataset directory.
+
+    Parts are written to a temporary name and renamed, so readers never see a
+    half-written part. Needs pandas with a Parquet engine (pyarrow).
+    """
+
+    def _parts(self) -> List[Path]:
+        return sorted(self.path.glob("part-*.parquet")) if self.path.is_dir() else []
+
+    def _load_keys(self) -> set:
+        import pandas as pd
+
+        keys = set()
+        for part in self._parts():
+            keys.update(pd.read_parquet(part, columns=[self.key])[self.key].astype(str))
+        return keys
+
+    def _write(self, rows: List[dict]) -> None:
+        import pandas as pd
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        parts = self._parts()
+        index = int(parts[-1].stem.split("-")[1]) + 1 if parts else 0
+        part_path = self.path / f"part-{index:06d}.parquet"
+        tmp_path = part_path.with_name(part_path.name + ".tmp")
+
+        frame = pd.DataFrame(rows)
+        frame[self.key] = frame[self.key].astype(str)
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, part_path)
+
+    def _read(self) -> Iterator[dict]:
+        import pandas as pd
+
+        parts = self._parts()
+        if not parts:
+            return
+        frame = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+        frame = frame.drop_duplicates(subset=self.key, keep="last")
+        for row in frame.to_dict("records"):
+            for field in self.list_fields:
+                if field in row and row[field] is not None and not isinstance(row[field], list):
+                    row[field] = list(row[field])
+            yield row
+
+
+class SqliteSink(ResultSink):
+    """Upserts each batch into an SQLite table in one transaction; the key is the primary key."""
+
+    def __init__(self, path: Path, key: str, table: str = "results", **kwargs) -> None:
+        self.table = table
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        super().__init__(path, key, **kwargs)
+
+    def _columns(self) -> List[str]:
+        return [row[1] for row in self.connection.execute(f'PRAGMA table_info("{self.table}")')]
+
+    def _load_keys(self) -> set:
+        if not self._columns():
+            return set()
+        return {str(key) for (key,) in self.connection.execute(f'SELECT "{self.key}" FROM "{self.table}"')}
+
+    def _write(self, rows: List[dict]) -> None:
+        columns = self._columns()
+        with self.connection:
+            if not columns:
+                columns = list(rows[0].keys())
+                definitions = ", ".join(f'"{c}" TEXT PRIMARY KEY' if c == self.key else f'"{c}"' for c in columns)
+                self.connection.execute(f'CREATE TABLE "{self.table}" ({definitions})')
+            for column in dict.fromkeys(c for row in rows for c in row):
+                if column not in columns:
+                    self.connection.execute(f'ALTER TABLE "{self.table}" ADD COLUMN "{column}"')
+                    columns.append(column)
+
+            placeholders = ", ".join("?" for _ in columns)
+            names = ", ".join(f'"{c}"' for c in columns)
+            self.connection.executemany(
+                f'INSERT OR REPLACE INTO "{self.table}" ({names}) VALUES ({placeholders})',
+                [[self._encode(row).get(c) for c in columns] for row in rows],
+            )
+
+    def _read(self) -> Iterator[dict]:
+        columns = self._columns()
+        if not columns:
+            return
+        for values in self.connection.execute(f'SELECT * FROM "{self.table}"'):
+            yield self._decode(dict(zip(columns, values)))
+
+    def close(self) -> None:
+        super().close()
+        self.connection.close()
+
+
+SINKS = {
+    ".csv": CsvSink,
+    ".parquet": ParquetSink,
+    ".sqlite": SqliteSink,
+    ".db": SqliteSink,
+}
+
+
+def open_sink(path: Path, key: str, **kwargs) -> ResultSink:
+    """Open the result sink matching the extension of ``path`` (.csv, .parquet, .sqlite/.db)."""
+    suffix = Path(path).suffix.lower()
+    if suffix not in SINKS:
+        raise ValueError(f"Unsupported results format '{suffix}', expected one of {', '.join(SINKS)}.")
+    return SINKS[suffix](path, key, **kwargs)
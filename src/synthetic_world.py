@@ -0,0 +1,321 @@
+from pathlib import Path
+from typing import Iterable
+import gzip
+import io
+import os
+import struct
+import zlib
+import numpy as np
+from anvil_reader import (
+    DATA_VERSION_1_16,
+    DATA_VERSION_1_18,
+    SECTOR_SIZE,
+    TAG_BYTE,
+    TAG_BYTE_ARRAY,
+    TAG_COMPOUND,
+    TAG_INT,
+    TAG_INT_ARRAY,
+    TAG_LIST,
+    TAG_LONG,
+    TAG_LONG_ARRAY,
+    TAG_STRING,
+    palette_bits,
+    section_range,
+)
+
+# DataVersion and version name of the formats the generator can write
+FORMATS = {
+    "1.20": (3465, "1.20.1"),
+    "1.16": (2586, "1.16.5"),
+    "1.15": (2230, "1.15.2"),
+}
+
+COLORS = (
+    "white", "orange", "magenta", "light_blue", "yellow", "lime", "pink", "gray",
+    "light_gray", "cyan", "purple", "blue", "brown", "green", "red", "black",
+)
+SYNTHETIC_BLOCKS = (
+    "minecraft:stone", "minecraft:granite", "minecraft:diorite", "minecraft:andesite",
+    "minecraft:dirt", "minecraft:cobblestone", "minecraft:oak_planks",
+    # A few states with properties, so translation and waterlogging are exercised
+    "minecraft:oak_log[axis=x]", "minecraft:oak_stairs[facing=east,half=bottom,shape=straight,waterlogged=true]",
+    "minecraft:grass_block[snowy=false]", "minecraft:sand", "minecraft:gravel", "minecraft:bricks",
+    "minecraft:stone_bricks", "minecraft:glass", "minecraft:bookshelf", "minecraft:obsidian", "minecraft:clay", "minecraft:sandstone",
+) + tuple(f"minecraft:{c}_wool" for c in COLORS) \
+  + tuple(f"minecraft:{c}_concrete" for c in COLORS) \
+  + tuple(f"minecraft:{c}_terracotta" for c in COLORS)
+SYNTHETIC_BIOMES = ("minecraft:plains", "minecraft:forest", "minecraft:desert", "minecraft:river")
+
+
+def palette_entry(state: str) -> dict:
+    """Palette compound of a ``ns:name[key=value,...]`` block state string."""
+    name, _, properties = state.partition("[")
+    if not properties:
+        return {"Name": name}
+    return {"Name": name, "Properties": dict(item.split("=", 1) for item in properties.rstrip("]").split(","))}
+
+
+def _tag_type(value) -> int:
+    if isinstance(value, tuple):
+        return value[0]
+    if isinstance(value, dict):
+        return TAG_COMPOUND
+    if isinstance(value, str):
+        return TAG_STRING
+    if isinstance(value, list):
+        return TAG_LIST
+    if isinstance(value, np.ndarray):
+        return {1: TAG_BYTE_ARRAY, 4: TAG_INT_ARRAY, 8: TAG_LONG_ARRAY}[value.dtype.itemsize]
+    if isinstance(value, int):
+        return TAG_INT
+    raise TypeError(f"Cannot encode {type(value).__name__} as NBT.")
+
+
+def _write_string(buffer: io.BytesIO, value: str) -> None:
+    encoded = value.encode("utf-8")
+    buffer.write(struct.pack(">H", len(encoded)))
+    buffer.write(encoded)
+
+
+def _write_payload(buffer: io.BytesIO, tag_type: int, value) -> None:
+    if isinstance(value, tuple):
+        value = value[1]
+    if tag_type == TAG_BYTE:
+        buffer.write(struct.pack(">b", value))
+    elif tag_type == TAG_INT:
+        buffer.write(struct.pack(">i", value))
+    elif tag_type == TAG_LONG:
+        buffer.write(struct.pack(">q", value))
+    elif tag_type == TAG_STRING:
+        _write_string(buffer, value)
+    elif tag_type == TAG_COMPOUND:
+        for key, item in value.items():
+            item_type = _tag_type(item)
+            buffer.write(bytes([item_type]))
+            _write_string(buffer, key)
+            _write_payload(buffer, item_type, item)
+        buffer.write(b"\0")
+    elif tag_type == TAG_LIST:
+        item_type = _tag_type(value[0]) if value else 0
+        buffer.write(bytes([item_type]))
+        buffer.write(struct.pack(">i", len(value)))
+        for item in value:
+            _write_payload(buffer, item_type, item)
+    elif tag_type in (TAG_BYTE_ARRAY, TAG_INT_ARRAY, TAG_LONG_ARRAY):
+        dtype = {TAG_BYTE_ARRAY: ">i1", TAG_INT_ARRAY: ">i4", TAG_LONG_ARRAY: ">i8"}[tag_type]
+        buffer.write(struct.pack(">i", len(value)))
+        buffer.write(value.astype(dtype).tobytes())
+    else:
+        raise ValueError(f"Unsupported tag type {tag_type}.")
+
+
+def encode_nbt(root: dict) -> bytes:
+    """Uncompressed NBT of a compound; tag types are inferred, ``(tag_type, value)`` tuples force one."""
+    buffer = io.BytesIO()
+    buffer.write(bytes([TAG_COMPOUND]))
+    _write_string(buffer, "")
+    _write_payload(buffer, TAG_COMPOUND, root)
+    return buffer.getvalue()
+
+
+def pack_longs(values: np.array, bits: int, spanning: bool = False) -> np.array:
+    """Inverse of :func:`anvil_reader.unpack_longs`."""
+    values = np.asarray(values, dtype=np.uint64)
+    if spanning:
+        count = -(-len(values) * bits // 64)
+        bit_index = np.arange(len(values) * bits, dtype=np.int64)
+        value_bits = (values[bit_index // bits] >> (bit_index % bits).astype(np.uint64)) & np.uint64(1)
+        padded = np.zeros(count * 64, dtype=np.uint64)
+        padded[:len(value_bits)] = value_bits
+        weights = np.uint64(1) << np.arange(64, dtype=np.uint64)
+        return (padded.reshape(count, 64) * weights).sum(axis=1, dtype=np.uint64).view(np.int64)
+
+    per_long = 64 // bits
+    count = -(-len(values) // per_long)
+    padded = np.zeros(count * per_long, dtype=np.uint64)
+    padded[:len(values)] = values
+    padded = padded.reshape(count, per_long)
+    longs = np.zeros(count, dtype=np.uint64)
+    for i in range(per_long):
+        longs |= padded[:, i] << np.uint64(i * bits)
+    return longs.view(np.int64)
+
+
+def synthetic_chunk(
+    cx: int,
+    cz: int,
+    rng: np.random.Generator,
+    data_version: int,
+    palette_size: int = 8,
+    filled_sections: tuple = (0, 4),
+    fill: float = 0.7,
+) -> dict:
+    """
+    NBT tree of a chunk whose sections in ``filled_sections`` (a half-open range of
+    section Y values) hold random blocks from a ``palette_size`` palette, with
+    roughly ``fill`` of the blocks non-air. All other sections are air.
+    """
+    min_section, section_count = section_range(data_version)
+    post_1_18 = data_version >= DATA_VERSION_1_18
+    spanning = data_version < DATA_VERSION_1_16
+    blocks = [{"Name": "minecraft:air"}] + [palette_entry(state) for state in SYNTHETIC_BLOCKS[:max(1, palette_size - 1)]]
+
+    sections = []
+    # WORLD_SURFACE heightmap: highest non-air block + 1 per column, from the bottom of the world
+    surface = np.zeros(256, dtype=np.int64)
+    for y in range(min_section, min_section + section_count):
+        section = {"Y": (TAG_BYTE, y)}
+        if filled_sections[0] <= y < filled_sections[1]:
+            solid = rng.integers(1, len(blocks), 4096)
+            indices = np.where(rng.random(4096) < fill, solid, 0)
+            used = np.unique(indices)
+            column_layers = indices.reshape(16, 256) != 0
+            top = 15 - np.argmax(column_layers[::-1], axis=0)
+            surface = np.where(column_layers.any(axis=0), (y - min_section) * 16 + top + 1, surface)
+            palette = [blocks[i] for i in used]
+            data = pack_longs(np.searchsorted(used, indices), palette_bits(len(palette)), spanning) if len(palette) > 1 else None
+        elif post_1_18:
+            palette, data = [blocks[0]], None
+        else:
+            # Before 1.18 empty sections are simply left out
+            continue
+
+        if post_1_18:
+            section["block_states"] = {"palette": palette}
+            if data is not None:
+                section["block_states"]["data"] = data
+            biomes = list(SYNTHETIC_BIOMES[:2])
+            section["biomes"] = {"palette": biomes, "data": pack_longs(rng.integers(0, 2, 64), 1)}
+        else:
+            section["Palette"] = palette
+            section["BlockStates"] = data if data is not None else np.zeros(256, dtype=np.int64)
+        sections.append(section)
+
+    inhabited = (TAG_LONG, int(rng.integers(0, 100000)))
+    heightmaps = {"WORLD_SURFACE": pack_longs(surface, (section_count * 16).bit_length(), spanning)}
+    if post_1_18:
+        return {
+            "DataVersion": data_version,
+            "xPos": cx,
+            "yPos": min_section,
+            "zPos": cz,
+            "Status": "minecraft:full",
+            "InhabitedTime": inhabited,
+            "Heightmaps": heightmaps,
+            "sections": sections,
+        }
+    return {
+        "DataVersion": data_version,
+        "Level": {
+            "xPos": cx,
+            "zPos": cz,
+            "Status": "full",
+            "InhabitedTime": inhabited,
+            "Heightmaps": heightmaps,
+            "Biomes": rng.integers(0, 2, 1024).astype(np.int32),
+            "Sections": sections,
+        },
+    }
+
+
+def write_region(
+    path: Path,
+    region_x: int,
+    region_z: int,
+    rng: np.random.Generator,
+    density: float = 1.0,
+    legacy_chunks: float = 0.0,
+    **chunk_kwargs,
+) -> int:
+    """
+    Write a zlib-compressed ``.mca`` with about ``density`` of its 1024 chunks present; returns the chunk count.
+
+    About ``legacy_chunks`` of the chunks are written in the 1.16 layout instead,
+    like a world that was only partly upgraded to 1.18+.
+    """
+    header = bytearray(2 * SECTOR_SIZE)
+    body = bytearray()
+    sector = 2
+    written = 0
+
+    for cz in range(32):
+        for cx in range(32):
+            if rng.random() >= density:
+                continue
+            kwargs = chunk_kwargs
+            if legacy_chunks and rng.random() < legacy_chunks:
+                kwargs = {**chunk_kwargs, "data_version": FORMATS["1.16"][0]}
+            nbt = synthetic_chunk(region_x * 32 + cx, region_z * 32 + cz, rng, **kwargs)
+            data = zlib.compress(encode_nbt(nbt))
+            blob = struct.pack(">iB", len(data) + 1, 2) + data
+            blob += b"\0" * (-len(blob) % SECTOR_SIZE)
+            sectors = len(blob) // SECTOR_SIZE
+            struct.pack_into(">I", header, 4 * (cx + cz * 32), (sector << 8) | sectors)
+            body += blob
+            sector += sectors
+            written += 1
+
+    with open(path, "wb") as f:
+        f.write(bytes(header) + bytes(body))
+    return written
+
+
+def write_level_dat(world_path: Path, data_version: int, version_name: str) -> None:
+    root = {
+        "Data": {
+            "DataVersion": data_version,
+            "version": 19133,
+            "LevelName": Path(world_path).name,
+            "Version": {"Id": data_version, "Name": version_name, "Snapshot": (TAG_BYTE, 0)},
+            "SpawnX": 0,
+            "SpawnY": 64,
+            "SpawnZ": 0,
+            "LastPlayed": (TAG_LONG, 0),
+            "WorldGenSettings": {"dimensions": {"minecraft:overworld": {"type": "minecraft:overworld"}}},
+        }
+    }
+    with open(os.path.join(world_path, "level.dat"), "wb") as f:
+        f.write(gzip.compress(encode_nbt(root)))
+
+
+def generate_world(
+    world_path: Path,
+    format: str = "1.20",
+    regions: Iterable[tuple] = ((0, 0),),
+    density: float = 1.0,
+    palette_size: int = 8,
+    filled_sections: tuple = (0, 4),
+    fill: float = 0.7,
+    seed: int = 0,
+    legacy_chunks: float = 0.0,
+) -> Path:
+    """
+    Write a world amulet and the native reader can both open.
+
+    ``format`` picks the chunk layout, see ``FORMATS``: "1.20" uses the 1.18+
+    layout, "1.16" the ``Level`` layout with non-spanning block states and "1.15"
+    the older spanning bit packing. ``legacy_chunks`` mixes in chunks of the 1.16
+    layout, see :func:`write_region`.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format '{format}', expected one of {', '.join(FORMATS)}.")
+    data_version, version_name = FORMATS[format]
+    world_path = Path(world_path)
+    (world_path / "region").mkdir(parents=True, exist_ok=True)
+    write_level_dat(world_path, data_version, version_name)
+
+    rng = np.random.default_rng(seed)
+    for region_x, region_z in regions:
+        write_region(
+            world_path / "region" / f"r.{region_x}.{region_z}.mca",
+            region_x,
+            region_z,
+            rng,
+            density=density,
+            data_version=data_version,
+            palette_size=palette_size,
+            filled_sections=filled_sections,
+            fill=fill,
+            legacy_chunks=legacy_chunks,
+        )
+    return world_path
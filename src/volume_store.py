@@ -0,0 +1,192 @@
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import unquote
+import os
+import re
+import blosc2
+import numpy as np
+
+DEFAULT_CHUNKS = (64, 64, 64)
+SECTION_SIZE = 16
+DEFAULT_CPARAMS = {
+    "codec": blosc2.Codec.ZSTD,
+    "clevel": 5,
+    "filters": [blosc2.Filter.SHUFFLE],
+}
+
+
+def world_key(world: str) -> str:
+    """
+    Directory name of a world. Characters other than letters, digits, ``_``,
+    ``.``, ``-`` and inner spaces are percent-encoded, as are all-dot names, so
+    the key is a single path component and two worlds never share one.
+    """
+    key = re.sub(r"[^\w.\- ]|^ +| +$", lambda m: "".join(f"%{b:02X}" for b in m.group().encode("utf-8")), str(world))
+    if key.strip("."):
+        return key
+    return key.replace(".", "%2E") or "%"
+
+
+def world_name(key: str) -> str:
+    """The world name a :func:`world_key` stands for."""
+    return "" if key == "%" else unquote(key)
+
+
+class VolumeStore:
+    """
+    On-disk store of extracted region volumes as blosc2-compressed, chunked arrays.
+
+    Every region of every world lives in its own ``.b2nd`` file, so slicing a
+    stored array only decompresses the chunks the slice touches. Layout::
+
+        <root>/<world>/r.<x>.<z>.b2nd          block volume (X, Z, Y) uint16
+        <root>/<world>/r.<x>.<z>.biomes.b2nd   biome map (X, Z) or 4^3 biome cells (X/4, Z/4, Y/4)
+
+    Shape, y-offset, registry version and a bit-packed occupancy grid of the
+    non-air 16^3 sections are kept as variable-length metadata on the block volume.
+    """
+
+    def __init__(self, root: Path, chunks: tuple = DEFAULT_CHUNKS, cparams: dict = None) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.chunks = chunks
+        self.cparams = cparams or DEFAULT_CPARAMS
+
+    @staticmethod
+    def world_key(world: str) -> str:
+        return world_key(world)
+
+    def region_path(self, world: str, region: tuple, kind: str = "") -> Path:
+        x, z = region
+        suffix = f".{kind}" if kind else ""
+        return self.root / self.world_key(world) / f"r.{x}.{z}{suffix}.b2nd"
+
+    def _chunks_for(self, shape: tuple) -> tuple:
+        chunks = self.chunks[:len(shape)] + shape[len(self.chunks):]
+        return tuple(max(1, min(c, s)) for c, s in zip(chunks, shape))
+
+    def _write_array(self, path: Path, array: np.array, meta: dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        array = np.ascontiguousarray(array)
+
+        stored = blosc2.asarray(
+            array,
+            urlpath=str(tmp_path),
+            mode="w",
+            chunks=self._chunks_for(array.shape),
+            cparams=self.cparams,
+        )
+        for key, value in meta.items():
+            stored.schunk.vlmeta[key] = value
+        del stored
+        os.replace(tmp_path, path)
+
+    def write(
+        self,
+        world: str,
+        region: tuple,
+        volume: np.array,
+        biomes: np.array = None,
+        y_offset: int = 0,
+        registry_version: int = None,
+    ) -> Path:
+        """Store a region volume (and optionally its biomes), replacing any previous version."""
+        occupancy = section_occupancy(volume)
+        meta = {
+            "world": str(world),
+            "region": [int(region[0]), int(region[1])],
+            "shape": [int(s) for s in volume.shape],
+            "dtype": str(volume.dtype),
+            "y_offset": int(y_offset),
+            "registry_version": registry_version,
+            "occupancy_shape": list(occupancy.shape),
+            "occupancy": np.packbits(occupancy).tobytes(),
+        }
+
+        if biomes is not None:
+            biome_meta = {"world": meta["world"], "region": meta["region"], "y_offset": meta["y_offset"]}
+            self._write_array(self.region_path(world, region, "biomes"), biomes, biome_meta)
+
+        path = self.region_path(world, region)
+        self._write_array(path, volume, meta)
+        return path
+
+    def open(self, world: str, region: tuple, kind: str = "") -> blosc2.NDArray:
+        """Open a stored array lazily; indexing it returns a NumPy array of just that slice."""
+        path = self.region_path(world, region, kind)
+        if not path.is_file():
+            raise KeyError(f"Region {tuple(region)} of world '{world}' is not in the store.")
+        return blosc2.open(str(path), mode="r")
+
+    def read(self, world: str, region: tuple, key=slice(None)) -> np.array:
+        return self.open(world, region)[key]
+
+    def read_biomes(self, world: str, region: tuple, key=slice(None)) -> Optional[np.array]:
+        if not self.region_path(world, region, "biomes").is_file():
+            return None
+        return self.open(world, region, "biomes")[key]
+
+    def read_biome_map(self, world: str, region: tuple, y: int = 0) -> Optional[np.array]:
+        """
+        (X, Z) biome map of a region. Stored biome cells are reduced to the layer at
+        height ``y``, or the nearest stored layer when the volume was trimmed above or below it.
+        """
+        if not self.region_path(world, region, "biomes").is_file():
+            return None
+        stored = self.open(world, region, "biomes")
+        if stored.ndim == 2:
+            return stored[:]
+        y_offset = stored.schunk.vlmeta["y_offset"] if "y_offset" in stored.schunk.vlmeta else 0
+        layer = min(max((y - y_offset) // 4, 0), stored.shape[2] - 1)
+        return np.repeat(np.repeat(stored[:, :, layer], 4, axis=0), 4, axis=1)
+
+    def metadata(self, world: str, region: tuple) -> dict:
+        array = self.open(world, region)
+        meta = array.schunk.vlmeta.getall()
+        meta["cratio"] = array.schunk.cratio
+        return meta
+
+    def occupancy(self, world: str, region: tuple) -> np.array:
+        """Boolean (X/16, Z/16, ceil(Y/16)) grid of sections that contain any non-air block."""
+        array = self.open(world, region)
+        meta = array.schunk.vlmeta
+        shape = tuple(meta["occupancy_shape"])
+        bits = np.unpackbits(np.frombuffer(meta["occupancy"], dtype=np.uint8), count=int(np.prod(shape)))
+        return bits.astype(bool).reshape(shape)
+
+    def __contains__(self, key: tuple) -> bool:
+        world, region = key
+        return self.region_path(world, region).is_file()
+
+    def worlds(self) -> List[str]:
+        return sorted(world_name(p.name) for p in self.root.iterdir() if p.is_dir())
+
+    def regions(self, world: str) -> List[tuple]:
+        world_dir = self.root / self.world_key(world)
+        if not world_dir.is_dir():
+            return []
+
+        regions = []
+        for path in world_dir.glob("r.*.b2nd"):
+            parts = path.name.split(".")
+            if len(parts) != 4:
+                continue
+            regions.append((int(parts[1]), int(parts[2])))
+        return sorted(regions)
+
+    def delete(self, world: str, region: tuple) -> None:
+        for kind in ("", "biomes"):
+            self.region_path(world, region, kind).unlink(missing_ok=True)
+
+
+def section_occupancy(volume: np.array, size: int = SECTION_SIZE) -> np.array:
+    """Which ``size``^3 cells of an (X, Z, Y) volume hold anything but air (ID 0), one y-slab at a time."""
+    nx, nz = volume.shape[0] // size, volume.shape[1] // size
+    ny = -(-volume.shape[2] // size)
+    occupancy = np.zeros((nx, nz, ny), dtype=bool)
+
+    for k in range(ny):
+        slab = volume[:nx * size, :nz * size, k * size:(k + 1) * size]
+        occupancy[:, :, k] = slab.reshape(nx, size, nz, size, -1).any(axis=(1, 3, 4))
+    return occupancy
@@ -0,0 +1,45 @@
+from http.server import ThreadingHTTPServer
+import os
+import tempfile
+import threading
+
+import pytest
+
+# Synthetic block states must not end up in the real registry, worker processes
+# started with spawn pick the directory up from the environment
+os.environ["MC_ASSETS_DIR"] = tempfile.mkdtemp(prefix="mc_test_assets_")
+
+
+@pytest.fixture(scope="session")
+def world_factory(tmp_path_factory):
+    """Synthetic worlds by format, generated once per test session."""
+    from synthetic_world import generate_world
+
+    worlds = {}
+
+    def make(fmt: str = "1.20", regions: tuple = ((0, 0),), density: float = 0.05, legacy_chunks: float = 0.0):
+        key = (fmt, tuple(regions), density, legacy_chunks)
+        if key not in worlds:
+            worlds[key] = generate_world(
+                tmp_path_factory.mktemp(f"world_{fmt}"), fmt, regions=regions, density=density, seed=1, legacy_chunks=legacy_chunks
+            )
+        return worlds[key]
+
+    return make
+
+
+@pytest.fixture
+def http_server():
+    """Serves a ``BaseHTTPRequestHandler`` subclass on localhost, returns the base URL."""
+    servers = []
+
+    def serve(handler) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
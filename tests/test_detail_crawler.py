@@ -0,0 +1,75 @@
+import json
+from pathlib import Path
+
+from detail_crawler import DRIVER_START_ATTEMPTS, DetailCrawler
+from rate_limiter import AdaptiveRateLimiter
+from result_sink import open_sink
+
+DETAILS_HTML = (Path(__file__).parent / "fixtures" / "details.html").read_text(encoding="utf-8")
+URL = "https://www.planetminecraft.com/project/medieval-harbour-town/"
+
+
+class StubDriver:
+    def __init__(self):
+        self.page_source = ""
+        self.current_url = ""
+
+    def get(self, url):
+        self.page_source, self.current_url = DETAILS_HTML, url
+
+    def find_element(self, by, value):
+        return object()
+
+    def quit(self):
+        pass
+
+
+def make_crawler(tmp_path, driver_factory):
+    with open_sink(tmp_path / "listing.csv", "url") as listing:
+        listing.add({"url": URL, "id": "1", "title": "Medieval Harbour Town"})
+    limiter = AdaptiveRateLimiter(rate=1000, max_rate=1000, jitter=0, backoff_base=0.001)
+    return DetailCrawler(
+        extraction="source",
+        workers=1,
+        limiter=limiter,
+        driver_factory=driver_factory,
+        input_file=str(tmp_path / "listing.csv"),
+        results_file=str(tmp_path / "details.csv"),
+        state_file=str(tmp_path / "state.json"),
+    )
+
+
+def stored_attempts(tmp_path):
+    path = tmp_path / "state.json"
+    return json.loads(path.read_text())["attempts"] if path.exists() else {}
+
+
+def test_browser_is_restarted_without_counting_against_the_project(tmp_path):
+    starts = []
+
+    def flaky_driver(worker_id):
+        starts.append(worker_id)
+        if len(starts) < DRIVER_START_ATTEMPTS:
+            raise RuntimeError("chrome not reachable")
+        return StubDriver()
+
+    crawler = make_crawler(tmp_path, flaky_driver)
+    crawler.run()
+
+    assert len(starts) == DRIVER_START_ATTEMPTS
+    assert stored_attempts(tmp_path) == {}
+    with open_sink(tmp_path / "details.csv", "id", list_fields=("gallery_urls", "download_mirrors")) as results:
+        [row] = list(results.rows())
+    assert row["id"] == "1" and row["progress"] == "100% complete"
+
+
+def test_worker_stops_when_the_browser_never_starts(tmp_path):
+    def broken_driver(worker_id):
+        raise RuntimeError("no chrome binary")
+
+    crawler = make_crawler(tmp_path, broken_driver)
+    crawler.run()
+
+    assert stored_attempts(tmp_path) == {}
+    assert "1" not in crawler.results
+    assert [p["id"] for p in crawler.pending_projects()] == ["1"]
@@ -0,0 +1,44 @@
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+
+import pytest
+
+from http_fetch import HttpFetcher
+from rate_limiter import Throttled
+
+
+class ListingHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/busy":
+            self.send_response(429)
+            self.send_header("Retry-After", "7")
+            self.end_headers()
+            return
+        status = 503 if self.path == "/challenge" else 200
+        body = b"<html><title>Just a moment...</title></html>" if status == 503 else b"<html>ok</html>"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_429_raises_throttled_with_retry_after(http_server):
+    base = http_server(ListingHandler)
+    fetcher = HttpFetcher()
+    try:
+        with pytest.raises(Throttled) as raised:
+            fetcher.fetch(f"{base}/busy")
+        assert raised.value.retry_after == 7
+        assert fetcher.fetch(f"{base}/projects") == (200, "<html>ok</html>")
+        assert fetcher.fetch(f"{base}/challenge")[0] == 503
+    finally:
+        fetcher.close()
+
+
+def test_file_urls_are_read_from_disk():
+    path = Path(__file__).parent / "fixtures" / "listing.html"
+    status, html = HttpFetcher().fetch(path.resolve().as_uri())
+    assert status == 200 and "pagination_next" in html
@@ -0,0 +1,25 @@
+import pstats
+import threading
+import time
+
+from instrumentation import profile
+
+
+def busy_worker():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def test_profile_covers_worker_threads(tmp_path):
+    path = tmp_path / "run.prof"
+    with profile(path, threads=True):
+        workers = [threading.Thread(target=busy_worker) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert "busy_worker" in functions
+    assert threading.getprofile() is None
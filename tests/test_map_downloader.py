@@ -0,0 +1,174 @@
+from http.server import BaseHTTPRequestHandler
+import io
+import os
+import re
+import zipfile
+
+import pytest
+
+from map_downloader import DownloadError, MapDownloader, file_sha256
+from rate_limiter import AdaptiveRateLimiter
+from result_sink import open_sink
+
+
+def make_archive() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("My World/level.dat", b"\x0a\x00\x00\x00")
+        zf.writestr("My World/region/r.0.0.mca", os.urandom(64 * 1024))
+        zf.writestr("__MACOSX/My World/._level.dat", b"")
+        zf.writestr("readme.txt", b"Have fun")
+    return buffer.getvalue()
+
+
+ARCHIVE = make_archive()
+
+
+def corrupted(data: bytes) -> bytes:
+    # Flips a byte inside the stored region file, the zip structure stays valid
+    middle = data.index(b"r.0.0.mca") + 32 * 1024
+    return data[:middle] + bytes([data[middle] ^ 0xFF]) + data[middle + 1:]
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    """Serves ``files`` by path, honouring ``bytes=N-`` ranges unless ``ranges`` is off."""
+
+    files = {}
+    ranges = True
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("Range")))
+        if self.path not in self.files:
+            body = b"<html>Download this map on our partner site</html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        data = self.files[self.path]
+        match = re.match(r"bytes=(\d+)-$", self.headers.get("Range") or "")
+        if match and self.ranges:
+            start = int(match.group(1))
+            if start >= len(data):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+            data = data[start:]
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(http_server):
+    handler = type("Handler", (ArchiveHandler,), {"files": {}, "requests": []})
+    handler.base = http_server(handler)
+    return handler
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    limiter = AdaptiveRateLimiter(rate=1000, max_rate=1000, jitter=0, backoff_base=0.001)
+    downloader = MapDownloader(
+        details_file=str(tmp_path / "details.csv"),
+        downloads_dir=str(tmp_path / "downloads"),
+        worlds_dir=str(tmp_path / "worlds"),
+        workers=1,
+        limiter=limiter,
+        cookies_file=None,
+    )
+    yield downloader
+    downloader.table.close()
+    downloader.fetcher.close()
+
+
+def project(*urls):
+    return {"id": "7", "download_mirrors": [{"name": "Download", "url": url} for url in urls]}
+
+
+@pytest.mark.parametrize("ranges", [True, False])
+def test_download_resumes_a_partial_file(server, downloader, ranges):
+    server.files["/7/download"] = ARCHIVE
+    server.ranges = ranges
+    url = f"{server.base}/7/download"
+    half = len(ARCHIVE) // 2
+    downloader.part_name("7", url).write_bytes(ARCHIVE[:half])
+
+    record = downloader.download(project(url))
+
+    assert server.requests == [("/7/download", f"bytes={half}-")]
+    assert downloader.archive_name("7").read_bytes() == ARCHIVE
+    assert record["sha256"] == file_sha256(downloader.archive_name("7"))
+    assert record["size"] == len(ARCHIVE)
+    assert not list(downloader.downloads_dir.glob("*.part"))
+
+
+def test_complete_part_file_is_not_fetched_again(server, downloader):
+    server.files["/7/download"] = ARCHIVE
+    url = f"{server.base}/7/download"
+    downloader.part_name("7", url).write_bytes(ARCHIVE)
+
+    downloader.download(project(url))
+
+    assert server.requests == [("/7/download", f"bytes={len(ARCHIVE)}-")]
+    assert downloader.archive_name("7").read_bytes() == ARCHIVE
+
+
+def test_corrupt_download_never_replaces_the_archive(server, downloader):
+    server.files["/7/download"] = corrupted(ARCHIVE)
+    url = f"{server.base}/7/download"
+    downloader.archive_name("7").write_bytes(b"previous archive")
+
+    with pytest.raises(DownloadError, match="Corrupt archive"):
+        downloader.download(project(url))
+
+    # Every attempt starts over, a corrupt part file is never resumed
+    assert [header for _, header in server.requests] == [None, None, None]
+    assert downloader.archive_name("7").read_bytes() == b"previous archive"
+    assert not list(downloader.downloads_dir.glob("*.part"))
+
+
+def test_web_page_mirror_falls_through_to_the_next(server, downloader):
+    server.files["/mirror.zip"] = ARCHIVE
+    page, mirror = f"{server.base}/7/download", f"{server.base}/mirror.zip"
+
+    record = downloader.download(project(page, mirror))
+
+    assert [path for path, _ in server.requests] == ["/7/download", "/mirror.zip"]
+    assert record["url"] == mirror
+
+
+def test_verified_archive_is_not_downloaded_again(server, downloader):
+    server.files["/7/download"] = ARCHIVE
+    url = f"{server.base}/7/download"
+    first = downloader.download(project(url))
+    server.requests.clear()
+
+    assert downloader.download(project(url)) == first
+    assert server.requests == []
+
+
+def test_run_unpacks_only_the_world(server, downloader, tmp_path):
+    server.files["/7/download"] = ARCHIVE
+    with open_sink(tmp_path / "details.csv", "id", list_fields=("download_mirrors",)) as details:
+        details.add(project(f"{server.base}/7/download"))
+
+    downloader.run()
+
+    world = tmp_path / "worlds" / "7" / "My World"
+    assert sorted(p.relative_to(world).as_posix() for p in world.rglob("*") if p.is_file()) == ["level.dat", "region/r.0.0.mca"]
+    assert not (tmp_path / "worlds" / "7" / "__MACOSX").exists()
+    with open_sink(downloader.downloads_dir / "downloads.csv", "id", list_fields=("worlds",)) as table:
+        [row] = list(table.rows())
+    assert row["status"] == "extracted" and row["worlds"] == [str(world)]
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from region_extractor import WorldWrapper
+
+REGIONS = ((0, 0), (1, 0))
+
+
+@pytest.mark.parametrize("biomes_3d", [False, True])
+@pytest.mark.parametrize("fmt", ["1.16", "1.20"])
+def test_native_region_volume_matches_amulet(world_factory, fmt, biomes_3d):
+    world = WorldWrapper(world_factory(fmt, regions=REGIONS, density=0.1))
+    try:
+        for region in REGIONS:
+            expected, expected_biomes, expected_offset = world.get_region_volume(*region, return_y_offset=True, biomes_3d=biomes_3d)
+            volume, biomes, y_offset = world.get_region_volume_native(*region, return_y_offset=True, biomes_3d=biomes_3d)
+
+            assert volume.shape == expected.shape
+            assert y_offset == expected_offset
+            assert np.count_nonzero(expected), "synthetic region holds no blocks"
+            np.testing.assert_array_equal(volume, expected)
+            np.testing.assert_array_equal(biomes, expected_biomes)
+    finally:
+        world.close()
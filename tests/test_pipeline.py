@@ -0,0 +1,42 @@
+import json
+import shutil
+
+from pipeline import DatasetPipeline
+
+
+def manifest_regions(store):
+    with open(store / "manifest.jsonl", encoding="utf-8") as f:
+        return sorted(tuple(json.loads(line)["region"]) for line in f)
+
+
+def test_failed_region_stays_pending_while_the_others_are_stored(world_factory, tmp_path):
+    world = tmp_path / "data" / "world"
+    shutil.copytree(world_factory("1.20", regions=((0, 0), (1, 0))), world)
+    broken = world / "region" / "r.0.0.mca"
+    saved = broken.rename(tmp_path / "r.0.0.mca")
+    broken.symlink_to(tmp_path / "missing.mca")
+    store = tmp_path / "store"
+
+    DatasetPipeline(str(tmp_path / "data"), str(store), workers=1, native=True, stats=False).run()
+    assert manifest_regions(store) == [(1, 0)]
+
+    broken.unlink()
+    saved.rename(broken)
+    DatasetPipeline(str(tmp_path / "data"), str(store), workers=1, native=True, stats=False).run()
+    assert manifest_regions(store) == [(0, 0), (1, 0)]
+
+
+def test_failed_write_does_not_stop_the_world(world_factory, tmp_path, monkeypatch):
+    shutil.copytree(world_factory("1.20", regions=((0, 0), (1, 0))), tmp_path / "data" / "world")
+    store = tmp_path / "store"
+    pipeline = DatasetPipeline(str(tmp_path / "data"), str(store), workers=1, native=True, stats=False, dedup=False)
+    write = pipeline.store.write
+
+    def failing_write(name, coords, *args):
+        if tuple(coords) == (0, 0):
+            raise OSError("disk full")
+        write(name, coords, *args)
+
+    monkeypatch.setattr(pipeline.store, "write", failing_write)
+    pipeline.run()
+    assert manifest_regions(store) == [(1, 0)]
@@ -0,0 +1,101 @@
+from pathlib import Path
+
+import pytest
+
+from pmc_html import is_challenge_page, parse_details, parse_listing
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def fixture(name):
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def test_cloudflare_interstitial_is_a_challenge():
+    assert is_challenge_page(fixture("challenge.html"))
+
+
+def test_page_with_injected_challenge_script_is_not_a_challenge():
+    # Ordinary pages load /cdn-cgi/challenge-platform/ too
+    assert not is_challenge_page(fixture("details.html"))
+    assert not is_challenge_page(fixture("listing.html"))
+
+
+@pytest.mark.parametrize("status, expected", [(403, True), (503, True), (429, False), (200, False)])
+def test_challenge_status(status, expected):
+    assert is_challenge_page("<html></html>", status) is expected
+
+
+def test_parse_listing():
+    items, has_next = parse_listing(fixture("listing.html"), "https://www.planetminecraft.com/projects/?p=2")
+
+    assert has_next
+    assert [item["id"] for item in items] == ["48213", "51877"]
+    first, second = items
+    assert first == {
+        "id": "48213",
+        "title": "Medieval Harbour Town",
+        "url": "https://www.planetminecraft.com/project/medieval-harbour-town/",
+        "category": "Land Structure Map",
+        "creator": "builder",
+        "creator_id": "90211",
+        "views": "12,408",
+        "downloads": "1,377",
+        "comments": "42",
+        "diamonds": "318",
+        "favorites": "97",
+        "published_date": "2021-07-19T18:40:00",
+        "updated_date": "2024-03-02T10:15:00",
+    }
+    # Never updated: the latest activity is the publish date, missing counters read 0
+    assert second["updated_date"] == second["published_date"] == "2023-11-05T08:00:00"
+    assert (second["downloads"], second["favorites"]) == ("0", "0")
+
+
+def test_updated_date_is_the_latest_by_time_not_by_text():
+    html = fixture("listing.html").replace(
+        'title="2021-07-19T18:40:00"', 'title="2024-03-02T08:00:00-05:00"'
+    ).replace(
+        'title="2024-03-02T10:15:00"', 'title="2024-03-02T10:15:00+00:00"'
+    ).replace(
+        'title="2023-11-05T08:00:00"', 'title="yesterday"'
+    )
+    first, second = parse_listing(html)[0]
+
+    # 08:00 at UTC-5 is 13:00 UTC, later than 10:15 UTC although it sorts first as text
+    assert first["updated_date"] == "2024-03-02T08:00:00-05:00"
+    assert second["updated_date"] == ""
+
+
+def test_last_listing_page_has_no_next():
+    html = fixture("listing.html").replace("pagination_next", "pagination_prev")
+    assert parse_listing(html)[1] is False
+
+
+def test_parse_details():
+    details = parse_details(fixture("details.html"), "https://www.planetminecraft.com/project/medieval-harbour-town/")
+
+    assert details == {
+        "author_id": "48213",
+        "category": "Land Structure",
+        "platform": "Java Edition",
+        "progress": "100% complete",
+        "description": "A harbour town built over two summers. Includes a cathedral, a market and 40 houses.",
+        "gallery_urls": [
+            "https://static.planetminecraft.com/files/image/harbour_1.jpg",
+            "https://www.planetminecraft.com/files/image/harbour_2.jpg",
+        ],
+        "download_mirrors": [
+            {"name": "Download Map", "url": "https://www.planetminecraft.com/project/medieval-harbour-town/download/worldmap/"},
+            {"name": "Mirror 1", "url": "https://www.mediafire.com/file/abc123/harbour.zip/file?mirror=1"},
+        ],
+        "date_published": "2021-07-19T18:40:00",
+        "date_updated": "2024-03-02T10:15:00",
+    }
+
+
+def test_parse_details_of_a_bare_page():
+    details = parse_details("<html><body><div id='resource_object'></div></body></html>")
+    assert details["category"] == details["progress"] == details["author_id"] == "Unknown"
+    assert details["gallery_urls"] == details["download_mirrors"] == []
+    assert details["date_updated"] == details["date_published"] == ""
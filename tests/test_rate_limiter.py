@@ -0,0 +1,47 @@
+from email.utils import formatdate
+import time
+
+import pytest
+
+from rate_limiter import AdaptiveRateLimiter, retry_after_seconds
+
+HOST = "https://www.planetminecraft.com/projects/"
+OTHER_HOST = "https://static.planetminecraft.com/files/"
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = AdaptiveRateLimiter(rate=2.0, jitter=0, backoff_base=1.0)
+    limiter.sleeps = []
+    monkeypatch.setattr(limiter, "_sleep", limiter.sleeps.append)
+    return limiter
+
+
+def test_retry_after_header_values():
+    assert retry_after_seconds("120") == 120
+    assert retry_after_seconds("-5") == 0
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds("soon") is None
+    assert retry_after_seconds(formatdate(time.time() + 60, usegmt=True)) == pytest.approx(60, abs=2)
+
+
+def test_throttled_host_waits_out_retry_after(limiter):
+    limiter.acquire(HOST)
+    limiter.throttled(HOST, retry_after=1.5)
+
+    assert limiter.acquire(HOST) == pytest.approx(1.5, abs=0.05)
+    assert limiter.acquire(OTHER_HOST) == 0
+    assert limiter.rate(HOST) == pytest.approx(1.0)
+
+
+def test_throttled_without_retry_after_only_slows_down(limiter):
+    limiter.acquire(HOST)
+    limiter.throttled(HOST)
+    # One token per 1 / rate seconds, the rate was halved
+    assert limiter.acquire(HOST) == pytest.approx(1.0, abs=0.05)
+
+
+def test_backoff_is_at_least_retry_after(limiter):
+    assert limiter.backoff(1, retry_after=30) == 30
+    assert 0.5 <= limiter.backoff(1) <= 1.0
+    assert limiter.sleeps[0] == 30
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from anvil_reader import AnvilRegion
+from region_extractor import WorldWrapper
+
+
+@pytest.mark.parametrize("native", [False, True])
+def test_extract_regions_with_two_workers_matches_in_process(world_factory, native):
+    world = WorldWrapper(world_factory("1.20", regions=((0, 0), (1, 0))))
+    get_volume = world.get_region_volume_native if native else world.get_region_volume
+    expected = {c: get_volume(*c, return_y_offset=True) for c in [(0, 0), (1, 0)]}
+    world.close()
+
+    results = list(world.extract_regions([(0, 0), (1, 0)], workers=2, native=native, return_y_offset=True))
+
+    assert sorted(coords for coords, *_ in results) == [(0, 0), (1, 0)]
+    for coords, volume, biomes, y_offset in results:
+        volume_expected, biomes_expected, offset_expected = expected[coords]
+        assert y_offset == offset_expected
+        assert volume.shape[2] < 400
+        np.testing.assert_array_equal(volume, volume_expected)
+        np.testing.assert_array_equal(biomes, biomes_expected)
+
+
+@pytest.mark.parametrize("biomes_3d", [False, True])
+def test_native_volume_of_partly_upgraded_region_matches_amulet(world_factory, biomes_3d):
+    # half of the chunks keep the pre-1.18 layout, the rest start at y=-64
+    path = world_factory("1.20", density=0.1, legacy_chunks=0.5)
+    assert len(AnvilRegion(path / "region" / "r.0.0.mca").data_versions()) == 2
+    world = WorldWrapper(path)
+
+    volume, biomes, y_offset = world.get_region_volume_native(0, 0, return_y_offset=True, biomes_3d=biomes_3d)
+    expected, expected_biomes, expected_offset = world.get_region_volume(0, 0, return_y_offset=True, biomes_3d=biomes_3d)
+    world.close()
+
+    assert y_offset == expected_offset
+    np.testing.assert_array_equal(volume, expected)
+    np.testing.assert_array_equal(biomes, expected_biomes)
+    assert WorldWrapper(path).region_volume_shape(0, 0, native=True) == (512, 512, 384)
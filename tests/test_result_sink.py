@@ -0,0 +1,59 @@
+import pytest
+
+from result_sink import CsvSink, ResultSink, open_sink
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".sqlite", ".parquet"])
+def test_latest_row_per_key_survives_reopening(tmp_path, suffix):
+    path = tmp_path / f"results{suffix}"
+    with open_sink(path, "id", list_fields=("tags",)) as sink:
+        sink.add({"id": 1, "tags": ["a"]})
+        sink.add({"id": 2, "tags": []})
+        sink.flush()
+        sink.add({"id": 1, "tags": ["b", "c"]})
+
+    with open_sink(path, "id", list_fields=("tags",)) as sink:
+        assert "1" in sink and 2 in sink and len(sink) == 2
+        rows = {row["id"]: row["tags"] for row in sink.rows()}
+    assert rows == {"1": ["b", "c"], "2": []}
+
+
+def test_result_sink_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        ResultSink(tmp_path / "results", "id")
+
+
+def test_csv_sink_compacts_superseded_rows_on_close(tmp_path):
+    path = tmp_path / "results.csv"
+    with CsvSink(path, "id", flush_rows=1) as sink:
+        for version in range(5):
+            sink.add({"id": 1, "version": version})
+        sink.add({"id": 2, "version": 0})
+
+    assert path.read_text().count("\n") == 3
+    with CsvSink(path, "id") as sink:
+        assert sink.row_count == 2
+        assert sorted((row["id"], row["version"]) for row in sink.rows()) == [("1", "4"), ("2", "0")]
+
+
+def test_csv_sink_keeps_few_stale_rows_until_compacted(tmp_path):
+    path = tmp_path / "results.csv"
+    with CsvSink(path, "id", flush_rows=1) as sink:
+        for i in range(10):
+            sink.add({"id": i})
+        sink.add({"id": 0})
+    assert path.read_text().count("\n") == 12
+
+    with CsvSink(path, "id") as sink:
+        sink.compact()
+    assert path.read_text().count("\n") == 11
+
+
+def test_csv_sink_new_column_extends_header(tmp_path):
+    path = tmp_path / "results.csv"
+    with CsvSink(path, "id", flush_rows=1) as sink:
+        sink.add({"id": 1})
+        sink.add({"id": 2, "title": "map"})
+
+    with CsvSink(path, "id") as sink:
+        assert sorted((row["id"], row["title"]) for row in sink.rows()) == [("1", ""), ("2", "map")]
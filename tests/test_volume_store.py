@@ -0,0 +1,24 @@
+import numpy as np
+
+from volume_store import VolumeStore, world_key, world_name
+
+NAMES = ["maps/world", "maps_world", "maps\\world", "maps%2Fworld", ".", "..", " world", "Welt ü"]
+
+
+def test_world_keys_are_distinct_path_components():
+    keys = [world_key(name) for name in NAMES]
+    assert len(set(keys)) == len(NAMES)
+    for name, key in zip(NAMES, keys):
+        assert "/" not in key and "\\" not in key and key.strip(".") and key == key.strip()
+        assert world_name(key) == name
+    assert world_key("maps_world") == "maps_world"
+
+
+def test_worlds_with_similar_names_are_stored_apart(tmp_path):
+    store = VolumeStore(tmp_path)
+    for i, name in enumerate(NAMES):
+        store.write(name, (0, i), np.full((16, 16, 16), i + 1, dtype=np.uint16))
+
+    assert store.worlds() == sorted(NAMES)
+    for i, name in enumerate(NAMES):
+        assert store.regions(name) == [(0, i)]